@@ -2,11 +2,17 @@
 Module de gestion des alertes pour les zones surveillées.
 Vérifie si les objets détectés entrent dans les zones d'alerte définies.
 Supporte les zones rectangulaires et polygonales.
+
+Les zones d'une caméra sont compilées une fois (ZoneMap) : masque d'étiquettes
+à la résolution de la frame pour une recherche en O(1) par point, test
+vectorisé pour les coordonnées exactes, et tracé des zones pré-rendu.
 """
 
 import cv2
 import numpy as np
 
+import config
+
 
 def is_in_zone(box, zones):
     """
@@ -21,6 +27,9 @@ def is_in_zone(box, zones):
     Returns:
         bool: True si l'objet est dans une zone, False sinon
     """
+    if isinstance(zones, ZoneMap):
+        return zones.locate([box[:2]])[0] >= 0
+
     x, y, w, h = box
     center_x, center_y = x, y  # x et y sont déjà les coordonnées du centre
     
@@ -70,6 +79,9 @@ def draw_zones(frame, zones, color=(0, 0, 255), thickness=2):
     Returns:
         np.array: Frame avec les zones dessinées
     """
+    if isinstance(zones, ZoneMap):
+        return zones.draw(frame, color, thickness)
+
     for zone in zones:
         if len(zone) == 4 and not isinstance(zone[0], (list, tuple)):
             # Rectangle [x1, y1, x2, y2]
@@ -80,3 +92,220 @@ def draw_zones(frame, zones, color=(0, 0, 255), thickness=2):
             cv2.polylines(frame, [pts], isClosed=True, color=color, thickness=thickness)
     
     return frame
+
+
+def _is_rectangle(zone):
+    """Vrai pour une zone rectangulaire [x1, y1, x2, y2]."""
+    return len(zone) == 4 and not isinstance(zone[0], (list, tuple))
+
+
+def _polygon_edges(polygon):
+    """Côtés d'un polygone (M, 2), précalculés pour points_in_polygon."""
+    polygon = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+    xi, yi = polygon[:, 0], polygon[:, 1]
+    xj, yj = np.roll(xi, 1), np.roll(yi, 1)
+    dy = np.where(yj == yi, 1.0, yj - yi)
+    return (xi, yi, xj, yj, (xj - xi) / dy,
+            np.minimum(xi, xj), np.maximum(xi, xj), np.minimum(yi, yj), np.maximum(yi, yj))
+
+
+def points_in_polygon(points, polygon):
+    """
+    Version vectorisée de is_point_in_polygon pour plusieurs points
+    (ray casting, bord inclus comme cv2.pointPolygonTest).
+
+    Args:
+        points (np.array): Points (N, 2)
+        polygon (np.array|tuple): Sommets du polygone (M, 2), ou ses côtés
+                                  précalculés par _polygon_edges
+
+    Returns:
+        np.array: Booléen par point
+    """
+    xi, yi, xj, yj, slope, x_lo, x_hi, y_lo, y_hi = (
+        polygon if isinstance(polygon, tuple) else _polygon_edges(polygon))
+    px, py = points[:, 0:1], points[:, 1:2]
+
+    # Nombre de croisements d'une demi-droite horizontale partant du point
+    crosses = (yi > py) != (yj > py)
+    inside = np.count_nonzero(crosses & (px < slope * (py - yi) + xi), axis=1) % 2 == 1
+
+    # Points sur un côté du polygone
+    cross = (xj - xi) * (py - yi) - (yj - yi) * (px - xi)
+    on_edge = (np.abs(cross) < 1e-6) & (px >= x_lo) & (px <= x_hi) & (py >= y_lo) & (py <= y_hi)
+    return inside | on_edge.any(axis=1)
+
+
+class ZoneMap:
+    """
+    Zones d'alerte d'une caméra, compilées une fois.
+
+    `locate` renvoie pour chaque point l'indice de la première zone qui le
+    contient (-1 si aucune), dans le même ordre que la liste des zones :
+    - avec `size`, un masque d'étiquettes à la résolution de la frame
+      (0 = hors zone, i + 1 = zone i) donne la réponse en O(1) par point,
+      à un pixel près sur les bords des zones ;
+    - sinon (ou avec exact=True), les rectangles et polygones sont testés
+      de façon vectorisée sur les coordonnées exactes.
+    Le tracé des zones est rendu une fois par taille de frame puis recopié.
+    """
+
+    def __init__(self, zones, size=None, exact=False):
+        """
+        Args:
+            zones (list): Zones rectangulaires ou polygonales (voir is_in_zone)
+            size (tuple): (largeur, hauteur) des frames, None pour le test exact seulement
+            exact (bool): Toujours utiliser le test exact (pas de masque)
+        """
+        self.zones = list(zones)
+        self.size = size
+        # Zones prêtes pour le test exact, de la dernière à la première
+        # (la première zone qui contient un point l'emporte)
+        self._compiled = [
+            (i, tuple(float(v) for v in zone) if _is_rectangle(zone) else _polygon_edges(zone))
+            for i, zone in reversed(list(enumerate(self.zones)))
+        ]
+        self.mask = None
+        if size is not None and not exact and self.zones:
+            self.mask = self._rasterize(size)
+        self._overlays = {}  # (taille de frame, couleur, épaisseur) -> tracé pré-rendu
+
+    def __len__(self):
+        return len(self.zones)
+
+    def _rasterize(self, size):
+        """Masque d'étiquettes (hauteur, largeur) ; la première zone l'emporte."""
+        width, height = size
+        mask = np.zeros((height, width), dtype=np.uint8 if len(self.zones) < 255 else np.uint16)
+        # Tracé dans l'ordre inverse : les premières zones recouvrent les suivantes
+        for i, zone in reversed(list(enumerate(self.zones))):
+            if _is_rectangle(zone):
+                x1, y1, x2, y2 = (int(v) for v in zone)
+                mask[max(y1 + 1, 0):max(y2, 0), max(x1 + 1, 0):max(x2, 0)] = i + 1
+            else:
+                cv2.fillPoly(mask, [np.asarray(zone, dtype=np.int32)], i + 1)
+        return mask
+
+    def locate_exact(self, points):
+        """
+        Test exact (vectorisé) des points.
+
+        Args:
+            points (array): Points (N, 2) en coordonnées pleine résolution
+
+        Returns:
+            np.array: Indice de la zone de chaque point (-1 si aucune)
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        hits = np.full(len(points), -1, dtype=np.int32)
+        if not len(points):
+            return hits
+        for i, zone in self._compiled:
+            if len(zone) == 4:
+                x1, y1, x2, y2 = zone
+                inside = ((x1 < points[:, 0]) & (points[:, 0] < x2)
+                          & (y1 < points[:, 1]) & (points[:, 1] < y2))
+            else:
+                inside = points_in_polygon(points, zone)
+            hits[inside] = i
+        return hits
+
+    def locate(self, points):
+        """
+        Zone de chaque point (tous les centres d'une frame en un appel).
+
+        Args:
+            points (array): Points (N, 2) en coordonnées pleine résolution
+
+        Returns:
+            np.array: Indice de la zone de chaque point (-1 si aucune)
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if self.mask is None:
+            return self.locate_exact(points)
+
+        height, width = self.mask.shape
+        cols = np.floor(points[:, 0]).astype(np.int64)
+        rows = np.floor(points[:, 1]).astype(np.int64)
+        in_frame = (cols >= 0) & (cols < width) & (rows >= 0) & (rows < height)
+        hits = np.full(len(points), -1, dtype=np.int32)
+        hits[in_frame] = self.mask[rows[in_frame], cols[in_frame]].astype(np.int32) - 1
+        if not in_frame.all():
+            # Points hors de la frame : test exact
+            hits[~in_frame] = self.locate_exact(points[~in_frame])
+        return hits
+
+    def contains(self, points):
+        """Booléen par point : True si le point est dans une zone."""
+        return self.locate(points) >= 0
+
+    def coverage(self, size):
+        """
+        Masque booléen des pixels couverts par une zone, redimensionné.
+
+        Args:
+            size (tuple): (largeur, hauteur) du masque
+
+        Returns:
+            np.array: Masque (hauteur, largeur)
+        """
+        if not self.zones or self.size is None:
+            return np.zeros((size[1], size[0]), dtype=bool)
+        full = self.mask if self.mask is not None else self._rasterize(self.size)
+        return cv2.resize((full > 0).astype(np.uint8), size, interpolation=cv2.INTER_NEAREST) > 0
+
+    def draw(self, frame, color=(0, 0, 255), thickness=2):
+        """
+        Dessine les zones sur une frame à partir du tracé pré-rendu.
+
+        La frame peut être réduite (vidéo annotée à l'échelle) : le tracé est
+        rendu une fois par taille de frame, à l'échelle correspondante.
+
+        Returns:
+            np.array: Frame avec les zones dessinées
+        """
+        if not self.zones:
+            return frame
+        key = (frame.shape, tuple(color), thickness)
+        if key not in self._overlays:
+            self._overlays[key] = self._render(frame.shape, color, thickness)
+        overlay = self._overlays[key]
+        if overlay is not None:
+            (y0, y1, x0, x1), image, mask = overlay
+            # Copie masquée (SIMD) limitée au rectangle englobant des zones
+            cv2.copyTo(image, mask, frame[y0:y1, x0:x1])
+        return frame
+
+    def _render(self, shape, color, thickness):
+        """Rend le tracé des zones pour une taille de frame : (rectangle englobant, image, masque)."""
+        scale = shape[1] / self.size[0] if self.size else 1.0
+        mask = np.zeros(shape[:2], dtype=np.uint8)
+        for zone in self.zones:
+            if _is_rectangle(zone):
+                x1, y1, x2, y2 = (int(v * scale) for v in zone)
+                cv2.rectangle(mask, (x1, y1), (x2, y2), 255, thickness)
+            else:
+                pts = (np.asarray(zone, dtype=np.float64) * scale).astype(np.int32)
+                cv2.polylines(mask, [pts], isClosed=True, color=255, thickness=thickness)
+        rows, cols = np.nonzero(mask)
+        if not len(rows):
+            return None
+        y0, y1, x0, x1 = rows.min(), rows.max() + 1, cols.min(), cols.max() + 1
+        mask = np.ascontiguousarray(mask[y0:y1, x0:x1])
+        image = np.zeros(mask.shape + shape[2:], dtype=np.uint8)
+        image[mask > 0] = color
+        return (y0, y1, x0, x1), image, mask
+
+
+def compile_zones(zones, size=None):
+    """
+    Compile les zones d'une caméra (voir ZoneMap).
+
+    Args:
+        zones (list): Zones rectangulaires ou polygonales
+        size (tuple): (largeur, hauteur) des frames de la caméra
+
+    Returns:
+        ZoneMap: Zones compilées
+    """
+    return ZoneMap(zones, size, exact=config.ZONE_LOOKUP == 'exact')
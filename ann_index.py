@@ -0,0 +1,393 @@
+"""
+Module d'index de recherche pour la galerie des tracks globaux.
+Fournit des backends interchangeables derrière la même API (add / remove / search) :
+
+- ExactIndex : recherche linéaire exacte (référence) ;
+- IVFIndex : index approximatif de type IVF (quantificateur grossier par k-means
+  sphérique), en NumPy pur. Seules les n_probe listes les plus proches de la
+  requête sont parcourues : n_probe est le compromis rappel/vitesse ;
+- PartitionedIndex : un index (exact ou IVF) par partition de classe de la
+  galerie, pour ne chercher que parmi les identités de la classe détectée.
+
+Chaque processus garde son propre index et le synchronise de façon incrémentale
+avec la galerie partagée (voir SharedGallery.changes_since).
+"""
+
+from functools import partial
+
+import numpy as np
+
+
+class _VectorStore:
+    """
+    Stockage compact de vecteurs indexés par ID (suppression par échange avec la dernière ligne).
+    """
+
+    def __init__(self, dim, initial_capacity=64):
+        self.ids = np.empty(initial_capacity, dtype=np.int64)
+        self.vectors = np.empty((initial_capacity, dim), dtype=np.float32)
+        self.size = 0
+        self._rows = {}  # gid -> ligne
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, gid):
+        return gid in self._rows
+
+    def upsert(self, gid, vector):
+        """Ajoute ou remplace le vecteur d'un ID."""
+        row = self._rows.get(gid)
+        if row is None:
+            if self.size == len(self.ids):
+                # Doubler la capacité (coût amorti constant)
+                self.ids = np.resize(self.ids, 2 * len(self.ids))
+                self.vectors = np.resize(self.vectors, (2 * len(self.vectors), self.vectors.shape[1]))
+            row = self.size
+            self.size += 1
+            self._rows[gid] = row
+            self.ids[row] = gid
+        self.vectors[row] = vector
+
+    def remove(self, gid):
+        """Retire un ID (sans effet s'il est absent)."""
+        row = self._rows.pop(gid, None)
+        if row is None:
+            return
+        last = self.size - 1
+        if row != last:
+            moved = int(self.ids[last])
+            self.ids[row] = moved
+            self.vectors[row] = self.vectors[last]
+            self._rows[moved] = row
+        self.size = last
+
+    def view(self):
+        """Renvoie (ids, vecteurs) des lignes utilisées."""
+        return self.ids[:self.size], self.vectors[:self.size]
+
+
+class GalleryIndex:
+    """
+    Base commune des index : synchronisation incrémentale avec la galerie partagée.
+    Les sous-classes implémentent add(), remove(), search() et __len__().
+    """
+
+    def __init__(self):
+        self._synced_tick = 0
+        self._synced_removed = 0
+
+    def sync(self, gallery):
+        """
+        Applique à l'index les ajouts, mises à jour et retraits de la galerie
+        depuis la synchronisation précédente.
+
+        Args:
+            gallery (SharedGallery): Galerie partagée des tracks globaux
+        """
+        changes = gallery.changes_since(self._synced_tick, self._synced_removed)
+        if len(changes['ids']):
+            self._add_changes(changes)
+        if changes['all_ids'] is not None:
+            # Journal des retraits dépassé : retirer tout ce qui n'est plus dans la galerie
+            self.remove(np.setdiff1d(self.indexed_ids(), changes['all_ids']))
+        elif len(changes['removed_ids']):
+            self.remove(changes['removed_ids'])
+        self._synced_tick = changes['tick']
+        self._synced_removed = changes['removed']
+
+    def _add_changes(self, changes):
+        """Applique les ajouts et mises à jour renvoyés par SharedGallery.changes_since."""
+        self.add(changes['ids'], changes['embeddings'])
+
+    def add(self, ids, vectors):
+        """Ajoute ou met à jour des vecteurs (normalisés L2)."""
+        raise NotImplementedError
+
+    def remove(self, ids):
+        """Retire des IDs de l'index."""
+        raise NotImplementedError
+
+    def indexed_ids(self):
+        """Renvoie les IDs présents dans l'index."""
+        raise NotImplementedError
+
+    def search(self, queries):
+        """
+        Cherche le plus proche voisin (similarité cosinus) de chaque requête.
+
+        Args:
+            queries (np.array): Requêtes normalisées (n, dim)
+
+        Returns:
+            tuple: (ids, sims) - int64 (n,) avec -1 si l'index est vide, float32 (n,)
+        """
+        raise NotImplementedError
+
+
+def _best_of(queries, ids, vectors):
+    """Plus proche voisin exact de chaque requête parmi (ids, vectors)."""
+    n = len(queries)
+    if len(ids) == 0:
+        return np.full(n, -1, dtype=np.int64), np.full(n, -1.0, dtype=np.float32)
+    sims = queries @ vectors.T
+    best = np.argmax(sims, axis=1)
+    return ids[best], sims[np.arange(n), best]
+
+
+class ExactIndex(GalleryIndex):
+    """Recherche exacte par produit matriciel sur toute la galerie (référence)."""
+
+    def __init__(self, dim):
+        super().__init__()
+        self._store = _VectorStore(dim)
+
+    def __len__(self):
+        return len(self._store)
+
+    def add(self, ids, vectors):
+        for gid, vec in zip(np.asarray(ids).tolist(), vectors):
+            self._store.upsert(gid, vec)
+
+    def remove(self, ids):
+        for gid in np.asarray(ids).tolist():
+            self._store.remove(gid)
+
+    def indexed_ids(self):
+        return self._store.view()[0].copy()
+
+    def search(self, queries):
+        return _best_of(queries, *self._store.view())
+
+
+class IVFIndex(GalleryIndex):
+    """
+    Index IVF : les vecteurs sont répartis en n_lists listes autour de centroïdes
+    appris par k-means sphérique ; une requête ne parcourt que ses n_probe listes
+    les plus proches.
+
+    Tant que l'index contient moins de train_size vecteurs, la recherche reste
+    exacte. Les centroïdes sont réappris quand la taille de l'index a doublé
+    depuis le dernier apprentissage.
+    """
+
+    def __init__(self, dim, n_lists=256, n_probe=8, train_size=None, kmeans_iters=10, seed=0):
+        """
+        Args:
+            dim (int): Dimension des embeddings
+            n_lists (int): Nombre de listes (centroïdes)
+            n_probe (int): Nombre de listes parcourues par requête (rappel/vitesse)
+            train_size (int): Taille minimale avant apprentissage (défaut : 16 * n_lists)
+            kmeans_iters (int): Nombre d'itérations du k-means
+            seed (int): Graine aléatoire du k-means
+        """
+        super().__init__()
+        self.dim = dim
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.train_size = train_size if train_size is not None else 16 * n_lists
+        self.kmeans_iters = kmeans_iters
+        self._rng = np.random.default_rng(seed)
+
+        self.centroids = None
+        self._lists = []
+        self._list_of = {}  # gid -> index de liste
+        self._pending = _VectorStore(dim)  # Vecteurs avant le premier apprentissage
+        self._trained_size = 0
+
+    def __len__(self):
+        return len(self._list_of) if self.centroids is not None else len(self._pending)
+
+    def add(self, ids, vectors):
+        ids = np.asarray(ids)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.centroids is None:
+            for gid, vec in zip(ids.tolist(), vectors):
+                self._pending.upsert(gid, vec)
+            if len(self._pending) >= self.train_size:
+                self._train(*self._pending.view())
+                self._pending = _VectorStore(self.dim)
+            return
+
+        assign = np.argmax(vectors @ self.centroids.T, axis=1)
+        for gid, vec, lst in zip(ids.tolist(), vectors, assign.tolist()):
+            old = self._list_of.get(gid)
+            if old is not None and old != lst:
+                self._lists[old].remove(gid)
+            self._lists[lst].upsert(gid, vec)
+            self._list_of[gid] = lst
+
+        if len(self._list_of) >= 2 * self._trained_size:
+            self._train(*self._all_vectors())
+
+    def remove(self, ids):
+        for gid in np.asarray(ids).tolist():
+            if self.centroids is None:
+                self._pending.remove(gid)
+            else:
+                lst = self._list_of.pop(gid, None)
+                if lst is not None:
+                    self._lists[lst].remove(gid)
+
+    def indexed_ids(self):
+        if self.centroids is None:
+            return self._pending.view()[0].copy()
+        return np.fromiter(self._list_of.keys(), dtype=np.int64, count=len(self._list_of))
+
+    def _all_vectors(self):
+        """Concatène tous les vecteurs des listes."""
+        views = [lst.view() for lst in self._lists]
+        return np.concatenate([v[0] for v in views]), np.concatenate([v[1] for v in views])
+
+    def _train(self, ids, vectors):
+        """Apprend les centroïdes (k-means sphérique) et répartit les vecteurs."""
+        ids = ids.copy()
+        vectors = vectors.copy()
+        n_lists = min(self.n_lists, len(vectors))
+        sample = vectors
+        if len(vectors) > 64 * n_lists:
+            sample = vectors[self._rng.choice(len(vectors), 64 * n_lists, replace=False)]
+
+        centroids = sample[self._rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(self.kmeans_iters):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            # Réinitialiser les centroïdes vides sur des points aléatoires
+            sums[empty] = sample[self._rng.choice(len(sample), int(empty.sum()))]
+            norms[empty] = 1.0
+            centroids = sums / norms
+
+        self.centroids = centroids.astype(np.float32)
+        self._lists = [_VectorStore(self.dim) for _ in range(n_lists)]
+        self._list_of = {}
+        assign = np.argmax(vectors @ self.centroids.T, axis=1)
+        for gid, vec, lst in zip(ids.tolist(), vectors, assign.tolist()):
+            self._lists[lst].upsert(gid, vec)
+            self._list_of[gid] = lst
+        self._trained_size = len(ids)
+
+    def search(self, queries):
+        if self.centroids is None:
+            return _best_of(queries, *self._pending.view())
+
+        n = len(queries)
+        best_ids = np.full(n, -1, dtype=np.int64)
+        best_sims = np.full(n, -1.0, dtype=np.float32)
+        n_probe = min(self.n_probe, len(self._lists))
+        coarse = queries @ self.centroids.T
+        probes = np.argpartition(-coarse, n_probe - 1, axis=1)[:, :n_probe]
+        for q, probe in enumerate(probes):
+            # Parcourir les listes sondées sans les concaténer (pas de copie)
+            for lst in probe:
+                ids, vectors = self._lists[lst].view()
+                if len(ids) == 0:
+                    continue
+                sims = vectors @ queries[q]
+                best = int(np.argmax(sims))
+                if sims[best] > best_sims[q]:
+                    best_ids[q] = ids[best]
+                    best_sims[q] = sims[best]
+        return best_ids, best_sims
+
+
+class PartitionedIndex(GalleryIndex):
+    """
+    Un sous-index par partition de classe de la galerie (code de classe,
+    -1 = sans classe ; voir SharedGallery.class_code). Une recherche limitée à
+    une classe ne parcourt que son sous-index ; sans classe, les meilleurs
+    résultats de tous les sous-index sont combinés.
+    """
+
+    def __init__(self, factory):
+        """
+        Args:
+            factory (callable): Construit un sous-index vide, ex: partial(make_index, 'ivf', dim)
+        """
+        super().__init__()
+        self._factory = factory
+        self._parts = {}  # code de classe -> sous-index
+        self._part_of = {}  # gid -> code de classe
+
+    def __len__(self):
+        return sum(len(part) for part in self._parts.values())
+
+    def partition_size(self, class_code):
+        """Nombre d'identités indexées d'une classe."""
+        part = self._parts.get(class_code)
+        return 0 if part is None else len(part)
+
+    def _add_changes(self, changes):
+        self.add(changes['ids'], changes['embeddings'], changes['class_codes'])
+
+    def add(self, ids, vectors, class_codes=None):
+        ids = np.asarray(ids)
+        class_codes = np.full(len(ids), -1) if class_codes is None else np.asarray(class_codes)
+        for code in np.unique(class_codes).tolist():
+            mask = class_codes == code
+            part_ids = ids[mask]
+            # Identité changée de classe : la retirer de son ancien sous-index
+            self.remove([gid for gid in part_ids.tolist() if self._part_of.get(gid, code) != code])
+            part = self._parts.get(code)
+            if part is None:
+                part = self._parts[code] = self._factory()
+            part.add(part_ids, np.asarray(vectors)[mask])
+            self._part_of.update(dict.fromkeys(part_ids.tolist(), code))
+
+    def remove(self, ids):
+        groups = {}
+        for gid in np.asarray(ids).tolist():
+            code = self._part_of.pop(gid, None)
+            if code is not None:
+                groups.setdefault(code, []).append(gid)
+        for code, gids in groups.items():
+            self._parts[code].remove(gids)
+
+    def indexed_ids(self):
+        return np.fromiter(self._part_of.keys(), dtype=np.int64, count=len(self._part_of))
+
+    def search(self, queries, class_code=None):
+        """
+        Comme GalleryIndex.search, limité à une classe si `class_code` est
+        donné (None = toutes les classes).
+        """
+        if class_code is not None:
+            part = self._parts.get(class_code)
+            if part is None:
+                return _best_of(queries, np.empty(0, dtype=np.int64), None)
+            return part.search(queries)
+
+        n = len(queries)
+        best_ids = np.full(n, -1, dtype=np.int64)
+        best_sims = np.full(n, -1.0, dtype=np.float32)
+        for part in self._parts.values():
+            ids, sims = part.search(queries)
+            better = (ids >= 0) & (sims > best_sims)
+            best_ids[better] = ids[better]
+            best_sims[better] = sims[better]
+        return best_ids, best_sims
+
+
+def make_index(backend, dim, partitioned=False, **params):
+    """
+    Construit un index de recherche.
+
+    Args:
+        backend (str): 'exact' ou 'ivf'
+        dim (int): Dimension des embeddings
+        partitioned (bool): Un sous-index par partition de classe (PartitionedIndex)
+        **params: Paramètres propres au backend (n_lists, n_probe, ...)
+
+    Returns:
+        GalleryIndex: Index vide
+    """
+    if partitioned:
+        make_index(backend, dim, **params)  # Vérifie le backend dès la construction
+        return PartitionedIndex(partial(make_index, backend, dim, **params))
+    if backend == 'exact':
+        return ExactIndex(dim)
+    if backend == 'ivf':
+        return IVFIndex(dim, **params)
+    raise ValueError(f"Backend d'index inconnu: {backend} (attendu: 'exact' ou 'ivf')")
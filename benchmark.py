@@ -0,0 +1,503 @@
+"""
+Suite de benchmarks hors ligne (CPU, sans modèle ni téléchargement).
+
+Génère des données synthétiques (vidéo avec des boîtes en mouvement,
+galeries d'embeddings, zones d'alerte, trajectoires) et mesure les
+étapes du traitement qui ne dépendent pas de YOLO :
+- matching : tracking.find_best_match et tracking.assign_global_ids, avec
+  et sans topologie des caméras ;
+- galerie : mémoire par identité et précision du matching selon le stockage
+  des embeddings (float32, float16, int8) ;
+- zones : alerts.is_in_zone (liste brute et ZoneMap), alerts.draw_zones ;
+- vidéo : décodage, zones et annotation d'une vidéo synthétique, porte de mouvement ;
+- écriture des trajectoires (CSV, NPZ, Parquet si pyarrow est installé) ;
+- summary.generate_object_summary (fichiers d'état et relecture des trajectoires).
+
+Les résultats sont écrits en JSON et peuvent être comparés à ceux d'un
+autre commit pour détecter les régressions.
+
+Usage:
+    python benchmark.py --json avant.json
+    python benchmark.py --json apres.json --compare avant.json
+    python benchmark.py --quick --only zones matching
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+import alerts
+import tracking
+from benchmark_index import synthetic_gallery, noisy_queries
+from gallery import EMBEDDING_DTYPES, SharedGallery
+from motion import MotionGate
+from summary import SummaryAccumulator, generate_object_summary
+from topology import CameraGraph
+from trajectory import open_trajectory_sink
+from video_writer import Annotation, draw_annotations
+from zone_events import ZoneEventEngine
+
+CLASS_NAMES = ['person', 'car', 'bicycle', 'backpack', 'handbag']
+
+# Tailles par défaut et en mode rapide (--quick)
+DEFAULTS = {
+    'gallery_sizes': [1000, 10000, 50000],
+    'dim': 256,
+    'dets_per_frame': 20,
+    'n_zones': 8,
+    'frame_size': (1280, 720),
+    'video_frames': 300,
+    'trajectory_rows': 200000,
+    'summary_videos': 8,
+}
+# Mesures de qualité affichées avec les temps (benchmark 'gallery')
+QUALITY_KEYS = ('bytes_per_track', 'top1_agreement', 'max_sim_error', 'candidates_per_query')
+QUICK = dict(DEFAULTS, gallery_sizes=[1000, 10000], video_frames=60, trajectory_rows=20000, summary_videos=3)
+
+
+def measure(fn, repeats=5, number=1):
+    """
+    Chronomètre une fonction.
+
+    Args:
+        fn (callable): Fonction sans argument à mesurer
+        repeats (int): Nombre de mesures
+        number (int): Appels par mesure
+
+    Returns:
+        dict: Temps par appel en ms (médiane, minimum, maximum)
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append(1000.0 * (time.perf_counter() - start) / number)
+    return {'ms': float(np.median(times)), 'ms_min': float(min(times)), 'ms_max': float(max(times))}
+
+
+# --- Données synthétiques ---
+
+def synthetic_zones(n_zones, frame_size, seed=0):
+    """
+    Génère des zones d'alerte : moitié rectangles, moitié polygones.
+
+    Returns:
+        list: Zones au format de config.ALERT_ZONES
+    """
+    rng = np.random.default_rng(seed)
+    width, height = frame_size
+    zones = []
+    for i in range(n_zones):
+        cx, cy = rng.uniform(0.15, 0.85) * width, rng.uniform(0.15, 0.85) * height
+        rx, ry = rng.uniform(0.05, 0.15) * width, rng.uniform(0.05, 0.15) * height
+        if i % 2 == 0:
+            zones.append([int(cx - rx), int(cy - ry), int(cx + rx), int(cy + ry)])
+        else:
+            angles = np.sort(rng.uniform(0, 2 * np.pi, 6))
+            zones.append([(int(cx + rx * np.cos(a)), int(cy + ry * np.sin(a))) for a in angles])
+    return zones
+
+
+class MovingBoxes:
+    """Objets synthétiques qui se déplacent en rebondissant sur les bords de l'image."""
+
+    def __init__(self, n_objects, frame_size, seed=0):
+        rng = np.random.default_rng(seed)
+        self.width, self.height = frame_size
+        self.pos = rng.uniform(0, 1, (n_objects, 2)) * frame_size
+        self.vel = rng.uniform(-8, 8, (n_objects, 2))
+        self.size = rng.uniform(30, 120, (n_objects, 2))
+        self.classes = rng.integers(0, len(CLASS_NAMES), n_objects)
+
+    def step(self):
+        """Avance d'une frame et renvoie les boîtes (N, 4) au format (x, y, w, h) centré."""
+        self.pos += self.vel
+        for axis, limit in ((0, self.width), (1, self.height)):
+            out = (self.pos[:, axis] < 0) | (self.pos[:, axis] > limit)
+            self.vel[out, axis] *= -1
+            self.pos[:, axis] = np.clip(self.pos[:, axis], 0, limit)
+        return np.hstack([self.pos, self.size])
+
+
+def synthetic_video(path, n_frames, frame_size, n_objects, seed=0):
+    """
+    Écrit une vidéo synthétique : fond bruité et rectangles en mouvement.
+
+    Returns:
+        list: Boîtes (x, y, w, h) de chaque frame
+    """
+    rng = np.random.default_rng(seed)
+    width, height = frame_size
+    background = rng.integers(0, 60, (height, width, 3), dtype=np.uint8)
+    boxes = MovingBoxes(n_objects, frame_size, seed)
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 25, frame_size)
+    all_boxes = []
+    for _ in range(n_frames):
+        frame = background.copy()
+        frame_boxes = boxes.step()
+        for (x, y, w, h), cls in zip(frame_boxes, boxes.classes):
+            color = (int(80 + 30 * cls), 200, int(255 - 30 * cls))
+            cv2.rectangle(frame, (int(x - w / 2), int(y - h / 2)), (int(x + w / 2), int(y + h / 2)), color, -1)
+        out.write(frame)
+        all_boxes.append(frame_boxes.copy())
+    out.release()
+    return all_boxes
+
+
+def synthetic_rows(n_rows, n_ids=500, seed=0):
+    """
+    Génère des lignes de trajectoires (frame, id, classe, x, y, alerte).
+
+    Returns:
+        tuple: Colonnes numpy
+    """
+    rng = np.random.default_rng(seed)
+    frames = np.sort(rng.integers(0, max(1, n_rows // 10), n_rows))
+    ids = rng.integers(1, n_ids + 1, n_rows)
+    classes = [CLASS_NAMES[c] for c in ids % len(CLASS_NAMES)]
+    xs, ys = rng.uniform(0, 1280, n_rows), rng.uniform(0, 720, n_rows)
+    alerts_col = rng.random(n_rows) < 0.05
+    return frames, ids, classes, xs, ys, alerts_col
+
+
+# --- Benchmarks ---
+
+def bench_matching(params):
+    """Recherche du meilleur match (une requête, puis une frame) dans des galeries de tailles croissantes."""
+    results = {}
+    dim, n_dets = params['dim'], params['dets_per_frame']
+    for size in params['gallery_sizes']:
+        ids, embeddings = synthetic_gallery(size, dim)
+        queries = noisy_queries(embeddings, n_dets)
+        gallery = SharedGallery.create(size + n_dets * 10, dim)
+        # Identités réparties sur 8 caméras en ligne, vues au cours des 10 dernières minutes
+        rng = np.random.default_rng(0)
+        cameras, times = rng.integers(0, 8, size), rng.uniform(0.0, 600.0, size)
+        graph = CameraGraph({(f'cam{i}.mp4', f'cam{i + 1}.mp4'): (2.0, 60.0) for i in range(7)})
+        # Scène surtout composée de personnes, avec de nombreux petits objets
+        classes = [CLASS_NAMES[c] for c in rng.choice(len(CLASS_NAMES), size, p=[0.6, 0.1, 0.1, 0.1, 0.1])]
+        query_classes = ['person'] * n_dets
+        try:
+            with gallery.writing():
+                for embedding, camera, timestamp, class_name in zip(embeddings, cameras, times, classes):
+                    gallery.append(embedding, (0.0, 0.0), f'cam{camera}.mp4', timestamp, class_name=class_name)
+            results[f'find_best_match/{size}'] = measure(
+                lambda: tracking.find_best_match(queries[0], gallery), repeats=7, number=10)
+            results[f'search_frame/{size}'] = measure(
+                lambda: tracking.search_gallery(gallery, list(queries)), repeats=7, number=5)
+            results[f'search_frame_topology/{size}'] = measure(
+                lambda: tracking.search_gallery(gallery, list(queries), None, 'cam3.mp4', 600.0, graph),
+                repeats=7, number=5)
+            results[f'search_frame_topology/{size}']['candidates_per_query'] = graph.stats()['candidates_per_query']
+            results[f'search_frame_classes/{size}'] = measure(
+                lambda: tracking.search_gallery(gallery, list(queries), classes=query_classes), repeats=7, number=5)
+            results[f'search_frame_classes/{size}']['candidates_per_query'] = classes.count('person')
+            positions = [(100.0, 100.0)] * n_dets
+            results[f'assign_global_ids/{size}'] = measure(
+                lambda: tracking.assign_global_ids(gallery, list(queries), positions, 'bench.mp4'),
+                repeats=5, number=5)
+            for key in (f'search_frame/{size}', f'search_frame_topology/{size}', f'search_frame_classes/{size}',
+                        f'assign_global_ids/{size}'):
+                results[key]['dets'] = n_dets
+        finally:
+            gallery.close()
+            gallery.unlink()
+    return results
+
+
+def bench_gallery(params):
+    """
+    Stockage compact de la galerie : pour chaque type d'embedding, octets par
+    identité, temps de recherche d'une frame et accord du meilleur match avec
+    le stockage float32 (même galerie, mêmes requêtes bruitées).
+    """
+    results = {}
+    dim, n_dets = params['dim'], params['dets_per_frame']
+    for size in params['gallery_sizes']:
+        ids, embeddings = synthetic_gallery(size, dim)
+        queries = noisy_queries(embeddings, 1000)
+        truth = tracking.normalize_embeddings(queries) @ embeddings.T
+        true_ids, true_sims = ids[np.argmax(truth, axis=1)], truth.max(axis=1)
+        for dtype in EMBEDDING_DTYPES:
+            gallery = SharedGallery.create(size, dim, dtype=dtype)
+            try:
+                with gallery.writing():
+                    for embedding in embeddings:
+                        gallery.append(embedding, (0.0, 0.0), 'bench.mp4')
+                result = measure(lambda: tracking.search_gallery(gallery, queries[:n_dets]), repeats=7, number=5)
+                best_ids, best_sims = tracking.search_gallery(gallery, queries)
+                result.update({
+                    'dets': n_dets,
+                    'bytes_per_track': gallery.memory_per_track(),
+                    'top1_agreement': float(np.mean(np.asarray(best_ids) == true_ids)),
+                    'max_sim_error': float(np.max(np.abs(np.asarray(best_sims) - true_sims))),
+                })
+                results[f'{dtype}/{size}'] = result
+            finally:
+                gallery.close()
+                gallery.unlink()
+    return results
+
+
+def bench_zones(params):
+    """Test des centres d'une frame dans les zones et tracé des zones."""
+    frame_size, n_dets = params['frame_size'], params['dets_per_frame']
+    zones = synthetic_zones(params['n_zones'], frame_size)
+    boxes = MovingBoxes(n_dets, frame_size).step()
+    zone_map = alerts.ZoneMap(zones, frame_size)
+    exact_map = alerts.ZoneMap(zones, frame_size, exact=True)
+    frame = np.zeros((frame_size[1], frame_size[0], 3), dtype=np.uint8)
+
+    results = {
+        'is_in_zone/list': measure(lambda: [alerts.is_in_zone(box, zones) for box in boxes], number=50),
+        'is_in_zone/zone_map': measure(lambda: [alerts.is_in_zone(box, zone_map) for box in boxes], number=50),
+        'locate/mask': measure(lambda: zone_map.locate(boxes[:, :2]), number=200),
+        'locate/exact': measure(lambda: exact_map.locate(boxes[:, :2]), number=200),
+        'compile': measure(lambda: alerts.ZoneMap(zones, frame_size), number=5),
+        'draw_zones/list': measure(lambda: alerts.draw_zones(frame, zones), number=50),
+        'draw_zones/zone_map': measure(lambda: alerts.draw_zones(frame, zone_map), number=50),
+    }
+    for key in ('is_in_zone/list', 'is_in_zone/zone_map', 'locate/mask', 'locate/exact'):
+        results[key]['points'] = n_dets
+    return results
+
+
+def bench_video(params, workdir):
+    """Décodage d'une vidéo synthétique, zones, événements et annotation, par frame."""
+    frame_size, n_frames = params['frame_size'], params['video_frames']
+    path = os.path.join(workdir, 'synthetic.mp4')
+    all_boxes = synthetic_video(path, n_frames, frame_size, params['dets_per_frame'])
+    zone_map = alerts.ZoneMap(synthetic_zones(params['n_zones'], frame_size), frame_size)
+
+    def run(annotate):
+        cap = cv2.VideoCapture(path)
+        events = ZoneEventEngine()
+        frame_idx = 0
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            boxes = all_boxes[frame_idx]
+            hits = zone_map.locate(boxes[:, :2])
+            events.update(frame_idx, frame_idx / 25.0,
+                          [(gid, int(z), 'person') for gid, z in enumerate(hits) if z >= 0])
+            if annotate:
+                annotations = [Annotation(x - w / 2, y - h / 2, x + w / 2, y + h / 2, x, y, gid, z >= 0, False)
+                               for gid, ((x, y, w, h), z) in enumerate(zip(boxes, hits))]
+                draw_annotations(frame, zone_map, annotations)
+            frame_idx += 1
+        cap.release()
+        return frame_idx
+
+    results = {}
+    for name, annotate in (('decode_zones', False), ('decode_zones_annotate', True)):
+        start = time.perf_counter()
+        frames = run(annotate)
+        elapsed = time.perf_counter() - start
+        results[name] = {'ms': 1000.0 * elapsed / max(frames, 1), 'frames': frames, 'unit': 'frame'}
+
+    # Porte de mouvement seule (décodage exclu)
+    gate = MotionGate(frame_size, zone_map)
+    cap = cv2.VideoCapture(path)
+    elapsed = 0.0
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        start = time.perf_counter()
+        gate.check(frame)
+        elapsed += time.perf_counter() - start
+    cap.release()
+    results['motion_gate'] = {'ms': 1000.0 * elapsed / max(gate.frames, 1), 'frames': gate.frames,
+                              'skip_rate': gate.skip_rate(), 'unit': 'frame'}
+    return results
+
+
+def bench_trajectories(params, workdir):
+    """Écriture des trajectoires dans chaque format disponible."""
+    columns = synthetic_rows(params['trajectory_rows'])
+    formats = ['csv', 'npz']
+    try:
+        import pyarrow  # noqa: F401
+        formats.append('parquet')
+    except ImportError:
+        pass
+
+    results = {}
+    for fmt in formats:
+        folder = os.path.join(workdir, f'traj_{fmt}')
+        os.makedirs(folder, exist_ok=True)
+
+        def write():
+            with open_trajectory_sink(folder, 'bench.mp4', fmt) as sink:
+                for row in zip(*columns):
+                    sink.add(*row)
+            return sink.path
+
+        result = measure(write, repeats=3)
+        path = write()
+        result.update({
+            'rows': len(columns[0]),
+            'rows_per_s': len(columns[0]) / (result['ms'] / 1000.0),
+            'bytes': os.path.getsize(path),
+        })
+        results[f'write/{fmt}'] = result
+    return results
+
+
+def bench_summary(params, workdir):
+    """Génération du résumé à partir des fichiers d'état, puis en relisant les trajectoires."""
+    folder = os.path.join(workdir, 'summary')
+    os.makedirs(folder, exist_ok=True)
+    n_rows = params['trajectory_rows'] // params['summary_videos']
+    for v in range(params['summary_videos']):
+        video_name = f'camera_{v}.mp4'
+        frames, ids, classes, xs, ys, alerts_col = synthetic_rows(n_rows, seed=v)
+        acc = SummaryAccumulator(video_name)
+        with open_trajectory_sink(folder, video_name, 'csv') as sink:
+            for row in zip(frames, ids, classes, xs, ys, alerts_col):
+                sink.add(*row)
+                acc.add(row[2], int(row[1]), row[5])
+        acc.frames = int(frames[-1])
+        acc.save(folder)
+
+    results = {'generate/states': measure(lambda: generate_object_summary(folder, verbose=False), repeats=5)}
+    for name in os.listdir(folder):
+        if name.startswith('summary_state_'):
+            os.remove(os.path.join(folder, name))
+    results['generate/trajectories'] = measure(lambda: generate_object_summary(folder, verbose=False), repeats=3)
+    for result in results.values():
+        result.update({'videos': params['summary_videos'], 'rows': n_rows * params['summary_videos']})
+    return results
+
+
+BENCHMARKS = {
+    'matching': lambda params, workdir: bench_matching(params),
+    'gallery': lambda params, workdir: bench_gallery(params),
+    'zones': lambda params, workdir: bench_zones(params),
+    'video': bench_video,
+    'trajectories': bench_trajectories,
+    'summary': bench_summary,
+}
+
+
+def environment():
+    """Décrit la machine et le commit (pour comparer des résultats comparables)."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run_benchmarks(names, params):
+    """
+    Lance les benchmarks demandés dans un dossier temporaire.
+
+    Returns:
+        dict: {'environment': ..., 'params': ..., 'results': {benchmark/cas: mesures}}
+    """
+    workdir = tempfile.mkdtemp(prefix='benchmark_')
+    results = {}
+    try:
+        for name in names:
+            start = time.perf_counter()
+            for case, result in BENCHMARKS[name](params, workdir).items():
+                results[f'{name}/{case}'] = result
+                print(f"  {name}/{case:<40} {result['ms']:10.3f} ms"
+                      + ''.join(f"  {key}={result[key]:.4g}" for key in QUALITY_KEYS if key in result))
+            print(f"[{name}] {time.perf_counter() - start:.1f} s")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {'environment': environment(), 'params': params, 'results': results}
+
+
+def compare(current, baseline, threshold):
+    """
+    Compare deux séries de résultats et affiche les écarts.
+
+    Args:
+        current (dict): Résultats de run_benchmarks
+        baseline (dict): Résultats de référence (même format)
+        threshold (float): Ralentissement relatif considéré comme une régression (0.1 = +10 %)
+
+    Returns:
+        list: Cas en régression
+    """
+    print(f"\nComparaison avec {baseline['environment'].get('commit') or 'la référence'} "
+          f"(seuil +{threshold:.0%})")
+    regressions = []
+    for case, result in sorted(current['results'].items()):
+        reference = baseline['results'].get(case)
+        if reference is None:
+            print(f"  {case:<50} {result['ms']:10.3f} ms  (nouveau)")
+            continue
+        ratio = result['ms'] / reference['ms'] if reference['ms'] else float('inf')
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  RÉGRESSION'
+            regressions.append(case)
+        elif ratio < 1 / (1 + threshold):
+            flag = '  amélioration'
+        print(f"  {case:<50} {reference['ms']:10.3f} -> {result['ms']:10.3f} ms  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main():
+    """Point d'entrée : lit les arguments, lance les benchmarks, écrit et compare les résultats."""
+    parser = argparse.ArgumentParser(description="Benchmarks hors ligne du pipeline (CPU, données synthétiques)")
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS),
+                        help="Benchmarks à lancer (défaut : tous)")
+    parser.add_argument('--quick', action='store_true', help="Tailles réduites (vérification rapide)")
+    parser.add_argument('--gallery-sizes', type=int, nargs='+', help="Tailles des galeries d'embeddings")
+    parser.add_argument('--dim', type=int, help="Dimension des embeddings")
+    parser.add_argument('--zones', type=int, help="Nombre de zones d'alerte")
+    parser.add_argument('--frames', type=int, help="Nombre de frames de la vidéo synthétique")
+    parser.add_argument('--json', help="Fichier JSON où écrire les résultats")
+    parser.add_argument('--compare', help="Résultats JSON de référence (autre commit)")
+    parser.add_argument('--threshold', type=float, default=0.20,
+                        help="Ralentissement relatif signalé comme régression (défaut : 0.20)")
+    args = parser.parse_args()
+
+    params = dict(QUICK if args.quick else DEFAULTS)
+    for key, value in (('gallery_sizes', args.gallery_sizes), ('dim', args.dim),
+                       ('n_zones', args.zones), ('video_frames', args.frames)):
+        if value:
+            params[key] = value
+
+    current = run_benchmarks(args.only, params)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+        print(f"Résultats écrits dans {args.json}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(current, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
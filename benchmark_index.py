@@ -0,0 +1,125 @@
+"""
+Benchmark des index de recherche de la galerie (ann_index.py).
+Compare l'index approximatif IVF à la recherche exacte sur des galeries
+synthétiques de taille croissante : rappel@1 et latence par requête.
+
+Usage:
+    python benchmark_index.py
+    python benchmark_index.py --sizes 10000 100000 --n-probe 4 8 16 --json resultats.json
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from ann_index import make_index
+
+
+def synthetic_gallery(size, dim, n_clusters=None, seed=0):
+    """
+    Génère une galerie d'embeddings normalisés regroupés en clusters
+    (plus réaliste qu'un bruit uniforme pour des embeddings ReID).
+
+    Args:
+        size (int): Nombre d'identités
+        dim (int): Dimension des embeddings
+        n_clusters (int): Nombre de clusters (défaut : size // 50)
+        seed (int): Graine aléatoire
+
+    Returns:
+        tuple: (ids, embeddings) - int64 (size,), float32 (size, dim)
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = n_clusters or max(1, size // 50)
+    centers = rng.normal(size=(n_clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, n_clusters, size)] + 0.5 * rng.normal(size=(size, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.arange(1, size + 1, dtype=np.int64), vectors
+
+
+def noisy_queries(embeddings, n_queries, noise=0.3, seed=1):
+    """
+    Tire des requêtes comme versions bruitées d'éléments de la galerie
+    (nouvelle observation d'une identité connue).
+
+    Returns:
+        np.array: Requêtes normalisées (n_queries, dim)
+    """
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(embeddings), n_queries)
+    queries = embeddings[picks] + noise * rng.normal(size=(n_queries, embeddings.shape[1])).astype(np.float32) / np.sqrt(embeddings.shape[1])
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def time_search(index, queries, batch=20, repeats=3):
+    """
+    Mesure la latence moyenne par requête (par lots de `batch`, comme une frame).
+
+    Returns:
+        tuple: (ids trouvés, latence par requête en ms)
+    """
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        found = [index.search(queries[i:i + batch])[0] for i in range(0, len(queries), batch)]
+        best = min(best, time.perf_counter() - start)
+    return np.concatenate(found), 1000.0 * best / len(queries)
+
+
+def run_benchmark(sizes, dim, n_queries, n_lists, n_probes):
+    """
+    Lance le benchmark pour chaque taille de galerie.
+
+    Returns:
+        list: Résultats (un dictionnaire par taille et par configuration)
+    """
+    results = []
+    for size in sizes:
+        ids, embeddings = synthetic_gallery(size, dim)
+        queries = noisy_queries(embeddings, n_queries)
+
+        exact = make_index('exact', dim)
+        exact.add(ids, embeddings)
+        exact_ids, exact_ms = time_search(exact, queries)
+        results.append({'size': size, 'backend': 'exact', 'recall_at_1': 1.0, 'ms_per_query': exact_ms})
+        print(f"{size:>8} exact                 rappel@1=1.000  {exact_ms:8.3f} ms/requête")
+
+        start = time.perf_counter()
+        ivf = make_index('ivf', dim, n_lists=min(n_lists, max(1, size // 16)))
+        ivf.add(ids, embeddings)
+        build_s = time.perf_counter() - start
+        for n_probe in n_probes:
+            ivf.n_probe = n_probe
+            ivf_ids, ivf_ms = time_search(ivf, queries)
+            recall = float(np.mean(ivf_ids == exact_ids))
+            results.append({
+                'size': size, 'backend': 'ivf', 'n_lists': len(ivf._lists), 'n_probe': n_probe,
+                'recall_at_1': recall, 'ms_per_query': ivf_ms, 'build_s': build_s,
+            })
+            print(f"{size:>8} ivf (n_probe={n_probe:<3})     rappel@1={recall:.3f}  {ivf_ms:8.3f} ms/requête "
+                  f"(x{exact_ms / ivf_ms:.1f}, construction {build_s:.1f} s)")
+    return results
+
+
+def main():
+    """Point d'entrée : lit les arguments et affiche/sauvegarde les résultats."""
+    parser = argparse.ArgumentParser(description="Benchmark des index de recherche de la galerie")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000, 100000])
+    parser.add_argument('--dim', type=int, default=256)
+    parser.add_argument('--queries', type=int, default=400)
+    parser.add_argument('--n-lists', type=int, default=256)
+    parser.add_argument('--n-probe', type=int, nargs='+', default=[4, 8, 16])
+    parser.add_argument('--json', help="Fichier JSON où écrire les résultats")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.sizes, args.dim, args.queries, args.n_lists, args.n_probe)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Résultats écrits dans {args.json}")
+
+
+if __name__ == "__main__":
+    main()
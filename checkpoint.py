@@ -0,0 +1,89 @@
+"""
+Module des points de reprise des vidéos.
+
+Pendant le traitement, chaque caméra écrit régulièrement (CHECKPOINT_INTERVAL
+frames) un point de reprise : frame atteinte, position des fichiers de
+trajectoires et d'événements, visites de zone en cours, compteurs du résumé
+et compteur d'IDs globaux. La galerie partagée est sauvegardée juste avant,
+dans la même étape (gallery_checkpoint.npz) : la sauvegarde sur disque est
+toujours au moins aussi récente que chaque point de reprise, qui note la
+génération de galerie qu'il attend. Une reprise dont la galerie rechargée
+est plus ancienne (fichier absent ou remplacé) est refusée : la vidéo est
+traitée depuis le début.
+
+L'état du tracker n'est pas sauvegardé : après une reprise, les tracks
+locaux repartent de zéro et la correspondance IDs locaux -> globaux est
+vide. Chaque objet retrouve son ID global par la ReID, contre la galerie
+rechargée ; les IDs globaux attribués avant l'arrêt ne sont pas réutilisés.
+
+Une vidéo relancée (nouvelle tentative après un arrêt, ou main.py --resume)
+repart de son dernier point de reprise : le travail perdu est borné par
+l'intervalle entre deux points de reprise, pas par la longueur de la vidéo.
+"""
+
+import os
+import json
+
+import config
+
+CHECKPOINT_PREFIX = 'checkpoint_'
+
+
+def checkpoint_path(folder, video_name):
+    """Renvoie le chemin du point de reprise d'une vidéo."""
+    return os.path.join(folder, f"{CHECKPOINT_PREFIX}{os.path.splitext(video_name)[0]}.json")
+
+
+def save_checkpoint(folder, video_name, state):
+    """
+    Écrit le point de reprise d'une vidéo (remplacement atomique).
+
+    Args:
+        folder (str): Dossier de sortie
+        video_name (str): Nom de la vidéo
+        state (dict): État sérialisable en JSON
+    """
+    path = checkpoint_path(folder, video_name)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(folder, video_name):
+    """
+    Relit le point de reprise d'une vidéo.
+
+    Returns:
+        dict: État sauvegardé, None s'il n'existe pas
+    """
+    path = checkpoint_path(folder, video_name)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def remove_checkpoint(folder, video_name):
+    """Supprime le point de reprise d'une vidéo (traitement terminé ou recommencé)."""
+    path = checkpoint_path(folder, video_name)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def save_gallery_snapshot(gallery, folder):
+    """
+    Sauvegarde la galerie pour la reprise (une galerie persistante est
+    simplement écrite sur disque).
+
+    Args:
+        gallery (SharedGallery): Galerie partagée
+        folder (str): Dossier de sortie
+
+    Returns:
+        int: Génération de la sauvegarde, None pour une galerie persistante
+    """
+    if gallery.persistent:
+        gallery.flush()
+        return None
+    return gallery.save(os.path.join(folder, config.GALLERY_CHECKPOINT_FILE))
@@ -14,6 +14,46 @@ os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 YOLO_MODEL_PATH = 'yolo11m.pt'          # Modèle YOLO pour la détection d'objets
 REID_MODEL_PATH = 'yolo26n-cls.pt'      # Modèle pour la réidentification (ReID)
 TRACKER_CONFIG = "custom_tracker.yaml"   # Configuration du tracker BotSort
+VID_STRIDE = 1                          # Traiter une frame sur N (1 = toutes)
+
+# --- Porte de Mouvement (motion.py, caméras fixes) ---
+# Sans mouvement, la détection n'est lancée qu'une frame sur MOTION_IDLE_STRIDE ; les objets
+# de la dernière frame détectée sont reportés sur les autres (mêmes index de frame)
+MOTION_GATE = False                     # True : pas de détection tant que la scène est immobile
+MOTION_GATE_WIDTH = 160                 # Largeur de l'image réduite comparée au fond
+MOTION_PIXEL_THRESHOLD = 25             # Écart de niveau de gris d'un pixel en mouvement
+MOTION_MIN_AREA = 0.002                 # Part de l'image en mouvement relançant la détection
+MOTION_ROI_AREA = 0.0005                # Idem près des objets suivis et des zones d'alerte (plus sensible)
+MOTION_IDLE_STRIDE = 25                 # Sans mouvement, une détection toutes les N frames
+MOTION_HOLD_FRAMES = 15                 # Détection à chaque frame pendant N frames après un mouvement
+MOTION_BG_ALPHA = 0.05                  # Vitesse d'adaptation du fond
+
+# --- Régions d'Intérêt (roi.py) ---
+# Détection limitée à des régions de la frame ; les objets hors des régions ne sont pas détectés
+# Régions déclarées par vidéo : {"video.mp4": [[x1, y1, x2, y2], ...]} (pixels pleine résolution)
+ROI_REGIONS = {}
+ROI_FROM_ZONES = False                  # Sans région déclarée : rectangles englobant les zones d'alerte
+ROI_MARGIN = 0.1                        # Marge autour des zones (fraction de la plus grande dimension de la frame)
+ROI_TRACK_MARGIN = 0.5                  # Région ajoutée autour des objets suivis (fraction de leur taille)
+ROI_MAX_AREA = 0.7                      # Au-delà de cette part de la frame, détecter la frame entière
+
+# --- Ordonnancement ---
+NUM_WORKERS = 4                         # Processus de travail (modèles chargés une fois chacun ; None = nombre de cœurs)
+JOB_MAX_RETRIES = 1                     # Nouvelles tentatives pour une vidéo en échec
+# Nombre de caméras traitées ensemble par un processus avec une détection par lots
+# (inference.py ; 1 = tracking frame par frame d'une seule vidéo)
+INFERENCE_BATCH_CAMERAS = 1
+
+# --- Services par lots (processus uniques partagés par les processus de travail) ---
+SERVICE_TIMEOUT = 60               # Délai de réponse d'un service au-delà duquel la vidéo est en échec (s)
+# Service ReID : un seul modèle ReID pour tous les processus de travail
+REID_SERVICE = False               # True : équivalent à main.py --reid-service
+REID_SERVICE_MAX_BATCH = 64        # Nombre maximal de crops par lot
+REID_SERVICE_MAX_WAIT_MS = 5       # Attente maximale pour compléter un lot (ms)
+# Service de matching : un seul processus attribue les IDs globaux (pas de création concurrente)
+MATCHER_SERVICE = False            # True : équivalent à main.py --matcher
+MATCHER_MAX_BATCH = 256            # Nombre maximal d'embeddings par lot
+MATCHER_MAX_WAIT_MS = 2            # Attente maximale pour compléter un lot (ms)
 
 # --- Zones d'Alerte ---
 # Format: 'nom_video.mp4': [zone1, zone2, ...]
@@ -37,11 +77,108 @@ ALERT_ZONES = {
 }
 
 # --- Paramètres d'Affichage ---
+HEADLESS = False                   # True : aucun affichage (équivalent à main.py --headless)
+VIEWER_ENABLED = False             # True : viewer.py peut s'attacher au traitement (main.py --viewer)
+VIEWER_ADDRESS = ('127.0.0.1', 50055)  # Adresse locale du serveur du visualiseur
+VIEWER_KEY_FILE = 'viewer.key'     # Clé d'authentification du visualiseur, tirée au hasard à chaque exécution
+                                   # (fichier lisible par le seul propriétaire, dans OUTPUT_FOLDER)
+VIEWER_FRAME_INTERVAL = 5          # Envoyer une image au visualiseur toutes les N frames
+VIEWER_FRAME_WIDTH = 640           # Largeur des images envoyées au visualiseur
 ZONE_COLOR = (0, 0, 255)           # Couleur des zones d'alerte (Rouge BGR)
 ALERT_COLOR = (0, 0, 255)          # Couleur des alertes (Rouge BGR)
 ZONE_THICKNESS = 2                 # Épaisseur du trait des zones
+ZONE_LOOKUP = 'mask'               # 'mask' : masque d'étiquettes O(1) (à un pixel près) | 'exact' : test vectorisé
 TEXT_COLOR_NORMAL = (0, 255, 0)    # Couleur du texte normal (Vert BGR)
 TEXT_COLOR_TARGET = (0, 255, 255)  # Couleur pour l'objet ciblé (Jaune BGR)
 
+# --- Événements de Zone (entrée, sortie, stationnement) ---
+ZONE_ENTER_FRAMES = 3              # Détections dans la zone avant de confirmer une entrée
+ZONE_MIN_DURATION = 1.0            # Durée minimale (s) d'une visite avant de confirmer l'entrée
+ZONE_EXIT_FRAMES = 15              # Frames sans détection dans la zone avant la sortie (hystérésis)
+ZONE_DWELL_SECONDS = 30.0          # Événement de stationnement après N secondes dans la zone (0 = désactivé)
+ZONE_EVENT_MIN_INTERVAL = 1.0      # Intervalle minimal (s) entre deux alertes d'une même zone (0 = sans limite)
+EVENT_QUEUE_SIZE = 10000           # Événements en attente d'écriture (au-delà : abandonnés)
+EVENT_CONSOLE = True               # Afficher les entrées et stationnements dans la console
+
+# --- Profilage par étape (main.py --profile) ---
+PROFILE_STAGES = False             # True : temps de chaque étape dans profile_<video>.json/.csv
+PROFILE_WINDOW = 2048              # Dernières mesures gardées par étape pour les percentiles
+
+# --- Vidéo Annotée (écrite par un thread dédié) ---
+WRITE_ANNOTATED_VIDEO = True       # False : ne pas produire de vidéo annotée
+WRITER_QUEUE_SIZE = 64             # Nombre maximal de frames en attente d'encodage
+WRITER_POLICY = 'block'            # File pleine : 'block' (attendre) ou 'drop' (abandonner la frame)
+WRITER_SCALE = 1.0                 # Résolution de sortie (0.5 = moitié de la résolution source)
+WRITER_FPS_DIVISOR = 1             # N'écrire qu'une frame traitée sur N (cadence ajustée, durée conservée)
+
+# --- Fichiers de Trajectoires (donnees_<video>.*) ---
+# 'csv'     : texte, une ligne par détection
+# 'npz'     : colonnes typées compressées (NumPy)
+# 'parquet' : colonnes typées compressées (nécessite pyarrow)
+TRAJECTORY_FORMAT = 'csv'
+TRAJECTORY_CHUNK_SIZE = 10000      # Détections accumulées en mémoire avant écriture d'un bloc
+SUMMARY_STATE_INTERVAL = 500       # Sauvegarder les compteurs du résumé toutes les N frames traitées
+SUMMARY_REFRESH_SECONDS = 60       # Rafraîchir object_summary.csv pendant le traitement (None = à la fin seulement)
+
+# --- Points de Reprise (checkpoint_<video>.json, main.py --resume) ---
+# Travail perdu après un arrêt borné à CHECKPOINT_INTERVAL frames par vidéo
+# (trajectoires 'csv' ou 'npz' uniquement : un fichier parquet n'est complet qu'à sa fermeture)
+CHECKPOINT_INTERVAL = 5000          # Point de reprise toutes les N frames traitées (0 = désactivé)
+GALLERY_CHECKPOINT_FILE = "gallery_checkpoint.npz"  # Sauvegarde de la galerie (dans OUTPUT_FOLDER, à chaque point de reprise)
+
 # --- Paramètres de Tracking ---
 SIMILARITY_THRESHOLD = 0.75         # Seuil de similarité pour la réidentification (0-1)
+# Seuils propres à une classe (classes absentes : SIMILARITY_THRESHOLD), ex: {'person': 0.75, 'backpack': 0.85}
+CLASS_SIMILARITY_THRESHOLDS = {}
+
+# --- Limitation du calcul ReID (par track local) ---
+REID_REFRESH_INTERVAL = 30          # Recalculer l'embedding d'un track toutes les N frames
+REID_AREA_CHANGE = 0.3              # Recalculer si l'aire de la boîte varie de plus de 30%
+REID_CONF_CHANGE = 0.15             # Recalculer si la confiance varie de plus de 0.15
+REID_TRACK_TIMEOUT = 90             # Oublier un track local absent depuis N frames (cf. track_buffer)
+
+# --- Galerie Globale (mémoire partagée) ---
+GALLERY_CAPACITY = 50000            # Nombre maximal de tracks globaux (au-delà : éviction LRU)
+GALLERY_EMBEDDING_DIM = 256         # Dimension des embeddings du modèle ReID (doit correspondre à REID_MODEL_PATH)
+GALLERY_EMA_ALPHA = 1.0             # Poids du nouvel embedding lors d'une mise à jour (1.0 = remplacement, ex: 0.2 pour lisser)
+# Galerie partitionnée par classe (model.names) : une détection n'est comparée qu'aux identités de sa classe
+# (False = toutes les identités sont candidates, comme avant le partitionnement)
+GALLERY_CLASS_PARTITION = False
+# Nombre maximal d'identités par classe (éviction LRU dans la classe ; classes absentes : GALLERY_CAPACITY)
+# ex: {'person': 40000, 'backpack': 2000, 'handbag': 2000}
+GALLERY_CLASS_CAPACITY = {}
+# Stockage des embeddings : 'float32' (référence), 'float16' (moitié de la mémoire) ou 'int8'
+# (quart de la mémoire, échelle par identité ; voir python benchmark.py --only gallery)
+GALLERY_EMBEDDING_DTYPE = 'float32'
+# Durée d'inactivité avant expiration d'un track global (None = jamais, ex: 600).
+# Temps de la base commune (CAMERA_START_TIMES) ; un track n'expire que d'après l'horloge de la
+# dernière caméra qui l'a vu (les caméras ne sont pas traitées en même temps).
+GALLERY_TTL_SECONDS = None
+GALLERY_TTL_FRAMES = None
+GALLERY_EXPIRE_INTERVAL = 100       # Vérifier les expirations toutes les N frames traitées
+GALLERY_ARCHIVE_FILE = "gallery_archive.csv"  # Archive des tracks expirés/évincés (dans OUTPUT_FOLDER)
+# Galerie persistante projetée en mémoire (dans OUTPUT_FOLDER, None = repartir d'une galerie vide) :
+# les IDs globaux continuent d'une exécution à l'autre. Le fichier est lié à GALLERY_CAPACITY et
+# GALLERY_EMBEDDING_DIM et GALLERY_EMBEDDING_DTYPE ; pour garder les identités d'un jour à l'autre, augmenter ou désactiver le TTL.
+GALLERY_FILE = None                 # ex: "gallery.dat"
+
+# --- Topologie des Caméras (topology.py) ---
+# Transitions possibles entre caméras et temps de trajet (s) : une identité n'est comparée à une
+# détection que si elle a pu atteindre la caméra depuis sa dernière apparition. Caméras absentes : pas de filtre.
+# Format: {('camera_depart.mp4', 'camera_arrivee.mp4'): (min_s, max_s)}
+# Exemple: {('CAMERA_HALL_PORTE_GAUCHE.mp4', 'CAMERA_COULOIR_DEBUT.mp4'): (2.0, 60.0)}
+CAMERA_GRAPH = {}
+CAMERA_GRAPH_BIDIRECTIONAL = True   # Chaque transition vaut aussi dans l'autre sens
+CAMERA_SAME_MAX_SECONDS = 5.0       # Même caméra : seulement les identités perdues depuis au plus N s
+# Début de chaque vidéo (s) sur une base de temps commune à toutes les caméras (absente : 0, enregistrements
+# simultanés). Les vidéos sont traitées les unes après les autres par NUM_WORKERS processus : la topologie
+# compare les temps de cette base, jamais l'ordre de traitement.
+# Exemple: {'CAMERA_COULOIR_DEBUT.mp4': 3600.0}
+CAMERA_START_TIMES = {}
+
+# --- Index de recherche de la galerie ---
+# 'exact' : recherche linéaire exacte (référence)
+# 'ivf'   : index approximatif, recommandé au-delà de ~100k identités (un index par classe si GALLERY_CLASS_PARTITION)
+MATCH_INDEX = 'exact'
+IVF_N_LISTS = 256                   # Nombre de listes (centroïdes) de l'index IVF
+IVF_N_PROBE = 8                     # Listes parcourues par requête (plus = meilleur rappel, plus lent)
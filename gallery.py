@@ -0,0 +1,868 @@
+"""
+Module de galerie d'embeddings en mémoire partagée.
+Stocke les tracks globaux dans un segment `multiprocessing.shared_memory` :
+une matrice d'embeddings de capacité fixe, un tableau d'IDs et des tableaux
+de métadonnées (classe, dernière position, dernière vidéo, dernière apparition).
+
+Les embeddings sont stockés en float32, float16 ou int8 (avec un facteur
+d'échelle par ligne) : 1024, 512 ou 260 octets par identité pour 256
+dimensions. Les noms de caméras et de classes sont stockés une fois dans des
+tables du segment ; chaque ligne ne garde que des codes entiers.
+
+Chaque track appartient à une classe (partition) : les lignes sont gardées
+triées par classe, chaque partition est donc un bloc contigu et le matching
+peut ne chercher que dans celle de la classe détectée, sur une vue sans copie
+(read_subset). Un ajout ou un retrait déplace au plus une ligne par partition
+suivante. La taille de chaque partition peut être bornée (class_capacity,
+éviction LRU dans la classe).
+
+Les lectures se font sans copie ni verrou grâce à un compteur de version
+(seqlock) : le lecteur relit si une écriture a eu lieu pendant sa lecture.
+Seuls les ajouts et mises à jour prennent le verrou.
+
+La galerie est bornée : les tracks inactifs depuis plus d'un TTL sont expirés,
+et le track le moins récemment utilisé (LRU) est évincé quand elle est pleine.
+Les tracks retirés sont archivés sur disque.
+
+La galerie peut aussi être persistante (SharedGallery.open) : le segment est
+alors un fichier projeté en mémoire (mmap), avec exactement la même
+disposition. Une nouvelle exécution le projette sans le relire (les pages
+sont chargées à la demande) : les IDs globaux continuent d'une exécution à
+l'autre et le temps de démarrage ne dépend pas de la taille de la galerie.
+"""
+
+import os
+import csv
+import mmap
+import time
+from contextlib import contextmanager
+from multiprocessing import RLock, shared_memory
+
+import numpy as np
+
+# Indices de l'en-tête (int64)
+_VERSION = 0    # Compteur de version du seqlock (impair = écriture en cours)
+_SIZE = 1       # Nombre de lignes utilisées
+_NEXT_ID = 2    # Prochain ID global à attribuer
+_TICK = 3       # Horloge logique des accès (pour l'éviction LRU)
+_REMOVED = 4    # Nombre total de tracks retirés (position dans le journal des retraits)
+_DIM = 5        # Dimension des embeddings (contrôle d'un fichier persistant)
+_CAPACITY = 6   # Capacité (contrôle d'un fichier persistant)
+_N_CAMERAS = 7  # Nombre de noms de caméras dans la table
+_DTYPE = 8      # Type de stockage des embeddings (indice dans EMBEDDING_DTYPES)
+_N_CLASSES = 9  # Nombre de noms de classes dans la table
+_SNAPSHOT = 10  # Génération de la dernière sauvegarde (save), rechargée par load
+_HEADER_LEN = 16
+
+REMOVED_LOG_LEN = 4096  # Taille du journal circulaire des IDs retirés (synchronisation des index)
+
+VIDEO_NAME_LEN = 64  # Taille maximale (octets) du nom de vidéo stocké
+MAX_CAMERAS = 4096   # Nombre maximal de noms de caméras distincts
+CLASS_NAME_LEN = 32  # Taille maximale (octets) d'un nom de classe
+MAX_CLASSES = 1024   # Nombre maximal de noms de classes distincts
+
+# Types de stockage des embeddings ('int8' : quantification avec un facteur d'échelle par ligne)
+EMBEDDING_DTYPES = ('float32', 'float16', 'int8')
+
+# Tableaux globaux du segment (les autres tableaux ont une ligne par track)
+_TABLES = ('header', 'removed_log', 'cameras', 'classes')
+
+# Tables de noms : (indice du nombre de noms dans l'en-tête, nombre maximal de noms)
+_NAME_TABLES = {'cameras': (_N_CAMERAS, MAX_CAMERAS), 'classes': (_N_CLASSES, MAX_CLASSES)}
+
+ARCHIVE_COLUMNS = ['id', 'class', 'last_video', 'last_x', 'last_y', 'last_time', 'last_frame', 'hits', 'reason']
+
+
+def _layout(capacity, dim, dtype='float32'):
+    """
+    Calcule la disposition des tableaux dans le segment partagé.
+
+    Args:
+        capacity (int): Nombre maximal de tracks globaux
+        dim (int): Dimension des embeddings
+        dtype (str): Stockage des embeddings (voir EMBEDDING_DTYPES)
+
+    Returns:
+        tuple: (liste de (nom, dtype, shape, offset), taille totale en octets)
+    """
+    if dtype not in EMBEDDING_DTYPES:
+        raise ValueError(f"Stockage d'embeddings inconnu: {dtype!r} (choix: {', '.join(EMBEDDING_DTYPES)})")
+    fields = [
+        ('header', np.int64, (_HEADER_LEN,)),
+        ('ids', np.int64, (capacity,)),
+        ('class_code', np.int16, (capacity,)),     # Code de la classe (table 'classes', -1 = aucune)
+        ('embeddings', dtype, (capacity, dim)),
+        ('scales', np.float32, (capacity if dtype == 'int8' else 0,)),  # Échelle de chaque ligne (int8)
+        ('last_pos', np.float32, (capacity, 2)),
+        ('last_camera', np.int16, (capacity,)),    # Code de la dernière caméra (table 'cameras')
+        ('last_time', np.float64, (capacity,)),    # Dernière apparition (secondes de vidéo)
+        ('last_frame', np.int64, (capacity,)),     # Dernière apparition (index de frame)
+        ('last_access', np.int64, (capacity,)),    # Dernier accès (horloge logique _TICK)
+        ('hits', np.int64, (capacity,)),           # Nombre de mises à jour
+        ('removed_log', np.int64, (REMOVED_LOG_LEN,)),  # Journal circulaire des IDs retirés
+        ('cameras', f'S{VIDEO_NAME_LEN}', (MAX_CAMERAS,)),  # Noms des caméras (code = indice)
+        ('classes', f'S{CLASS_NAME_LEN}', (MAX_CLASSES,)),  # Noms des classes (code = indice)
+    ]
+    layout = []
+    offset = 0
+    for name, dtype, shape in fields:
+        dtype = np.dtype(dtype)
+        offset = (offset + 63) // 64 * 64  # Aligner chaque tableau sur 64 octets
+        layout.append((name, dtype, shape, offset))
+        offset += dtype.itemsize * int(np.prod(shape))
+    return layout, offset
+
+
+class _MappedFile:
+    """
+    Fichier projeté en mémoire, utilisé comme segment partagé (même
+    interface que shared_memory.SharedMemory : name, buf, close, unlink).
+    """
+
+    def __init__(self, path):
+        self.name = path
+        with open(path, 'r+b') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0)
+        self.buf = memoryview(self._mmap)
+        self.size = len(self._mmap)
+
+    def flush(self):
+        """Écrit les pages modifiées sur disque."""
+        self._mmap.flush()
+
+    def close(self):
+        self.buf.release()
+        self._mmap.close()
+
+    def unlink(self):
+        """Le fichier est conservé (galerie persistante)."""
+
+
+class SharedGallery:
+    """
+    Galerie des tracks globaux partagée entre les processus caméra.
+
+    Les embeddings sont stockés normalisés (L2) pour que le matching se réduise
+    à un produit matriciel. Les lignes utilisées restent contiguës ([:len]) et
+    triées par code de classe (un bloc par partition). L'objet est picklable :
+    un processus enfant qui le reçoit se rattache au même segment (ou au même
+    fichier pour une galerie persistante).
+    """
+
+    def __init__(self, shm, capacity, dim, lock, ema_alpha=1.0, archive_path=None, owner=False, dtype='float32',
+                 class_capacity=None):
+        self._shm = shm
+        self.capacity = capacity
+        self.dim = dim
+        self.dtype = dtype
+        self.class_capacity = dict(class_capacity or {})  # Classe -> nombre maximal de tracks
+        self.lock = lock
+        self.ema_alpha = ema_alpha
+        self.archive_path = archive_path
+        self._owner = owner
+        self._write_depth = 0  # Profondeur des écritures imbriquées (propre au processus)
+        self.lock_wait = 0.0   # Temps total d'attente du verrou d'écriture (s, propre au processus)
+
+        self._fields, _ = _layout(capacity, dim, dtype)
+        for name, field_dtype, shape, offset in self._fields:
+            setattr(self, f'_{name}', np.ndarray(shape, dtype=field_dtype, buffer=shm.buf, offset=offset))
+        self._row_fields = [name for name, _, shape, _ in self._fields if name not in _TABLES and shape[0]]
+        # Nom -> code par table de noms (tables en ajout seul : cache valable dans chaque processus)
+        self._codes = {table: {} for table in _NAME_TABLES}
+
+    @classmethod
+    def create(cls, capacity, dim, first_id=1, ema_alpha=1.0, archive_path=None, dtype='float32',
+               class_capacity=None):
+        """
+        Crée une nouvelle galerie vide.
+
+        Args:
+            capacity (int): Nombre maximal de tracks globaux
+            dim (int): Dimension des embeddings
+            first_id (int): Premier ID global attribué
+            ema_alpha (float): Poids du nouvel embedding lors d'une mise à jour
+                               (moyenne mobile exponentielle, 1.0 = remplacement)
+            archive_path (str): Fichier CSV où archiver les tracks retirés (None = pas d'archive)
+            dtype (str): Stockage des embeddings : 'float32', 'float16' ou 'int8'
+            class_capacity (dict): Nombre maximal de tracks par classe (classes absentes : non bornées)
+
+        Returns:
+            SharedGallery: Galerie propriétaire du segment (à libérer avec unlink())
+        """
+        _, size = _layout(capacity, dim, dtype)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        gallery = cls(shm, capacity, dim, RLock(), ema_alpha, archive_path, owner=True, dtype=dtype,
+                      class_capacity=class_capacity)
+        gallery._header[:] = 0
+        gallery._init_header(first_id)
+        return gallery
+
+    def _init_header(self, first_id):
+        self._header[_NEXT_ID] = first_id
+        self._header[_DIM] = self.dim
+        self._header[_CAPACITY] = self.capacity
+        self._header[_DTYPE] = EMBEDDING_DTYPES.index(self.dtype)
+
+    @classmethod
+    def open(cls, path, capacity, dim, first_id=1, ema_alpha=1.0, archive_path=None, dtype='float32',
+             class_capacity=None):
+        """
+        Ouvre une galerie persistante (fichier projeté en mémoire), créée vide
+        si le fichier n'existe pas. Rien n'est copié à l'ouverture.
+
+        Args:
+            path (str): Fichier de la galerie
+            capacity (int): Nombre maximal de tracks globaux
+            dim (int): Dimension des embeddings
+            first_id (int): Premier ID global attribué (nouveau fichier)
+            ema_alpha (float): Poids du nouvel embedding lors d'une mise à jour
+            archive_path (str): Fichier CSV où archiver les tracks retirés (None = pas d'archive)
+            dtype (str): Stockage des embeddings : 'float32', 'float16' ou 'int8'
+            class_capacity (dict): Nombre maximal de tracks par classe (classes absentes : non bornées)
+
+        Returns:
+            SharedGallery: Galerie persistante (unlink() ferme sans supprimer le fichier)
+
+        Raises:
+            ValueError: Fichier d'une autre capacité, dimension ou stockage d'embeddings
+        """
+        _, size = _layout(capacity, dim, dtype)
+        new = not os.path.exists(path)
+        if new:
+            with open(path, 'wb') as f:
+                f.truncate(size)  # Fichier creux : rempli de zéros sans écriture
+        segment = _MappedFile(path)
+        header = np.ndarray((_HEADER_LEN,), dtype=np.int64, buffer=segment.buf)
+        stored = (int(header[_CAPACITY]), int(header[_DIM]), int(header[_DTYPE]))
+        del header
+        if not new and (segment.size != size or stored != (capacity, dim, EMBEDDING_DTYPES.index(dtype))):
+            segment.close()
+            stored_dtype = EMBEDDING_DTYPES[stored[2]] if 0 <= stored[2] < len(EMBEDDING_DTYPES) else '?'
+            raise ValueError(
+                f"Galerie {path} de capacité {stored[0]}, dimension {stored[1]} et stockage {stored_dtype}, "
+                f"attendu {capacity}, {dim} et {dtype}. Ajustez GALLERY_CAPACITY / GALLERY_EMBEDDING_DIM / "
+                f"GALLERY_EMBEDDING_DTYPE ou changez GALLERY_FILE."
+            )
+        gallery = cls(segment, capacity, dim, RLock(), ema_alpha, archive_path, owner=True, dtype=dtype,
+                      class_capacity=class_capacity)
+        if new:
+            gallery._init_header(first_id)
+        else:
+            if gallery._header[_VERSION] & 1:
+                # Arrêt pendant une écriture : débloquer les lecteurs du seqlock
+                gallery._header[_VERSION] += 1
+            with gallery.writing():
+                gallery._sort_rows()
+        return gallery
+
+    @property
+    def persistent(self):
+        """True si la galerie est un fichier projeté en mémoire."""
+        return isinstance(self._shm, _MappedFile)
+
+    def __getstate__(self):
+        return {
+            'name': self._shm.name, 'persistent': self.persistent, 'capacity': self.capacity, 'dim': self.dim,
+            'lock': self.lock, 'ema_alpha': self.ema_alpha, 'archive_path': self.archive_path, 'dtype': self.dtype,
+            'class_capacity': self.class_capacity,
+        }
+
+    def __setstate__(self, state):
+        if state['persistent']:
+            shm = _MappedFile(state['name'])
+        else:
+            shm = shared_memory.SharedMemory(name=state['name'])
+        self.__init__(shm, state['capacity'], state['dim'], state['lock'],
+                      state['ema_alpha'], state['archive_path'], dtype=state['dtype'],
+                      class_capacity=state['class_capacity'])
+
+    def __len__(self):
+        return int(self._header[_SIZE])
+
+    @property
+    def snapshot_generation(self):
+        """Génération de la dernière sauvegarde écrite (ou rechargée) par save() / load()."""
+        return int(self._header[_SNAPSHOT])
+
+    @property
+    def next_id(self):
+        """Prochain ID global qui sera attribué."""
+        return int(self._header[_NEXT_ID])
+
+    def close(self):
+        """Détache la galerie du segment partagé (sans le détruire)."""
+        for name, _, _, _ in self._fields:
+            setattr(self, f'_{name}', None)
+        self._shm.close()
+
+    def unlink(self):
+        """
+        Détruit le segment partagé (à appeler une seule fois, par le créateur).
+        Une galerie persistante est écrite sur disque et son fichier conservé.
+        """
+        self.flush()
+        self.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def flush(self):
+        """Écrit une galerie persistante sur disque (sans effet en mémoire partagée)."""
+        if self.persistent:
+            self._shm.flush()
+
+    def rebase_time(self):
+        """
+        Décale les dernières apparitions pour que l'exécution précédente se
+        termine à l'instant 0 : les vidéos d'une nouvelle exécution repartent
+        de 0, le TTL compte alors le temps écoulé dans la nouvelle exécution.
+        """
+        with self.writing():
+            size = int(self._header[_SIZE])
+            if size:
+                self._last_time[:size] -= self._last_time[:size].max()
+                self._last_frame[:size] -= self._last_frame[:size].max()
+
+    # --- Lecture (sans verrou) ---
+
+    def read(self, fn):
+        """
+        Applique `fn` à une vue cohérente de la galerie, sans copie ni verrou.
+
+        `fn(ids, embeddings, scales)` reçoit des vues sur les lignes utilisées
+        et doit renvoyer un résultat qui ne référence pas ces vues (il peut
+        être rappelé si une écriture concurrente invalide la lecture).
+        Les embeddings sont dans le type de stockage de la galerie ; `scales`
+        (échelle de chaque ligne) vaut None sauf en int8 : la valeur d'un
+        embedding est embeddings[i] * scales[i] (voir tracking.find_best_matches).
+
+        Args:
+            fn (callable): Fonction de lecture
+
+        Returns:
+            Le résultat de `fn`
+        """
+        scales = self._scales if self.dtype == 'int8' else None
+        return self._consistent(lambda size: fn(self._ids[:size], self._embeddings[:size],
+                                                None if scales is None else scales[:size]))
+
+    def read_subset(self, fn, class_code=None, select=None):
+        """
+        Comme read(), limité aux candidats d'une recherche : la partition
+        d'une classe (vue sans copie sur son bloc de lignes), puis les lignes
+        retenues par `select(last_camera, last_time)` (masque booléen, voir
+        topology.py), copiées : ce filtre en garde peu, les copier coûte moins
+        que de les comparer toutes.
+
+        Args:
+            fn (callable): Fonction de lecture, comme pour read()
+            class_code (int): Code de la classe (voir class_code ; -1 = sans classe, None = toutes)
+            select (callable): Filtre supplémentaire des lignes (None = toute la partition)
+
+        Returns:
+            Le résultat de `fn`
+        """
+        scales = self._scales if self.dtype == 'int8' else None
+
+        def _read(size):
+            start, stop = (0, size) if class_code is None else self._class_rows(class_code, size)
+            if select is None:
+                return fn(self._ids[start:stop], self._embeddings[start:stop],
+                          None if scales is None else scales[start:stop])
+            rows = start + np.flatnonzero(select(self._last_camera[start:stop], self._last_time[start:stop]))
+            return fn(self._ids[rows], self._embeddings[rows], None if scales is None else scales[rows])
+        return self._consistent(_read)
+
+    def _class_rows(self, code, size):
+        """Bloc de lignes [début, fin) de la partition d'une classe."""
+        class_codes = self._class_code[:size]
+        return int(np.searchsorted(class_codes, code, 'left')), int(np.searchsorted(class_codes, code, 'right'))
+
+    def _consistent(self, fn):
+        """
+        Boucle de lecture du seqlock : appelle `fn(size)` jusqu'à obtenir une
+        lecture non perturbée par une écriture concurrente.
+        """
+        header = self._header
+        if self._write_depth > 0:
+            # Lecture depuis une section d'écriture de ce processus : la vue est déjà cohérente
+            return fn(int(header[_SIZE]))
+        while True:
+            version = int(header[_VERSION])
+            if version & 1:
+                # Écriture en cours dans un autre processus
+                time.sleep(0)
+                continue
+            result = fn(int(header[_SIZE]))
+            if int(header[_VERSION]) == version:
+                return result
+
+    def changes_since(self, tick, removed):
+        """
+        Renvoie les modifications de la galerie depuis une synchronisation précédente.
+        Utilisé par les index de recherche (ann_index.py) pour se mettre à jour
+        de façon incrémentale.
+
+        Args:
+            tick (int): Horloge logique lors de la synchronisation précédente
+            removed (int): Nombre de retraits lors de la synchronisation précédente
+
+        Returns:
+            dict: {'tick', 'removed', 'ids', 'embeddings', 'class_codes', 'removed_ids', 'all_ids'}
+                  'ids'/'embeddings'/'class_codes' sont les tracks ajoutés ou modifiés, 'removed_ids' les
+                  IDs retirés. Si le journal des retraits a débordé, 'removed_ids' vaut None
+                  et 'all_ids' contient l'ensemble des IDs présents (resynchronisation complète).
+        """
+        def _changes(size):
+            new_tick = int(self._header[_TICK])
+            new_removed = int(self._header[_REMOVED])
+            rows = np.flatnonzero(self._last_access[:size] > tick)
+            result = {
+                'tick': new_tick,
+                'removed': new_removed,
+                'ids': self._ids[rows].copy(),
+                'embeddings': self._embedding(rows),
+                'class_codes': self._class_code[rows].astype(np.int64),
+                'removed_ids': None,
+                'all_ids': None,
+            }
+            if new_removed - removed > REMOVED_LOG_LEN:
+                result['all_ids'] = self._ids[:size].copy()
+            else:
+                positions = np.arange(removed, new_removed) % REMOVED_LOG_LEN
+                result['removed_ids'] = self._removed_log[positions].copy()
+            return result
+        return self._consistent(_changes)
+
+    def get(self, gid):
+        """
+        Renvoie une copie des données d'un track global.
+
+        Args:
+            gid (int): ID global
+
+        Returns:
+            dict | None: {'embedding', 'class_name', 'last_pos', 'last_video', 'last_time', 'last_frame', 'hits'}
+                         ou None si absent
+        """
+        def _copy(ids, embeddings, scales):
+            rows = np.flatnonzero(ids == gid)
+            if len(rows) == 0:
+                return None
+            return self._row_data(rows[0])
+        return self.read(_copy)
+
+    def _row_data(self, row):
+        """Copie les données d'une ligne dans un dictionnaire."""
+        return {
+            'embedding': self._embedding(row),
+            'class_name': self._name('classes', self._class_code[row]),
+            'last_pos': tuple(self._last_pos[row].tolist()),
+            'last_video': self._name('cameras', self._last_camera[row]),
+            'last_time': float(self._last_time[row]),
+            'last_frame': int(self._last_frame[row]),
+            'hits': int(self._hits[row]),
+        }
+
+    def _embedding(self, rows):
+        """Embeddings float32 (copie) d'une ligne ou d'un tableau de lignes."""
+        vec = self._embeddings[rows].astype(np.float32)
+        if self.dtype == 'int8':
+            vec *= self._scales[rows][..., None]
+        return vec
+
+    def _name(self, table, code):
+        """Nom d'un code d'une table de noms ('cameras' ou 'classes'), None pour le code -1."""
+        return None if code < 0 else getattr(self, f'_{table}')[int(code)].decode('utf-8', 'ignore')
+
+    def _names(self, table):
+        """Noms d'une table de noms, par code."""
+        count = int(self._header[_NAME_TABLES[table][0]])
+        return [name.decode('utf-8', 'ignore') for name in getattr(self, f'_{table}')[:count]]
+
+    def camera_names(self):
+        """Noms des caméras de la galerie, par code."""
+        return self._names('cameras')
+
+    def class_names(self):
+        """Noms des classes de la galerie, par code."""
+        return self._names('classes')
+
+    def class_code(self, class_name):
+        """Code d'une classe (None si aucun track de cette classe n'a été créé)."""
+        return self._code('classes', class_name)
+
+    def memory_per_track(self):
+        """Octets occupés par un track global (embedding et métadonnées)."""
+        return sum(getattr(self, f'_{name}')[:1].nbytes for name in self._row_fields)
+
+    # --- Écriture (sous verrou) ---
+
+    @contextmanager
+    def writing(self):
+        """
+        Section d'écriture : prend le verrou et signale l'écriture aux lecteurs.
+        Les sections imbriquées ne comptent qu'une fois.
+        """
+        start = time.perf_counter()
+        with self.lock:
+            self.lock_wait += time.perf_counter() - start
+            outermost = self._write_depth == 0
+            self._write_depth += 1
+            if outermost:
+                self._header[_VERSION] += 1
+            try:
+                yield
+            finally:
+                self._write_depth -= 1
+                if outermost:
+                    self._header[_VERSION] += 1
+
+    def _normalized(self, embedding):
+        """Vérifie la dimension d'un embedding et le normalise (L2)."""
+        vec = np.asarray(embedding, dtype=np.float32).ravel()
+        if vec.shape[0] != self.dim:
+            raise ValueError(
+                f"Dimension d'embedding {vec.shape[0]} différente de celle de la galerie ({self.dim}). "
+                f"Ajustez GALLERY_EMBEDDING_DIM dans config.py."
+            )
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    def _row_of(self, gid):
+        """Renvoie la ligne d'un ID global (à appeler sous verrou)."""
+        rows = np.flatnonzero(self._ids[:int(self._header[_SIZE])] == gid)
+        if len(rows) == 0:
+            raise KeyError(gid)
+        return int(rows[0])
+
+    def _code(self, table, name, add=False):
+        """
+        Code d'un nom dans une table de noms ('cameras' ou 'classes').
+
+        Args:
+            table (str): Table de noms
+            name (str): Nom cherché
+            add (bool): Ajouter le nom s'il est nouveau (à appeler dans une section d'écriture)
+
+        Returns:
+            int | None: Code du nom, None s'il est absent (et add=False)
+        """
+        codes = self._codes[table]
+        code = codes.get(name)
+        if code is None:
+            slot, limit = _NAME_TABLES[table]
+            values = getattr(self, f'_{table}')
+            encoded = os.fsencode(name)[:values.dtype.itemsize]
+            count = int(self._header[slot])
+            found = np.flatnonzero(values[:count] == encoded)
+            if len(found):
+                code = int(found[0])
+            elif not add:
+                return None
+            elif count < limit:
+                # Nom écrit avant le compteur : un lecteur ne voit jamais de code sans nom
+                code = count
+                values[code] = encoded
+                self._header[slot] = count + 1
+            else:
+                raise ValueError(f"Plus de {limit} noms dans la table '{table}' de la galerie")
+            codes[name] = code
+        return code
+
+    def _store(self, row, embedding):
+        """Écrit un embedding normalisé dans le type de stockage (int8 : échelle max|v| / 127)."""
+        if self.dtype == 'int8':
+            scale = float(np.abs(embedding).max()) / 127.0
+            self._scales[row] = scale
+            self._embeddings[row] = np.rint(embedding / scale) if scale > 0 else 0
+        else:
+            self._embeddings[row] = embedding
+
+    def _set_row(self, row, embedding, pos, video_name, timestamp, frame_idx):
+        """Écrit les données d'une ligne (à appeler dans une section d'écriture)."""
+        self._store(row, embedding)
+        self._last_pos[row] = pos
+        self._last_camera[row] = self._code('cameras', video_name, add=True)
+        self._last_time[row] = timestamp
+        self._last_frame[row] = frame_idx
+        self._hits[row] += 1
+        self._header[_TICK] += 1
+        self._last_access[row] = self._header[_TICK]
+
+    def update(self, gid, embedding, pos, video_name, timestamp=0.0, frame_idx=0):
+        """
+        Met à jour un track global existant.
+        L'embedding est lissé par moyenne mobile exponentielle (ema_alpha).
+
+        Args:
+            gid (int): ID global
+            embedding (np.array): Nouvel embedding
+            pos (tuple): Dernière position (x, y)
+            video_name (str): Dernière vidéo où l'objet a été vu
+            timestamp (float): Instant de l'observation (secondes de vidéo)
+            frame_idx (int): Index de frame de l'observation
+
+        Returns:
+            bool: False si le track n'est plus dans la galerie (évincé entre-temps)
+        """
+        embedding = self._normalized(embedding)
+        with self.writing():
+            try:
+                row = self._row_of(gid)
+            except KeyError:
+                return False
+            if self.ema_alpha < 1.0:
+                embedding = self._normalized((1.0 - self.ema_alpha) * self._embedding(row) + self.ema_alpha * embedding)
+            self._set_row(row, embedding, pos, video_name, timestamp, frame_idx)
+            return True
+
+    def append(self, embedding, pos, video_name, timestamp=0.0, frame_idx=0, class_name=None):
+        """
+        Ajoute un nouveau track global et lui attribue un ID.
+        Si la galerie est pleine, le track le moins récemment utilisé est évincé ;
+        si la partition de la classe est pleine (class_capacity), le track le
+        moins récemment utilisé de cette classe.
+
+        Args:
+            embedding (np.array): Embedding de l'objet
+            pos (tuple): Position (x, y)
+            video_name (str): Vidéo où l'objet a été vu
+            timestamp (float): Instant de l'observation (secondes de vidéo)
+            frame_idx (int): Index de frame de l'observation
+            class_name (str): Classe de l'objet (partition), None si inconnue
+
+        Returns:
+            int: Nouvel ID global
+        """
+        embedding = self._normalized(embedding)
+        with self.writing():
+            code = -1 if class_name is None else self._code('classes', class_name, add=True)
+            quota = self.class_capacity.get(class_name)
+            if quota is not None:
+                start, stop = self._class_rows(code, int(self._header[_SIZE]))
+                if stop - start >= max(1, quota):
+                    self._remove_rows([start + int(np.argmin(self._last_access[start:stop]))], 'lru')
+            if int(self._header[_SIZE]) >= self.capacity:
+                lru_row = int(np.argmin(self._last_access[:self.capacity]))
+                self._remove_rows([lru_row], 'lru')
+
+            size = int(self._header[_SIZE])
+            row = self._insert_row(code, size)
+            new_gid = int(self._header[_NEXT_ID])
+            self._ids[row] = new_gid
+            self._class_code[row] = code
+            self._hits[row] = 0
+            self._set_row(row, embedding, pos, video_name, timestamp, frame_idx)
+            self._header[_NEXT_ID] = new_gid + 1
+            self._header[_SIZE] = size + 1
+            return new_gid
+
+    def expire(self, timestamp=None, frame_idx=None, ttl_seconds=None, ttl_frames=None, camera=None):
+        """
+        Retire les tracks inactifs depuis plus d'un TTL (en secondes ou en frames).
+
+        Les caméras ne sont pas traitées en même temps (processus de travail
+        en nombre borné) : avec `camera`, seuls les tracks vus en dernier sur
+        cette caméra sont comparés à son horloge.
+
+        Args:
+            timestamp (float): Instant courant (secondes de vidéo)
+            frame_idx (int): Index de frame courant
+            ttl_seconds (float): Inactivité maximale en secondes (None = ignoré)
+            ttl_frames (int): Inactivité maximale en frames (None = ignoré)
+            camera (str): Caméra de l'horloge courante (None = tous les tracks)
+
+        Returns:
+            int: Nombre de tracks expirés
+        """
+        with self.writing():
+            size = int(self._header[_SIZE])
+            expired = np.zeros(size, dtype=bool)
+            if ttl_seconds is not None and timestamp is not None:
+                expired |= timestamp - self._last_time[:size] > ttl_seconds
+            if ttl_frames is not None and frame_idx is not None:
+                expired |= frame_idx - self._last_frame[:size] > ttl_frames
+            if camera is not None:
+                code = self._code('cameras', camera)
+                if code is None:
+                    expired[:] = False  # Caméra encore absente de la galerie
+                else:
+                    expired &= self._last_camera[:size] == code
+            rows = np.flatnonzero(expired)
+            if len(rows):
+                self._remove_rows(rows, 'ttl')
+            return len(rows)
+
+    def _remove_rows(self, rows, reason):
+        """
+        Archive puis retire des lignes en gardant la galerie contiguë
+        (à appeler dans une section d'écriture).
+
+        Args:
+            rows (list): Lignes à retirer
+            reason (str): Motif du retrait ('ttl' ou 'lru')
+        """
+        self._archive(rows, reason)
+        # Retirer de la fin vers le début : un retrait ne déplace que des lignes situées après
+        for row in sorted((int(r) for r in rows), reverse=True):
+            removed = int(self._header[_REMOVED])
+            self._removed_log[removed % REMOVED_LOG_LEN] = self._ids[row]
+            self._header[_REMOVED] = removed + 1
+
+            size = int(self._header[_SIZE])
+            # Le trou passe à la fin de sa partition, puis à la fin de chaque partition suivante
+            hole = row
+            for end in self._block_bounds(int(self._class_code[row]), size, 'right'):
+                if end - 1 != hole:
+                    self._move_row(end - 1, hole)
+                hole = end - 1
+            self._header[_SIZE] = size - 1
+
+    def _block_bounds(self, first_code, size, side):
+        """
+        Débuts (side='left') ou fins (side='right') des partitions de code
+        >= first_code, partitions vides omises.
+        """
+        class_codes = self._class_code[:size]
+        if size == 0 or int(class_codes[size - 1]) < first_code:
+            return []
+        codes = np.arange(first_code, int(class_codes[size - 1]) + 1)
+        return np.unique(np.searchsorted(class_codes, codes, side)).tolist()
+
+    def _insert_row(self, code, size):
+        """
+        Libère la ligne à la fin de la partition `code` : la première ligne de
+        chaque partition suivante passe à la fin de celle-ci (à appeler dans une
+        section d'écriture, avant d'incrémenter la taille).
+
+        Returns:
+            int: Ligne libérée
+        """
+        free = size
+        for start in reversed(self._block_bounds(code + 1, size, 'left')):
+            self._move_row(start, free)
+            free = start
+        return free
+
+    def _move_row(self, src, dst):
+        """Copie toutes les données d'une ligne sur une autre."""
+        for name in self._row_fields:
+            arr = getattr(self, f'_{name}')
+            arr[dst] = arr[src]
+
+    def _sort_rows(self):
+        """Trie les lignes par classe (galerie sauvegardée avant le tri par partition)."""
+        size = int(self._header[_SIZE])
+        class_codes = self._class_code[:size]
+        if size < 2 or not np.any(class_codes[1:] < class_codes[:-1]):
+            return
+        order = np.argsort(class_codes, kind='stable')
+        for name in self._row_fields:
+            arr = getattr(self, f'_{name}')
+            arr[:size] = arr[:size][order]
+
+    # --- Sauvegarde sur disque (reprise après arrêt) ---
+
+    def save(self, path):
+        """
+        Écrit une copie cohérente de la galerie (lignes utilisées, compteur
+        d'IDs) dans un fichier .npz (remplacement atomique).
+
+        Chaque sauvegarde porte une génération croissante. Les sauvegardes de
+        plusieurs processus sont écrites l'une après l'autre, sous le verrou
+        (les écritures dans la galerie attendent, pas les lectures) : le
+        fichier contient toujours la génération la plus récente.
+
+        Args:
+            path (str): Fichier de sauvegarde
+
+        Returns:
+            int: Génération de la sauvegarde
+        """
+        with self.lock:
+            with self.writing():
+                self._header[_SNAPSHOT] += 1
+                generation = int(self._header[_SNAPSHOT])
+                size = int(self._header[_SIZE])
+                arrays = {'dim': np.asarray(self.dim), 'header': self._header.copy(),
+                          'removed_log': self._removed_log.copy(),
+                          'cameras': self._cameras[:int(self._header[_N_CAMERAS])].copy(),
+                          'classes': self._classes[:int(self._header[_N_CLASSES])].copy()}
+                for name in self._row_fields:
+                    arrays[name] = getattr(self, f'_{name}')[:size].copy()
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, path)
+        return generation
+
+    def load(self, path):
+        """
+        Recharge une galerie sauvegardée par save() (remplace le contenu).
+
+        Raises:
+            ValueError: Dimension ou stockage des embeddings différent, ou capacité insuffisante
+        """
+        with np.load(path) as data:
+            if int(data['dim']) != self.dim:
+                raise ValueError(f"Galerie sauvegardée de dimension {int(data['dim'])}, attendu {self.dim}")
+            if data['embeddings'].dtype != np.dtype(self.dtype):
+                raise ValueError(f"Galerie sauvegardée en {data['embeddings'].dtype}, attendu {self.dtype}")
+            size = len(data['ids'])
+            if size > self.capacity:
+                raise ValueError(f"Galerie sauvegardée de {size} tracks, capacité {self.capacity}")
+            with self.writing():
+                for name in self._row_fields:
+                    getattr(self, f'_{name}')[:size] = data[name]
+                self._removed_log[:] = data['removed_log']
+                for table in _NAME_TABLES:
+                    values = getattr(self, f'_{table}')
+                    values[:] = b''
+                    values[:len(data[table])] = data[table]
+                    self._codes[table] = {}
+                version = self._header[_VERSION]
+                self._header[:] = data['header']
+                self._header[_VERSION] = version  # Le seqlock garde sa propre valeur
+                self._header[_SIZE] = size
+                self._header[_DIM] = self.dim
+                self._header[_CAPACITY] = self.capacity
+                self._header[_DTYPE] = EMBEDDING_DTYPES.index(self.dtype)
+                self._sort_rows()
+
+    def reserve_ids(self, next_id):
+        """Garantit que les prochains IDs attribués seront au moins `next_id` (IDs déjà utilisés)."""
+        with self.writing():
+            if int(self._header[_NEXT_ID]) < next_id:
+                self._header[_NEXT_ID] = next_id
+
+    def _archive(self, rows, reason):
+        """Ajoute les tracks retirés au fichier d'archive CSV."""
+        if not self.archive_path:
+            return
+        write_header = not os.path.exists(self.archive_path)
+        with open(self.archive_path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if write_header:
+                writer.writerow(ARCHIVE_COLUMNS)
+            for row in rows:
+                data = self._row_data(row)
+                writer.writerow([
+                    int(self._ids[row]), data['class_name'] or '', data['last_video'], data['last_pos'][0], data['last_pos'][1],
+                    data['last_time'], data['last_frame'], data['hits'], reason
+                ])
+
+
+def count_archived_ids(archive_path):
+    """
+    Compte les IDs globaux distincts présents dans une archive de galerie.
+
+    Args:
+        archive_path (str): Chemin du fichier d'archive CSV
+
+    Returns:
+        int: Nombre d'IDs archivés (0 si le fichier n'existe pas)
+    """
+    if not os.path.exists(archive_path):
+        return 0
+    with open(archive_path, 'r', encoding='utf-8') as f:
+        return len({row['id'] for row in csv.DictReader(f)})
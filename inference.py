@@ -0,0 +1,308 @@
+"""
+Module d'inférence par lots sur plusieurs caméras.
+
+Un seul processus décode N vidéos, regroupe une frame de chaque caméra dans
+un lot et lance la détection YOLO (model.predict) sur tout le lot, en un
+appel par taille d'entrée (une seule taille sans régions d'intérêt) : le
+coût fixe de chaque appel au modèle est partagé entre les caméras.
+Chaque caméra garde son propre tracker BoT-SORT (construit depuis
+custom_tracker.yaml) et son propre CameraPipeline ; les résultats du lot
+sont renvoyés à la caméra d'origine. Une caméra dont la scène est immobile
+(porte de mouvement, motion.py) ne participe pas au lot de cette frame ;
+une caméra avec des régions d'intérêt (roi.py) n'y envoie que ses régions.
+
+Utile surtout sur CPU, pour de nombreuses caméras basse résolution.
+"""
+
+import time
+
+import numpy as np
+
+import config
+from processor import CameraPipeline, DETECTION_ARGS, load_models
+
+
+def build_tracker(fps, reid=None, tracker_config=None):
+    """
+    Construit un tracker BoT-SORT indépendant pour une caméra.
+
+    Avec `model: auto` (custom_tracker.yaml), BoT-SORT utilise les
+    caractéristiques internes du détecteur, que le chemin par lots ne
+    fournit pas : le modèle ReID déjà chargé sert alors d'encodeur
+    d'apparence (pas de copie de modèle par caméra).
+
+    Args:
+        fps (float): Cadence de la vidéo (durée de vie des tracks perdus)
+        reid (ReID): Modèle ReID partagé
+        tracker_config (str): Fichier de configuration du tracker
+
+    Returns:
+        BOTSORT: Tracker vide
+    """
+    # Imports locaux : le découpage et la répartition des lots ne dépendent pas d'ultralytics
+    from ultralytics.trackers.bot_sort import BOTSORT
+    from ultralytics.utils import IterableSimpleNamespace
+    from ultralytics.utils.checks import check_yaml
+    try:
+        from ultralytics.utils import YAML
+        _load_yaml = YAML.load
+    except ImportError:  # Versions plus anciennes d'ultralytics
+        from ultralytics.utils import yaml_load as _load_yaml
+
+    cfg = IterableSimpleNamespace(**_load_yaml(check_yaml(tracker_config or config.TRACKER_CONFIG)))
+    tracker = BOTSORT(args=cfg, frame_rate=int(round(fps)) or 30)
+    if cfg.with_reid and cfg.model == 'auto' and reid is not None:
+        tracker.encoder = reid
+    return tracker
+
+
+def apply_tracker(tracker, result):
+    """
+    Met à jour le tracker d'une caméra avec les détections d'une frame et
+    renvoie le résultat avec les IDs locaux (comme model.track).
+
+    Args:
+        tracker (BOTSORT): Tracker de la caméra
+        result (Results): Détections de la frame
+
+    Returns:
+        Results: Résultat tracké (boxes.id à None si aucun track)
+    """
+    import torch
+
+    det = result.boxes.cpu().numpy()
+    tracks = tracker.update(det, result.orig_img)
+    if len(tracks) == 0:
+        return result
+    idx = tracks[:, -1].astype(int)
+    result = result[idx]
+    result.update(boxes=torch.as_tensor(tracks[:, :-1]))
+    return result
+
+
+def detect_batch(model, frames, imgsz=None):
+    """
+    Détection YOLO sur un lot de frames (éventuellement de tailles différentes).
+
+    Args:
+        model (YOLO): Modèle de détection
+        frames (list): Images BGR
+        imgsz (int): Taille d'entrée du détecteur (None = DETECTION_ARGS)
+
+    Returns:
+        list: Un Results par frame, dans l'ordre du lot
+    """
+    if imgsz is None:
+        return model.predict(source=frames, **DETECTION_ARGS)
+    return model.predict(source=frames, **dict(DETECTION_ARGS, imgsz=imgsz))
+
+
+def crop_regions(frame, rects):
+    """Découpe les régions (x1, y1, x2, y2) d'une frame (vues, sans copie)."""
+    return [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in rects]
+
+
+def region_boxes(rects, boxes, overlap=0.5):
+    """
+    Ramène les boîtes détectées dans chaque région en coordonnées de la frame
+    entière. Un objet détecté par deux régions voisines n'est gardé qu'une
+    fois : entre deux boîtes de même classe venant de régions différentes
+    dont l'intersection couvre plus de `overlap` de la plus petite, seule la
+    plus confiante est gardée.
+
+    Args:
+        rects (list): Régions (x1, y1, x2, y2) détectées
+        boxes (list): Détections de chaque région, tableau (n, 6) [x1, y1, x2, y2, conf, classe]
+        overlap (float): Recouvrement au-delà duquel deux boîtes sont un même objet
+
+    Returns:
+        np.array: Boîtes (m, 6) de la frame, dans l'ordre des régions
+    """
+    parts, origin = [], []
+    for k, ((x1, y1, _, _), data) in enumerate(zip(rects, boxes)):
+        data = np.array(data, dtype=np.float32).reshape(-1, 6)
+        data[:, [0, 2]] += x1
+        data[:, [1, 3]] += y1
+        parts.append(data)
+        origin.append(np.full(len(data), k))
+    if not parts:
+        return np.zeros((0, 6), dtype=np.float32)
+    data, origin = np.concatenate(parts), np.concatenate(origin)
+
+    areas = (data[:, 2] - data[:, 0]) * (data[:, 3] - data[:, 1])
+    keep = []
+    for i in np.argsort(-data[:, 4], kind='stable'):
+        kept = np.array(keep, dtype=int)
+        kept = kept[(origin[kept] != origin[i]) & (data[kept, 5] == data[i, 5])]
+        if len(kept):
+            w = np.minimum(data[kept, 2], data[i, 2]) - np.maximum(data[kept, 0], data[i, 0])
+            h = np.minimum(data[kept, 3], data[i, 3]) - np.maximum(data[kept, 1], data[i, 1])
+            inter = np.clip(w, 0, None) * np.clip(h, 0, None)
+            if np.any(inter > overlap * np.minimum(areas[kept], areas[i])):
+                continue
+        keep.append(i)
+    return data[np.sort(np.array(keep, dtype=int))]
+
+
+def merge_regions_results(frame, rects, results, names):
+    """
+    Rassemble les détections des régions d'une frame en un résultat pleine
+    frame (boîtes ramenées en coordonnées de la frame entière, doublons
+    entre régions voisines retirés, voir region_boxes).
+
+    Args:
+        frame (np.array): Frame entière
+        rects (list): Régions (x1, y1, x2, y2) détectées
+        results (list): Un Results par région
+        names (dict): Noms des classes du modèle
+
+    Returns:
+        Results: Détections de la frame
+    """
+    import torch
+    from ultralytics.engine.results import Results
+
+    data = region_boxes(rects, [result.boxes.cpu().numpy().data for result in results], DETECTION_ARGS['iou'])
+    return Results(frame, path='', names=names, boxes=torch.from_numpy(data))
+
+
+def detect_frames(model, frames, planners, track_boxes):
+    """
+    Détection d'une frame par caméra en un minimum d'appels au détecteur.
+
+    Chaque caméra envoie sa frame entière, ou ses régions d'intérêt si elle a
+    un RegionPlanner (roi.py). Les entrées sont regroupées par taille
+    d'entrée : un appel au détecteur par taille, chaque entrée n'est mise à
+    l'échelle qu'à sa propre taille. Les pixels envoyés sont comptés par le
+    RegionPlanner de la caméra.
+
+    Args:
+        model (YOLO): Modèle de détection
+        frames (list): Une frame par caméra
+        planners (list): RegionPlanner de chaque caméra (None = frame entière)
+        track_boxes (list): Boîtes (x1, y1, x2, y2) des objets suivis de chaque caméra
+
+    Returns:
+        list: (régions, résultats) par caméra, dans l'ordre des frames ; régions à
+              None et un seul résultat pour une frame entière
+    """
+    inputs, sizes, spans = [], [], []
+    for frame, planner, boxes in zip(frames, planners, track_boxes):
+        rects = planner.plan(boxes) if planner is not None else None
+        if rects is None:
+            crops, crop_sizes = [frame], [DETECTION_ARGS['imgsz']]
+        else:
+            crops, crop_sizes = crop_regions(frame, rects), planner.input_sizes(rects)
+        if planner is not None:
+            planner.record(crop_sizes)
+        spans.append((len(inputs), len(crops), rects))
+        inputs.extend(crops)
+        sizes.extend(crop_sizes)
+
+    detections = [None] * len(inputs)
+    for size in sorted(set(sizes), reverse=True):
+        indices = [i for i, s in enumerate(sizes) if s == size]
+        for i, result in zip(indices, detect_batch(model, [inputs[i] for i in indices], size)):
+            detections[i] = result
+    return [(rects, detections[first:first + n]) for first, n, rects in spans]
+
+
+def detect_regions(model, frame, planner, track_boxes=()):
+    """
+    Détection limitée aux régions d'intérêt d'une frame (roi.py).
+
+    Args:
+        model (YOLO): Modèle de détection
+        frame (np.array): Frame entière
+        planner (RegionPlanner): Régions de la caméra
+        track_boxes (list): Boîtes (x1, y1, x2, y2) des objets suivis
+
+    Returns:
+        Results: Détections en coordonnées de la frame entière
+    """
+    [(rects, results)] = detect_frames(model, [frame], [planner], [track_boxes])
+    if rects is None:
+        return results[0]
+    return merge_regions_results(frame, rects, results, model.names)
+
+
+def process_video_group(video_names, gallery, shared_target_id, headless=False, viewer_address=None, models=None,
+                        matcher=None, profile=False, resume=False):
+    """
+    Traite plusieurs vidéos dans un même processus avec une détection par lots.
+
+    À chaque tour, une frame est lue sur chaque caméra encore active ; le lot
+    est détecté en un seul appel puis chaque résultat est tracké et traité
+    par le pipeline de sa caméra.
+
+    Args:
+        video_names (list): Vidéos à traiter ensemble
+        gallery (SharedGallery): Galerie partagée des tracks globaux
+        shared_target_id (Value): ID de l'objet ciblé pour le suivi
+        headless (bool): Aucun affichage
+        viewer_address (tuple): Adresse du serveur du visualiseur, None si désactivé
+        models (tuple): (model, reid) déjà chargés, None pour les charger
+        matcher (MatcherClient): Client du service de matching, None pour un matching local
+        profile (bool): Mesurer le temps de chaque étape (par caméra)
+        resume (bool): Reprendre chaque vidéo à son dernier point de reprise
+    """
+    model, reid = models if models is not None else load_models()
+
+    pipelines, trackers, streams = [], [], []
+    try:
+        for video_name in video_names:
+            pipeline = CameraPipeline(video_name, gallery, shared_target_id, reid, model.names, headless,
+                                      viewer_address, matcher, profile, resume)
+            pipelines.append(pipeline)
+            trackers.append(build_tracker(pipeline.fps, reid))
+            streams.append(pipeline.frames())
+
+        active = list(range(len(pipelines)))
+        n_batches = 0
+        while active:
+            # Une frame par caméra active ; les caméras terminées quittent le lot
+            batch, idle = [], []
+            for cam in list(active):
+                item = next(streams[cam], None)
+                if item is None:
+                    pipelines[cam].completed = True  # Vidéo lue jusqu'au bout
+                    active.remove(cam)
+                elif pipelines[cam].needs_detection(item[1]):
+                    batch.append((cam,) + item)
+                else:
+                    idle.append((cam,) + item)
+
+            # Caméras dont la scène est immobile : pas de détection pour cette frame
+            for cam, frame_idx, frame in idle:
+                if not pipelines[cam].skip(frame_idx, frame):
+                    active.remove(cam)
+            if not batch:
+                continue
+
+            # Entrées du détecteur : frame entière, ou régions d'intérêt de la caméra
+            start = time.perf_counter()
+            detections = detect_frames(
+                model, [frame for _, _, frame in batch], [pipelines[cam].roi for cam, _, _ in batch],
+                [pipelines[cam].track_boxes() if pipelines[cam].roi is not None else () for cam, _, _ in batch])
+            n_batches += 1
+            # Coût de la détection par lots réparti entre les caméras du lot
+            share = (time.perf_counter() - start) / len(batch)
+            for (cam, frame_idx, frame), (rects, results) in zip(batch, detections):
+                pipeline = pipelines[cam]
+                if rects is None:
+                    result = results[0]
+                else:
+                    result = merge_regions_results(frame, rects, results, model.names)
+                pipeline.timer.add('detect', share)
+                with pipeline.timer.stage('track'):
+                    result = apply_tracker(trackers[cam], result)
+                if not pipeline.process(frame_idx, frame, result):
+                    active.remove(cam)
+
+        n_frames = sum(p.n_frames - (p.motion.skipped if p.motion else 0) for p in pipelines)
+        if n_batches:
+            print(f"[lot {'+'.join(video_names)}] {n_frames} frames en {n_batches} lots "
+                  f"({n_frames / n_batches:.1f} frames/lot)", flush=True)
+    finally:
+        for pipeline in pipelines:
+            pipeline.close()
@@ -4,10 +4,16 @@ Utilise le multiprocessing pour traiter plusieurs vidéos en parallèle.
 """
 
 import os
+import argparse
 import multiprocessing
 import config
-from processor import process_video_task
-from summary import generate_object_summary, print_summary_stats
+import viewer
+from checkpoint import save_gallery_snapshot
+from gallery import SharedGallery
+from scheduler import JobScheduler, print_job_status
+from service import print_service_stats
+from profiling import load_profiles, print_profile_breakdown, profile_path
+from summary import generate_object_summary, print_summary_stats, reset_states
 
 def main():
     """
@@ -17,43 +23,127 @@ def main():
     # Nécessaire pour le multiprocessing sous Windows
     multiprocessing.freeze_support()
 
-    # Gestionnaire de mémoire partagée pour la communication entre processus
-    manager = multiprocessing.Manager()
-    
-    # Structures de données partagées entre tous les processus
-    shared_global_tracks = manager.dict()      # Tracks globaux pour le suivi inter-vidéo
-    global_id_counter = manager.Value('i', 1)  # Compteur d'ID globaux
-    shared_target_id = manager.Value('i', -1)  # ID de l'objet ciblé (-1 = aucun)
-    lock = manager.Lock()                       # Verrou pour accès concurrent sécurisé
+    parser = argparse.ArgumentParser(description="Détection et suivi d'objets multi-vidéos")
+    parser.add_argument('--headless', action='store_true', default=config.HEADLESS,
+                        help="Aucun affichage (serveurs sans écran)")
+    parser.add_argument('--viewer', action='store_true', default=config.VIEWER_ENABLED,
+                        help="Permettre à viewer.py de s'attacher au traitement")
+    parser.add_argument('--workers', type=int, default=config.NUM_WORKERS,
+                        help="Nombre de processus de travail")
+    parser.add_argument('--batch-cameras', type=int, default=config.INFERENCE_BATCH_CAMERAS,
+                        help="Caméras regroupées dans une même détection par lots (1 = désactivé)")
+    parser.add_argument('--reid-service', action='store_true', default=config.REID_SERVICE,
+                        help="Calculer les embeddings ReID dans un processus unique partagé")
+    parser.add_argument('--matcher', action='store_true', default=config.MATCHER_SERVICE,
+                        help="Attribuer les IDs globaux dans un processus unique propriétaire de la galerie")
+    parser.add_argument('--profile', action='store_true', default=config.PROFILE_STAGES,
+                        help="Mesurer le temps de chaque étape (profile_*.json/.csv et répartition finale)")
+    parser.add_argument('--resume', action='store_true',
+                        help="Reprendre l'exécution précédente : vidéos terminées ignorées, "
+                             "les autres repartent de leur dernier point de reprise")
+    args = parser.parse_args()
 
     # Vérifier l'existence du dossier d'entrée
     if not os.path.exists(config.INPUT_FOLDER):
         print(f"Erreur: Le dossier '{config.INPUT_FOLDER}' n'existe pas.")
         return
 
+    # Repartir d'une archive de galerie vide (les IDs recommencent à 1),
+    # sauf en reprise ou avec une galerie persistante
+    archive_path = os.path.join(config.OUTPUT_FOLDER, config.GALLERY_ARCHIVE_FILE)
+    if os.path.exists(archive_path) and not args.resume and not config.GALLERY_FILE:
+        os.remove(archive_path)
+
+    # Structures de données partagées entre tous les processus
+    # Galerie des tracks globaux en mémoire partagée (embeddings, IDs, compteur d'IDs)
+    if config.GALLERY_FILE:
+        # Galerie persistante projetée en mémoire : les IDs continuent d'une exécution à l'autre
+        gallery = SharedGallery.open(
+            os.path.join(config.OUTPUT_FOLDER, config.GALLERY_FILE),
+            config.GALLERY_CAPACITY,
+            config.GALLERY_EMBEDDING_DIM,
+            ema_alpha=config.GALLERY_EMA_ALPHA,
+            archive_path=archive_path,
+            dtype=config.GALLERY_EMBEDDING_DTYPE,
+            class_capacity=config.GALLERY_CLASS_CAPACITY
+        )
+        if not args.resume:
+            gallery.rebase_time()
+        print(f"Galerie persistante: {len(gallery)} tracks globaux, prochain ID {gallery.next_id}")
+    else:
+        gallery = SharedGallery.create(
+            config.GALLERY_CAPACITY,
+            config.GALLERY_EMBEDDING_DIM,
+            ema_alpha=config.GALLERY_EMA_ALPHA,
+            archive_path=archive_path,
+            dtype=config.GALLERY_EMBEDDING_DTYPE,
+            class_capacity=config.GALLERY_CLASS_CAPACITY
+        )
+    # Galerie sauvegardée avec les points de reprise (--resume), inutile si elle est persistante
+    snapshot_path = os.path.join(config.OUTPUT_FOLDER, config.GALLERY_CHECKPOINT_FILE)
+    if args.resume and not gallery.persistent and os.path.exists(snapshot_path):
+        gallery.load(snapshot_path)
+        print(f"Reprise: galerie rechargée ({len(gallery)} tracks globaux, prochain ID {gallery.next_id})")
+    shared_target_id = multiprocessing.Value('i', -1)  # ID de l'objet ciblé (-1 = aucun)
+
+    # Serveur pour le visualiseur optionnel (python viewer.py)
+    viewer_address = None
+    if args.viewer:
+        viewer.serve(shared_target_id)
+        viewer_address = config.VIEWER_ADDRESS
+        print(f"Visualiseur disponible sur {viewer_address[0]}:{viewer_address[1]} (python viewer.py)")
+
     # Récupérer toutes les vidéos à traiter
     video_files = [f for f in os.listdir(config.INPUT_FOLDER) if f.endswith(('.mp4', '.MP4'))]
     print(f"Vidéos trouvées: {video_files}")
+    if not args.resume:
+        # Ne pas fusionner dans le résumé les résultats d'une exécution précédente
+        reset_states(config.OUTPUT_FOLDER, video_files)
+    if args.profile:
+        # Ne pas mélanger les profils d'une exécution précédente
+        for video_name in video_files:
+            for ext in ('json', 'csv'):
+                path = profile_path(config.OUTPUT_FOLDER, video_name, ext)
+                if os.path.exists(path):
+                    os.remove(path)
 
-    # Créer et démarrer un processus par vidéo
-    processes = []
-    for video_name in video_files:
-        p = multiprocessing.Process(
-            target=process_video_task,
-            args=(video_name, shared_global_tracks, shared_target_id, global_id_counter, lock)
-        )
-        processes.append(p)
-        p.start()
+    def refresh():
+        """Rafraîchit le résumé (la galerie est sauvegardée avec les points de reprise des vidéos)."""
+        generate_object_summary(config.OUTPUT_FOLDER, verbose=False, video_names=video_files)
 
-    # Attendre que tous les processus se terminent
-    for p in processes:
-        p.join()
+    # Répartir les vidéos sur un nombre borné de processus de travail,
+    # en rafraîchissant le résumé à partir des fichiers d'état des vidéos
+    try:
+        scheduler = JobScheduler(
+            video_files, gallery, shared_target_id, args.headless, viewer_address,
+            n_workers=args.workers, group_size=args.batch_cameras, use_reid_service=args.reid_service,
+            use_matcher=args.matcher,
+            profile=args.profile,
+            resume=args.resume
+        )
+        status = scheduler.run(
+            refresh=refresh,
+            refresh_interval=config.SUMMARY_REFRESH_SECONDS
+        )
+        if gallery.persistent or config.CHECKPOINT_INTERVAL:
+            save_gallery_snapshot(gallery, config.OUTPUT_FOLDER)
+        print(f"Traitement global terminé ({len(gallery)} tracks globaux).")
+    finally:
+        # Libérer le segment partagé même après une erreur ou une interruption (Ctrl+C)
+        gallery.unlink()
+        if args.viewer and os.path.exists(viewer.key_path()):
+            os.remove(viewer.key_path())
 
-    print("Traitement global terminé.")
+    print_job_status(status)
+    for service_stats in scheduler.service_stats:
+        print_service_stats(service_stats)
+    if args.profile:
+        # Répartition du temps par étape sur l'ensemble des vidéos
+        print_profile_breakdown(load_profiles(config.OUTPUT_FOLDER, video_files))
     
-    # Générer le résumé des objets détectés
+    # Générer le résumé final (fusion des compteurs des processus caméra)
     print("\nGénération du résumé des objets...")
-    stats = generate_object_summary(config.OUTPUT_FOLDER)
+    stats = generate_object_summary(config.OUTPUT_FOLDER, video_names=video_files)
     print_summary_stats(stats)
 
 if __name__ == "__main__":
@@ -0,0 +1,90 @@
+"""
+Module du service de matching global.
+
+Un processus unique attribue les IDs globaux pour toutes les caméras : les
+processus de travail lui envoient les embeddings de chaque frame et reçoivent
+les IDs en retour. Les demandes arrivées ensemble sont résolues en un seul
+lot (une recherche groupée dans la galerie, puis les mises à jour et
+créations dans l'ordre d'arrivée), ce qui supprime la concurrence entre
+processus sur les écritures de la galerie et garantit qu'un même nouvel objet
+vu au même moment par deux caméras ne reçoit qu'un seul ID.
+
+La galerie reste en mémoire partagée (lecture possible par tous), mais ce
+processus est le seul à y créer des tracks quand le service est actif. La
+topologie des caméras (topology.py) est alors appliquée ici : ses compteurs
+sont partagés avec le processus principal et inclus dans MatcherService.stats.
+"""
+
+import multiprocessing
+
+import config
+import tracking
+from topology import make_camera_graph
+from service import BatchedService, ServiceClient
+
+
+def _make_handler(gallery, graph_counters):
+    """Prépare l'index de recherche et la topologie des caméras du service et renvoie (handle, size)."""
+    index = tracking.make_matching_index()
+    graph = make_camera_graph()
+
+    def handle(requests):
+        ids = tracking.assign_global_ids_batch(gallery, requests, index, graph)
+        if graph is not None:
+            with graph_counters.get_lock():
+                graph_counters[:] = [graph.queries, graph.candidates, graph.gallery_rows]
+        return ids
+
+    return handle, lambda request: len(request[0])
+
+
+class MatcherClient(ServiceClient):
+    """Client du service de matching (un par processus de travail)."""
+
+    def assign(self, embeddings, positions, video_name, frame_idx=0, timestamp=0.0, class_names=None):
+        """
+        Demande les IDs globaux des détections d'une frame.
+
+        Mêmes arguments que tracking.assign_global_ids (sans galerie ni index).
+
+        Returns:
+            list: ID global de chaque détection
+        """
+        if len(embeddings) == 0:
+            return []
+        positions = [(float(x), float(y)) for x, y in positions]
+        class_names = list(class_names) if class_names is not None else None
+        return self.request((list(embeddings), positions, video_name, frame_idx, timestamp, class_names))
+
+
+class MatcherService(BatchedService):
+    """Processus propriétaire de l'attribution des IDs globaux."""
+
+    name = 'matching'
+    client_class = MatcherClient
+
+    def __init__(self, gallery, n_clients, max_batch=None, max_wait_ms=None):
+        super().__init__(
+            n_clients,
+            max_batch or config.MATCHER_MAX_BATCH,
+            config.MATCHER_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms
+        )
+        self.gallery = gallery
+        # Compteurs de la topologie du service : requêtes, identités comparées, identités de la galerie
+        self.graph_counters = multiprocessing.Array('d', 3)
+
+    def handler(self):
+        return _make_handler, (self.gallery, self.graph_counters)
+
+    def stats(self):
+        """
+        Renvoie les compteurs du service et, si une topologie est déclarée,
+        ceux de la topologie des caméras (clé 'topology', voir CameraGraph.stats).
+        """
+        stats = super().stats()
+        graph = make_camera_graph()
+        if graph is not None:
+            with self.graph_counters.get_lock():
+                graph.queries, graph.candidates, graph.gallery_rows = (int(c) for c in self.graph_counters)
+            stats['topology'] = graph.stats()
+        return stats
@@ -0,0 +1,118 @@
+"""
+Module de la porte de mouvement (caméras fixes).
+
+La plupart des vidéos montrent une scène immobile (couloir vide la nuit) :
+la détection complète n'y sert à rien tant que rien ne bouge. La porte
+compare chaque frame, réduite et en niveaux de gris, à un fond moyen
+(moyenne mobile) :
+- mouvement dans la scène (MOTION_MIN_AREA) ou près des objets suivis et
+  des zones d'alerte (MOTION_ROI_AREA, plus sensible) : détection à chaque
+  frame pendant au moins MOTION_HOLD_FRAMES frames ;
+- sinon, une seule détection toutes les MOTION_IDLE_STRIDE frames (objets
+  entrés lentement ou devenus immobiles).
+
+Les frames sans détection sont traitées par CameraPipeline.skip : les objets
+de la dernière frame détectée (immobiles) sont reportés avec l'index réel
+de la frame.
+"""
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Décide, frame par frame, si la détection doit être lancée.
+
+    Attributes:
+        frames (int): Frames examinées
+        skipped (int): Frames sans détection
+    """
+
+    def __init__(self, frame_size, zones=None, width=160, threshold=25, min_area=0.002, roi_area=0.0005,
+                 idle_stride=25, hold_frames=15, alpha=0.05, track_margin=0.25):
+        """
+        Args:
+            frame_size (tuple): (largeur, hauteur) des frames de la caméra
+            zones (ZoneMap): Zones d'alerte de la caméra (surveillées avec roi_area)
+            width (int): Largeur de l'image réduite comparée au fond
+            threshold (int): Écart de niveau de gris d'un pixel en mouvement
+            min_area (float): Part de l'image en mouvement déclenchant la détection
+            roi_area (float): Part de l'image en mouvement près des objets ou des zones déclenchant la détection
+            idle_stride (int): Sans mouvement, une détection toutes les N frames
+            hold_frames (int): Frames détectées après le dernier mouvement
+            alpha (float): Vitesse d'adaptation du fond (moyenne mobile)
+            track_margin (float): Marge autour des boîtes des objets suivis (fraction de leur taille)
+        """
+        full_width, full_height = frame_size
+        self.scale = width / float(full_width) if full_width else 1.0
+        self.size = (width, max(1, int(round(full_height * self.scale))))
+        self.threshold = threshold
+        self.min_pixels = max(1, int(min_area * self.size[0] * self.size[1]))
+        self.roi_pixels = max(1, int(roi_area * self.size[0] * self.size[1]))
+        self.idle_stride = max(1, idle_stride)
+        self.hold_frames = hold_frames
+        self.alpha = alpha
+        self.track_margin = track_margin
+
+        # Zones d'alerte à la résolution réduite (fixes)
+        self.zone_mask = np.zeros((self.size[1], self.size[0]), dtype=np.uint8)
+        if zones is not None and len(zones):
+            self.zone_mask[zones.coverage(self.size)] = 255
+
+        self.background = None  # Fond moyen (float32)
+        self.hold = 0           # Frames restant à détecter après un mouvement
+        self.since_detect = 0   # Frames depuis la dernière détection
+        self.frames = 0
+        self.skipped = 0
+
+    def _roi(self, boxes):
+        """Masque des zones d'alerte et des boîtes (x1, y1, x2, y2) agrandies des objets suivis."""
+        if not len(boxes):
+            return self.zone_mask
+        roi = self.zone_mask.copy()
+        for x1, y1, x2, y2 in boxes:
+            mx, my = self.track_margin * (x2 - x1), self.track_margin * (y2 - y1)
+            cv2.rectangle(roi, (int((x1 - mx) * self.scale), int((y1 - my) * self.scale)),
+                          (int((x2 + mx) * self.scale), int((y2 + my) * self.scale)), 255, -1)
+        return roi
+
+    def check(self, frame, boxes=()):
+        """
+        Examine une frame.
+
+        Args:
+            frame (np.array): Image BGR pleine résolution
+            boxes (list): Boîtes (x1, y1, x2, y2) des objets de la dernière frame détectée
+
+        Returns:
+            bool: True si la détection doit être lancée sur cette frame
+        """
+        self.frames += 1
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_LINEAR)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        if self.background is None:
+            self.background = gray.astype(np.float32)
+            self.since_detect = 0
+            return True
+
+        moving = cv2.absdiff(gray, cv2.convertScaleAbs(self.background))
+        _, moving = cv2.threshold(moving, self.threshold, 255, cv2.THRESH_BINARY)
+        cv2.accumulateWeighted(gray, self.background, self.alpha)
+
+        if (cv2.countNonZero(moving) >= self.min_pixels
+                or cv2.countNonZero(cv2.bitwise_and(moving, self._roi(boxes))) >= self.roi_pixels):
+            self.hold = self.hold_frames
+        elif self.hold > 0:
+            self.hold -= 1
+
+        self.since_detect += 1
+        if self.hold > 0 or self.since_detect >= self.idle_stride:
+            self.since_detect = 0
+            return True
+        self.skipped += 1
+        return False
+
+    def skip_rate(self):
+        """Part des frames examinées sans détection."""
+        return self.skipped / self.frames if self.frames else 0.0
@@ -4,204 +4,681 @@ Gère l'analyse frame par frame, le tracking local et global, les alertes et la
 """
 
 import os
-import csv
+import time
 import cv2
 import numpy as np
-import tkinter as tk
-from tkinter import simpledialog
-from ultralytics import YOLO
-from ultralytics.trackers.bot_sort import ReID
 
 import config
 import alerts
 import tracking
+from reid_policy import ReIDPolicy
+from viewer import ViewerPublisher
+from video_writer import AsyncVideoWriter, Annotation, draw_annotations
+from trajectory import open_trajectory_sink, is_resumable
+from summary import SummaryAccumulator
+from zone_events import ZoneEventEngine, EventLogger, events_path
+from profiling import StageTimer
+from checkpoint import save_checkpoint, load_checkpoint, remove_checkpoint, save_gallery_snapshot
+from motion import MotionGate
+from roi import RegionPlanner, camera_regions
+from topology import make_camera_graph, camera_time
 
-def process_video_task(video_name, shared_global_tracks, shared_target_id, global_id_counter, lock):
+
+def _init_dialog_root(video_name):
     """
-    Fonction de processus indépendante pour gérer l'analyse vidéo complète.
-    
-    Args:
-        video_name (str): Nom du fichier vidéo à traiter
-        shared_global_tracks (dict): Dictionnaire partagé des tracks globaux
-        shared_target_id (Value): ID de l'objet ciblé pour le suivi
-        global_id_counter (Value): Compteur d'IDs globaux
-        lock (Lock): Verrou pour l'accès concurrent aux données partagées
+    Initialise une instance Tk cachée pour les dialogues (mode interactif uniquement).
+    Tkinter n'est importé qu'ici, jamais en mode headless.
+
+    Returns:
+        tuple: (root, simpledialog) ou (None, None) si Tkinter est indisponible
     """
-    # Initialiser une instance Tk séparée pour ce processus (pour les dialogues)
-    root = None
     try:
-        root = tk.Tk()
-        root.withdraw()
+        import tkinter as tk
+        from tkinter import simpledialog
     except ImportError:
         print(f"[{video_name}] Warning: Tkinter non disponible, dialogues désactivés")
+        return None, None
+    try:
+        root = tk.Tk()
+        root.withdraw()
+        return root, simpledialog
     except tk.TclError:
         print(f"[{video_name}] Warning: Problème d'affichage Tkinter, dialogues désactivés")
+        return None, None
 
-    print(f"[{video_name}] DÉMARRAGE...")
-    
-    # Initialiser les modèles locaux (un par processus)
-    model = YOLO(config.YOLO_MODEL_PATH)
-    reid = ReID(model=config.REID_MODEL_PATH)
-
-    video_path = os.path.join(config.INPUT_FOLDER, video_name)
-    csv_path = os.path.join(config.OUTPUT_FOLDER, f"donnees_{video_name}.csv")
-
-    # Configuration de la vidéo
-    cap = cv2.VideoCapture(video_path)
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    
-    # Créer le fichier vidéo de sortie annoté
-    out_video_path = os.path.join(config.OUTPUT_FOLDER, f"annotated_{video_name}")
-    out = cv2.VideoWriter(out_video_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
-
-    # Récupérer les zones d'alerte pour cette vidéo
-    current_zones = config.ALERT_ZONES.get(video_name, [])
-    local_to_global = {}  # Mapping des IDs locaux vers IDs globaux
-
-    # Créer une fenêtre d'affichage
-    window_name = f"Video: {video_name}"
-    cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
-    cv2.resizeWindow(window_name, 640, 480)
-
-    # Lancer le tracking YOLO en streaming
-    results = model.track(
-        source=video_path,
-        device=0,              # GPU si disponible (sinon utilise CPU)
+
+def read_frames(cap, video_name, stride=1, start=0):
+    """
+    Décode les frames d'une vidéo une seule fois, en vérifiant leur index.
+
+    L'index renvoyé est celui de la frame dans la vidéo (les frames sautées par
+    `stride` comptent) ; il est contrôlé par rapport à la position du décodeur
+    pour détecter une frame perdue.
+
+    Args:
+        cap (cv2.VideoCapture): Vidéo ouverte
+        video_name (str): Nom de la vidéo (pour les messages)
+        stride (int): Ne traiter qu'une frame sur `stride`
+        start (int): Index de la première frame lue (reprise, décodeur déjà positionné)
+
+    Yields:
+        tuple: (frame_idx, frame)
+    """
+    frame_idx = start
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            return
+
+        # Contrôle de synchronisation : la position du décodeur suit la frame lue
+        pos = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+        if pos > 0 and pos - 1 != frame_idx:
+            print(f"[{video_name}] Warning: désynchronisation (frame {frame_idx} attendue, {pos - 1} lue)", flush=True)
+            frame_idx = pos - 1
+
+        yield frame_idx, frame
+
+        # Sauter les frames intermédiaires sans les décoder
+        for _ in range(stride - 1):
+            if not cap.grab():
+                return
+        frame_idx += stride
+
+
+def load_models(reid=None):
+    """
+    Charge les modèles de détection et de ReID (une fois par processus de travail).
+
+    Args:
+        reid: Client du service ReID (reid_service.py) à utiliser à la place d'un modèle local
+
+    Returns:
+        tuple: (model, reid)
+    """
+    # Import local : le reste du pipeline ne dépend pas d'ultralytics
+    from ultralytics import YOLO
+    from ultralytics.trackers.bot_sort import ReID
+
+    return YOLO(config.YOLO_MODEL_PATH), reid if reid is not None else ReID(model=config.REID_MODEL_PATH)
+
+
+def reset_tracker(model):
+    """
+    Réinitialise l'état du tracker (tracks, compensation de mouvement) avant
+    de réutiliser le modèle sur une autre vidéo.
+    """
+    predictor = getattr(model, 'predictor', None)
+    for tracker in getattr(predictor, 'trackers', None) or []:
+        tracker.reset()
+
+
+# Paramètres de détection communs au tracking frame par frame et à la détection par lots
+DETECTION_ARGS = dict(
+    device=0,              # GPU si disponible (sinon utilise CPU)
+    imgsz=1280,            # Taille d'image pour la détection
+    half=True,             # Utiliser la précision FP16 (plus rapide)
+    conf=0.5,              # Seuil de confiance minimum
+    iou=0.5,               # Seuil IoU pour NMS
+    save=False,            # Ne pas sauvegarder automatiquement
+    verbose=False
+)
+
+
+def track_frame(model, frame):
+    """
+    Lance la détection et le tracking YOLO sur une frame déjà décodée.
+
+    Args:
+        model (YOLO): Modèle de détection
+        frame (np.array): Image BGR
+
+    Returns:
+        Results: Résultat de la frame (boîtes avec IDs locaux)
+    """
+    return model.track(
+        source=frame,
         persist=True,          # Maintenir les tracks entre les frames
-        stream=True,           # Mode streaming pour économiser la mémoire
         tracker=config.TRACKER_CONFIG,
-        imgsz=1280,           # Taille d'image pour la détection
-        half=True,            # Utiliser la précision FP16 (plus rapide)
-        conf=0.5,             # Seuil de confiance minimum
-        iou=0.5,              # Seuil IoU pour NMS
-        vid_stride=1,         # Traiter chaque frame
-        save=False            # Ne pas sauvegarder automatiquement
-    )
-
-    # Créer le fichier CSV pour sauvegarder les trajectoires
-    with open(csv_path, mode='w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(['camera', 'frame', 'id', 'class_name', 'x_center', 'y_center', 'alerte'])
-
-        frame_idx = 0
-        for r in results:
-            ret, frame = cap.read()
-            if not ret: break
-
-            # Dessiner les zones d'alerte sur la frame
-            frame = alerts.draw_zones(frame, current_zones, config.ZONE_COLOR, config.ZONE_THICKNESS)
-
-            # Traiter les détections si des objets sont présents
-            if r.boxes.id is not None:
-                ids = r.boxes.id.int().cpu().tolist()
-                boxes = r.boxes.xywh.cpu().numpy()
-                clss = r.boxes.cls.int().cpu().tolist()
-
-                # Convertir les boîtes au format xyxy pour ReID
-                dets = np.array([[x - w/2, y - h/2, x + w/2, y + h/2] for x, y, w, h in boxes])
-                # Extraire les embeddings pour la réidentification
-                embeddings = reid(r.orig_img, dets) if len(dets) > 0 else []
-
-                for i, (obj_id, box, cls_id) in enumerate(zip(ids, boxes, clss)):
-                    name = model.names[cls_id]
-                    x, y, w, h = box
-                    x1, y1, x2, y2 = int(x - w/2), int(y - h/2), int(x + w/2), int(y + h/2)
+        **DETECTION_ARGS
+    )[0]
+
+
+def show_target_crops(frame, annotations, video_name):
+    """
+    Affiche un crop de l'objet ciblé dans une fenêtre séparée (mode interactif).
+
+    Args:
+        frame (np.array): Frame annotée
+        annotations (list): Annotations de la frame
+        video_name (str): Nom de la vidéo (pour les messages)
+    """
+    height, width = frame.shape[:2]
+    for a in annotations:
+        if not a.target:
+            continue
+        try:
+            crop_x1, crop_y1 = max(0, int(a.x1)), max(0, int(a.y1))
+            crop_x2, crop_y2 = min(width, int(a.x2)), min(height, int(a.y2))
+            if crop_x2 > crop_x1 and crop_y2 > crop_y1:
+                target_crop = frame[crop_y1:crop_y2, crop_x1:crop_x2]
+                cv2.imshow(f"Tracking ID {a.gid}", target_crop)
+        except cv2.error as e:
+            # Erreur OpenCV lors de l'affichage
+            print(f"[{video_name}] Warning: Erreur affichage crop: {e}", flush=True)
+        except (IndexError, ValueError) as e:
+            # Coordonnées invalides
+            print(f"[{video_name}] Warning: Coordonnées crop invalides: {e}", flush=True)
+
+
+class CameraPipeline:
+    """
+    Traitement d'une caméra à partir des détections trackées d'une frame :
+    ReID, attribution des IDs globaux, alertes, trajectoires, résumé,
+    vidéo annotée et affichage.
+
+    La détection et le tracking local sont faits par l'appelant, soit frame
+    par frame (process_video_task), soit par lots de plusieurs caméras
+    (inference.process_video_group).
+    """
 
-                    # Vérifier que l'embedding existe
-                    if i >= len(embeddings) or embeddings[i].size == 0:
+    def __init__(self, video_name, gallery, shared_target_id, reid, class_names, headless=False, viewer_address=None,
+                 matcher=None, profile=False, resume=False):
+        """
+        Args:
+            video_name (str): Nom du fichier vidéo à traiter
+            gallery (SharedGallery): Galerie partagée des tracks globaux
+            shared_target_id (Value): ID de l'objet ciblé pour le suivi
+            reid (ReID): Modèle de réidentification
+            class_names (dict): Noms des classes du modèle de détection
+            headless (bool): Aucun affichage (ni Tkinter, ni fenêtre OpenCV)
+            viewer_address (tuple): Adresse du serveur du visualiseur (viewer.py), None si désactivé
+            matcher (MatcherClient): Client du service de matching (matcher.py), None pour un matching local
+            profile (bool): Mesurer le temps de chaque étape (profile_<video>.json/.csv)
+            resume (bool): Reprendre au dernier point de reprise de la vidéo s'il existe
+        """
+        self.video_name = video_name
+        self.gallery = gallery
+        self.shared_target_id = shared_target_id
+        self.reid = reid
+        self.class_names = class_names
+        self.headless = headless
+        self.matcher = matcher
+        self.completed = False  # Vidéo lue jusqu'au bout (le point de reprise est alors supprimé)
+
+        # Point de reprise de la vidéo (reprise après un arrêt)
+        ckpt = load_checkpoint(config.OUTPUT_FOLDER, video_name) if resume else None
+        if ckpt is not None and not is_resumable(config.TRAJECTORY_FORMAT):
+            print(f"[{video_name}] Warning: format de trajectoires '{config.TRAJECTORY_FORMAT}' "
+                  f"non reprenable, la vidéo est traitée depuis le début", flush=True)
+            ckpt = None
+        if ckpt is not None and (ckpt.get('gallery_snapshot') or 0) > gallery.snapshot_generation:
+            print(f"[{video_name}] Warning: galerie rechargée plus ancienne que le point de reprise, "
+                  f"la vidéo est traitée depuis le début", flush=True)
+            ckpt = None
+        if ckpt is None:
+            remove_checkpoint(config.OUTPUT_FOLDER, video_name)
+        self.start_frame = ckpt['next_frame'] if ckpt else 0
+
+        # Chronomètres par étape (contexte vide si désactivés)
+        self.timer = StageTimer(enabled=profile, window=config.PROFILE_WINDOW)
+        self._lock_wait = gallery.lock_wait
+
+        # Initialiser une instance Tk séparée (pour les dialogues)
+        self.root, self.simpledialog = (None, None) if headless else _init_dialog_root(video_name)
+        self.publisher = ViewerPublisher(video_name, viewer_address)
+
+        print(f"[{video_name}] DÉMARRAGE...")
+
+        # Configuration de la vidéo
+        self.cap = cv2.VideoCapture(os.path.join(config.INPUT_FOLDER, video_name))
+        if self.start_frame:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+        # Zones d'alerte de cette vidéo, compilées une fois à la résolution de la caméra
+        self.zones = alerts.compile_zones(config.ALERT_ZONES.get(video_name, []), (width, height))
+
+        # Porte de mouvement : pas de détection tant que la scène est immobile
+        self.motion = None
+        if config.MOTION_GATE:
+            self.motion = MotionGate(
+                (width, height), self.zones,
+                width=config.MOTION_GATE_WIDTH,
+                threshold=config.MOTION_PIXEL_THRESHOLD,
+                min_area=config.MOTION_MIN_AREA,
+                roi_area=config.MOTION_ROI_AREA,
+                idle_stride=config.MOTION_IDLE_STRIDE,
+                hold_frames=config.MOTION_HOLD_FRAMES,
+                alpha=config.MOTION_BG_ALPHA
+            )
+        self._carry = ([], [], [])  # Détections de la dernière frame détectée (reportées par skip)
+
+        # Régions d'intérêt : détection limitée aux régions (None = frame entière)
+        regions = camera_regions(video_name, (width, height))
+        self.roi = None
+        if regions:
+            self.roi = RegionPlanner(
+                (width, height), regions,
+                imgsz=DETECTION_ARGS['imgsz'],
+                track_margin=config.ROI_TRACK_MARGIN,
+                max_area=config.ROI_MAX_AREA
+            )
+
+        # Événements de zone (entrée, sortie, stationnement), écrits par un thread dédié
+        self.zone_events = ZoneEventEngine(
+            enter_frames=config.ZONE_ENTER_FRAMES,
+            exit_frames=config.ZONE_EXIT_FRAMES,
+            min_duration=config.ZONE_MIN_DURATION,
+            dwell_seconds=config.ZONE_DWELL_SECONDS,
+            min_interval=config.ZONE_EVENT_MIN_INTERVAL
+        )
+        if ckpt:
+            self.zone_events.load_state(ckpt['zone_events'])
+        self.event_log = EventLogger(
+            events_path(config.OUTPUT_FOLDER, video_name), video_name,
+            queue_size=config.EVENT_QUEUE_SIZE, console=config.EVENT_CONSOLE,
+            resume_rows=ckpt['events'] if ckpt else None
+        )
+
+        # Créer le fichier vidéo de sortie annoté (écrit par un thread dédié) ;
+        # après une reprise, la suite de la vidéo annotée est un fichier séparé
+        out_video_name = f"annotated_{video_name}"
+        if ckpt:
+            stem, ext = os.path.splitext(video_name)
+            out_video_name = f"annotated_{stem}_reprise{self.start_frame}{ext}"
+        out_video_path = os.path.join(config.OUTPUT_FOLDER, out_video_name)
+        self.video_out = AsyncVideoWriter(
+            out_video_path, self.fps, (width, height), self.zones,
+            queue_size=config.WRITER_QUEUE_SIZE,
+            policy=config.WRITER_POLICY,
+            scale=config.WRITER_SCALE,
+            fps_divisor=config.WRITER_FPS_DIVISOR,
+            stride=config.VID_STRIDE,
+            enabled=config.WRITE_ANNOTATED_VIDEO,
+            timer=self.timer
+        )
+
+        # Cache des décisions ReID par track local
+        self.reid_policy = ReIDPolicy(
+            refresh_interval=config.REID_REFRESH_INTERVAL,
+            area_change=config.REID_AREA_CHANGE,
+            conf_change=config.REID_CONF_CHANGE,
+            track_timeout=config.REID_TRACK_TIMEOUT
+        )
+        self.local_to_global = self.reid_policy.local_to_global  # Mapping des IDs locaux vers IDs globaux
+        if ckpt:
+            # Les tracks locaux repartent de zéro (état interne du tracker non sauvegardé) ;
+            # les IDs globaux déjà attribués avant l'arrêt ne sont pas réutilisés
+            gallery.reserve_ids(ckpt['next_id'])
+        # Index de recherche local (None = recherche exacte), inutile avec le service de matching
+        self.match_index = tracking.make_matching_index() if matcher is None else None
+        # Topologie des caméras (None = toutes les identités sont candidates) ; portée par le service de matching s'il est actif
+        self.camera_graph = make_camera_graph() if matcher is None else None
+
+        # Compteurs du résumé, sauvegardés régulièrement (résumé consultable pendant le traitement)
+        self.summary = SummaryAccumulator.from_state(ckpt['summary']) if ckpt else SummaryAccumulator(video_name)
+        self.summary.save(config.OUTPUT_FOLDER)
+
+        # Créer une fenêtre d'affichage
+        self.window_name = f"Video: {video_name}"
+        if not headless:
+            cv2.namedWindow(self.window_name, cv2.WINDOW_NORMAL)
+            cv2.resizeWindow(self.window_name, 640, 480)
+
+        # Créer le fichier de trajectoires (écrit par blocs, cf. TRAJECTORY_FORMAT)
+        self.trajectories = open_trajectory_sink(config.OUTPUT_FOLDER, video_name, config.TRAJECTORY_FORMAT,
+                                                 config.TRAJECTORY_CHUNK_SIZE,
+                                                 resume=ckpt['trajectories'] if ckpt else None)
+
+        self.n_frames = ckpt['n_frames'] if ckpt else 0
+        self.last_frame_idx = ckpt['frame'] if ckpt else 0
+        self.start_time = time.perf_counter()
+        if ckpt:
+            print(f"[{video_name}] Reprise à la frame {self.start_frame} "
+                  f"({self.trajectories.rows_written} lignes de trajectoires conservées)", flush=True)
+
+    def frames(self):
+        """
+        Frames de la vidéo, décodées une seule fois : la même image sert au
+        modèle, à la ReID et à l'annotation.
+        """
+        frames = read_frames(self.cap, self.video_name, config.VID_STRIDE, self.start_frame)
+        if not self.timer.enabled:
+            yield from frames
+            return
+
+        # Décodage de chaque frame, et durée complète d'un tour de boucle ('frame')
+        timer = self.timer
+        cycle_start = None
+        while True:
+            start = time.perf_counter()
+            if cycle_start is not None:
+                timer.add('frame', start - cycle_start)
+            item = next(frames, None)
+            timer.add('decode', time.perf_counter() - start)
+            if item is None:
+                return
+            cycle_start = start
+            yield item
+
+    def timestamp(self, frame_idx):
+        """Temps de la frame sur la base de temps commune à toutes les caméras (secondes)."""
+        return camera_time(self.video_name, frame_idx, self.fps)
+
+    def track_boxes(self):
+        """Boîtes (x1, y1, x2, y2) des objets de la dernière frame détectée."""
+        return [(a.x1, a.y1, a.x2, a.y2) for a in self._carry[2]]
+
+    def needs_detection(self, frame):
+        """
+        Indique si la détection doit être lancée sur une frame (porte de
+        mouvement) ; sinon l'appelant la traite avec skip().
+        """
+        if self.motion is None:
+            return True
+        with self.timer.stage('motion'):
+            return self.motion.check(frame, self.track_boxes())
+
+    def skip(self, frame_idx, frame):
+        """
+        Traite une frame sans détection (scène immobile) : les objets de la
+        dernière frame détectée sont reportés à l'index de cette frame,
+        marqués interpolés dans les trajectoires et comptés à part dans le
+        résumé (ce ne sont pas des apparitions).
+
+        Returns:
+            bool: False si l'utilisateur a demandé l'arrêt (touche 'q')
+        """
+        self.n_frames += 1
+        self.last_frame_idx = frame_idx
+        self.summary.skipped += 1
+        rows, zone_visits, annotations = self._carry
+        with self.timer.stage('records'):
+            for gid, name, x, y, is_alert in rows:
+                self.trajectories.add(frame_idx, gid, name, x, y, is_alert, interpolated=True)
+                self.summary.add(name, gid, is_alert, interpolated=True)
+        return self._finish(frame_idx, frame, zone_visits, annotations)
+
+    def process(self, frame_idx, frame, r):
+        """
+        Traite une frame et ses détections trackées.
+
+        Args:
+            frame_idx (int): Index de la frame
+            frame (np.array): Image BGR décodée
+            r (Results): Résultat du tracking de la frame (boîtes avec IDs locaux)
+
+        Returns:
+            bool: False si l'utilisateur a demandé l'arrêt (touche 'q')
+        """
+        video_name = self.video_name
+        reid_policy = self.reid_policy
+        local_to_global = self.local_to_global
+        timer = self.timer
+        self.n_frames += 1
+        self.last_frame_idx = frame_idx
+
+        # Traiter les détections si des objets sont présents
+        has_tracks = r.boxes.id is not None
+        if has_tracks:
+            ids = r.boxes.id.int().cpu().tolist()
+            boxes = r.boxes.xywh.cpu().numpy()
+            clss = r.boxes.cls.int().cpu().tolist()
+            confs = r.boxes.conf.cpu().tolist()
+
+            # Convertir les boîtes au format xyxy pour ReID
+            dets = np.array([[x - w/2, y - h/2, x + w/2, y + h/2] for x, y, w, h in boxes])
+
+            with timer.stage('reid'):
+                # Ne calculer les embeddings que pour les tracks locaux qui en ont besoin
+                to_embed = [i for i in range(len(ids)) if reid_policy.needs_embedding(ids[i], frame_idx, boxes[i], confs[i])]
+                embeddings = self.reid(frame, dets[to_embed]) if to_embed else []
+
+                # Agréger les embeddings valides par track local
+                matched, query_embeddings = [], []
+                for j, i in enumerate(to_embed):
+                    if j < len(embeddings) and embeddings[j].size > 0:
+                        matched.append(i)
+                        query_embeddings.append(reid_policy.update(ids[i], frame_idx, boxes[i], confs[i], embeddings[j]))
+
+            # --- Matching Global ID avec les autres vidéos (une fois par frame) ---
+            with timer.stage('matching'):
+                positions = [(boxes[i][0], boxes[i][1]) for i in matched]
+                # Classe de chaque détection : partition de la galerie et seuil de similarité
+                query_classes = [self.class_names[clss[i]] for i in matched]
+                if self.matcher is not None:
+                    # Attribution par le processus propriétaire de la galerie
+                    frame_global_ids = self.matcher.assign(
+                        query_embeddings, positions, video_name, frame_idx, self.timestamp(frame_idx), query_classes
+                    )
+                else:
+                    frame_global_ids = tracking.assign_global_ids(
+                        self.gallery,
+                        query_embeddings,
+                        positions,
+                        video_name,
+                        frame_idx,
+                        self.timestamp(frame_idx),
+                        self.match_index,
+                        self.camera_graph,
+                        query_classes
+                    )
+                local_to_global.update((ids[i], gid) for i, gid in zip(matched, frame_global_ids))
+
+        rows, annotations, zone_visits = [], [], []
+        if has_tracks:
+            current_target = self.shared_target_id.value
+            # Zone de chaque centre de la frame, en un seul appel
+            with timer.stage('zones'):
+                zone_hits = self.zones.locate(boxes[:, :2])
+            with timer.stage('records'):
+                for i, obj_id in enumerate(ids):
+                    # Les tracks sans ID global (embedding invalide) sont ignorés
+                    final_global_id = local_to_global.get(obj_id)
+                    if final_global_id is None:
                         continue
-                    
-                    embedding = embeddings[i]
-
-                    # --- Matching Global ID avec les autres vidéos ---
-                    with lock:
-                        tracks_snapshot = shared_global_tracks.copy()
-                    
-                    # Trouver la meilleure correspondance avec les tracks existants
-                    best_id, best_sim = tracking.find_best_match(embedding, tracks_snapshot)
-                    
-                    final_global_id = None
-                    if best_id is not None and best_sim > config.SIMILARITY_THRESHOLD:
-                        # Objet reconnu, utiliser l'ID existant
-                        final_global_id = best_id
-                        tracking.update_global_track(shared_global_tracks, final_global_id, embedding, (x, y), video_name, lock)
-                    else:
-                        # Nouvel objet, créer un nouvel ID global
-                        final_global_id = tracking.create_new_track(shared_global_tracks, global_id_counter, embedding, (x, y), video_name, lock)
-                    
-                    local_to_global[obj_id] = final_global_id
+
+                    box, cls_id = boxes[i], clss[i]
+                    name = self.class_names[cls_id]
+                    x, y, w, h = box
 
                     # Vérification des alertes
-                    is_alert = 1 if alerts.is_in_zone(box, current_zones) else 0
+                    is_alert = 1 if zone_hits[i] >= 0 else 0
                     if is_alert:
-                        # Marquer l'objet en alerte avec un cercle rouge
-                        cv2.circle(frame, (int(x), int(y)), 10, config.ALERT_COLOR, -1)
-                        print(f"[{video_name}] ALERTE Objet {final_global_id}", flush=True)
-
-                    # Sauvegarder les données dans le CSV
-                    writer.writerow([video_name, frame_idx, final_global_id, name, x, y, is_alert])
-
-                    # Logique de visualisation
-                    current_target = shared_target_id.value
-                    color = config.TEXT_COLOR_NORMAL
-                    thickness = 2
-                    
-                    # Mettre en surbrillance l'objet ciblé
-                    if current_target != -1 and str(final_global_id) == str(current_target):
-                        color = config.TEXT_COLOR_TARGET
-                        thickness = 4
-                        cv2.putText(frame, "CIBLE", (x1, y1 - 30), cv2.FONT_HERSHEY_SIMPLEX, 0.9, color, 2)
-                        
-                        try:
-                            # Afficher un crop de l'objet ciblé dans une fenêtre séparée
-                            crop_x1, crop_y1 = max(0, x1), max(0, y1)
-                            crop_x2, crop_y2 = min(width, x2), min(height, y2)
-                            if crop_x2 > crop_x1 and crop_y2 > crop_y1:
-                                target_crop = frame[crop_y1:crop_y2, crop_x1:crop_x2]
-                                cv2.imshow(f"Tracking ID {current_target}", target_crop)
-                        except cv2.error as e:
-                            # Erreur OpenCV lors de l'affichage
-                            print(f"[{video_name}] Warning: Erreur affichage crop: {e}", flush=True)
-                        except (IndexError, ValueError) as e:
-                            # Coordonnées invalides
-                            print(f"[{video_name}] Warning: Coordonnées crop invalides: {e}", flush=True)
-                    
-                    # Dessiner la boîte englobante et l'ID
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), color, thickness)
-                    cv2.putText(frame, f"ID:{final_global_id}", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-
-            # Affichage final
-            annotated_frame = r.plot(img=frame)
-            disp = cv2.resize(frame, (960, 540))
-            cv2.imshow(window_name, disp)
-            out.write(frame)
-
-            # Gestion des entrées clavier
-            key = cv2.waitKey(1) & 0xFF
-            if key == ord('q'):
+                        zone_visits.append((final_global_id, int(zone_hits[i]), name))
+
+                    # Sauvegarder la détection dans le fichier de trajectoires
+                    self.trajectories.add(frame_idx, final_global_id, name, x, y, is_alert)
+                    self.summary.add(name, final_global_id, is_alert)
+                    rows.append((final_global_id, name, x, y, is_alert))
+
+                    # Annotation à dessiner (par le thread d'écriture ou pour l'affichage)
+                    is_target = current_target != -1 and final_global_id == current_target
+                    annotations.append(Annotation(
+                        x - w/2, y - h/2, x + w/2, y + h/2, x, y, final_global_id, is_alert, is_target
+                    ))
+        self._carry = (rows, zone_visits, annotations)
+        return self._finish(frame_idx, frame, zone_visits, annotations)
+
+    def _finish(self, frame_idx, frame, zone_visits, annotations):
+        """Événements de zone, sorties et maintenance d'une frame."""
+        reid_policy = self.reid_policy
+        timer = self.timer
+
+        # Alertes : seuls les événements de zone (rares) sont écrits
+        with timer.stage('events'):
+            events = self.zone_events.update(frame_idx, self.timestamp(frame_idx), zone_visits)
+            if events:
+                self.event_log.log(events)
+
+        with timer.stage('output'):
+            keep_going = self._output(frame_idx, frame, annotations)
+
+        # Cadence comptée en frames traitées : frame_idx saute des valeurs avec VID_STRIDE
+        with timer.stage('maintenance'):
+            if self.n_frames % max(1, config.REID_TRACK_TIMEOUT // config.VID_STRIDE) == 0:
+                reid_policy.forget_stale(frame_idx)
+            if self.n_frames % config.GALLERY_EXPIRE_INTERVAL == 0:
+                tracking.expire_global_tracks(self.gallery, frame_idx, self.timestamp(frame_idx), self.video_name)
+            if self.n_frames % config.SUMMARY_STATE_INTERVAL == 0:
+                self.summary.frames = frame_idx
+                self.summary.save(config.OUTPUT_FOLDER)
+            if config.CHECKPOINT_INTERVAL and self.n_frames % config.CHECKPOINT_INTERVAL == 0:
+                self.checkpoint(frame_idx)
+
+        if timer.enabled:
+            # Attente du verrou d'écriture de la galerie pendant cette frame
+            timer.add('lock_wait', self.gallery.lock_wait - self._lock_wait)
+            self._lock_wait = self.gallery.lock_wait
+        return keep_going
+
+    def checkpoint(self, frame_idx):
+        """
+        Écrit le point de reprise après la frame `frame_idx` : les sorties
+        sont d'abord vidées sur disque et la galerie sauvegardée, le point de
+        reprise ne référence que des données écrites.
+        """
+        self.event_log.flush()
+        snapshot = save_gallery_snapshot(self.gallery, config.OUTPUT_FOLDER)
+        self.summary.frames = frame_idx
+        save_checkpoint(config.OUTPUT_FOLDER, self.video_name, {
+            'video': self.video_name,
+            'frame': frame_idx,
+            'next_frame': frame_idx + config.VID_STRIDE,
+            'n_frames': self.n_frames,
+            'trajectories': self.trajectories.checkpoint(),
+            'events': self.event_log.written,
+            'zone_events': self.zone_events.to_state(),
+            'summary': self.summary.to_state(),
+            'next_id': self.gallery.next_id,
+            'gallery_snapshot': snapshot,
+        })
+
+    def _output(self, frame_idx, frame, annotations):
+        """Vidéo annotée, visualiseur et affichage ; renvoie False si l'arrêt est demandé."""
+        if self.headless:
+            # Le dessin et l'encodage se font dans le thread d'écriture
+            if self.publisher.wants(frame_idx):
+                # Pas de HighGUI : images envoyées au visualiseur seulement s'il est attaché
+                self.publisher.publish(frame_idx, draw_annotations(frame.copy(), self.zones, annotations))
+            self.video_out.submit(frame_idx, frame, annotations)
+            return True
+
+        frame = draw_annotations(frame, self.zones, annotations)
+        self.video_out.submit(frame_idx, frame)
+        show_target_crops(frame, annotations, self.video_name)
+        disp = cv2.resize(frame, (960, 540))
+        cv2.imshow(self.window_name, disp)
+
+        # Gestion des entrées clavier
+        key = cv2.waitKey(1) & 0xFF
+        if key == ord('q'):
+            return False
+        elif key == ord('s'):
+            # Touche 's' pour sélectionner un objet à suivre
+            if self.root:
+                new_id = self.simpledialog.askstring(f"Select ID ({self.video_name})", "Entrer l'ID Global à suivre:", parent=self.root)
+                if new_id:
+                    try:
+                        self.shared_target_id.value = int(new_id)
+                        print(f"Cible définie: {new_id}", flush=True)
+                    except ValueError:
+                        print("ID invalide")
+                else:
+                    self.shared_target_id.value = -1
+                    cv2.destroyAllWindows()
+                    cv2.namedWindow(self.window_name, cv2.WINDOW_NORMAL)
+        return True
+
+    def close(self):
+        """Libère les ressources et affiche les statistiques de la vidéo."""
+        video_name = self.video_name
+        elapsed = time.perf_counter() - self.start_time
+        self.trajectories.close()
+        self.event_log.log(self.zone_events.close())
+        self.event_log.close()
+        self.timer.save(config.OUTPUT_FOLDER, video_name, self.n_frames)
+        self.summary.frames = self.last_frame_idx
+        self.cap.release()
+        self.video_out.close()
+        if self.video_out.dropped:
+            print(f"[{video_name}] Vidéo annotée: {self.video_out.dropped} frames abandonnées (file pleine)")
+        if not self.headless:
+            cv2.destroyWindow(self.window_name)
+        if self.root: self.root.destroy()
+        self.summary.save(config.OUTPUT_FOLDER)
+        counts = self.zone_events.counts
+        if any(counts.values()):
+            print(f"[{video_name}] Zones: {counts['entree']} entrées, {counts['sortie']} sorties, "
+                  f"{counts['stationnement']} stationnements")
+        if self.zone_events.limited:
+            print(f"[{video_name}] Zones: {self.zone_events.limited} alertes écartées (limite de cadence)")
+        if self.event_log.dropped:
+            print(f"[{video_name}] Événements de zone: {self.event_log.dropped} abandonnés (file pleine)")
+        if self.roi is not None:
+            print(f"[{video_name}] Régions d'intérêt: {self.roi.pixel_rate():.1%} des pixels détectés")
+        if self.motion is not None:
+            print(f"[{video_name}] Porte de mouvement: {self.motion.skipped}/{self.motion.frames} frames "
+                  f"sans détection ({self.motion.skip_rate():.1%})")
+        if self.camera_graph is not None and self.camera_graph.gates(video_name):
+            graph_stats = self.camera_graph.stats()
+            print(f"[{video_name}] Topologie: {graph_stats['candidates_per_query']:.1f} identités comparées par requête "
+                  f"({graph_stats['candidate_rate']:.1%} de la galerie)")
+        reid_stats = self.reid_policy.stats()
+        print(f"[{video_name}] ReID: {reid_stats['computed']} embeddings calculés, "
+              f"{reid_stats['skipped']} évités ({reid_stats['skip_rate']:.1%})")
+        if self.n_frames:
+            print(f"[{video_name}] {self.n_frames} frames, {1000 * elapsed / self.n_frames:.1f} ms/frame")
+        if self.completed:
+            remove_checkpoint(config.OUTPUT_FOLDER, video_name)
+        print(f"[{video_name}] TERMINÉ.")
+
+
+def process_video_task(video_name, gallery, shared_target_id, headless=False, viewer_address=None, models=None,
+                       matcher=None, profile=False, resume=False):
+    """
+    Fonction de processus indépendante pour gérer l'analyse vidéo complète.
+    
+    Args:
+        video_name (str): Nom du fichier vidéo à traiter
+        gallery (SharedGallery): Galerie partagée des tracks globaux
+        shared_target_id (Value): ID de l'objet ciblé pour le suivi
+        headless (bool): Aucun affichage (ni Tkinter, ni fenêtre OpenCV)
+        viewer_address (tuple): Adresse du serveur du visualiseur (viewer.py), None si désactivé
+        models (tuple): (model, reid) déjà chargés par le processus de travail, None pour les charger
+        matcher (MatcherClient): Client du service de matching, None pour un matching local
+        profile (bool): Mesurer le temps de chaque étape
+        resume (bool): Reprendre au dernier point de reprise de la vidéo
+    """
+    # Modèles chargés une fois par processus de travail (voir scheduler.py)
+    model, reid = models if models is not None else load_models()
+    reset_tracker(model)
+
+    pipeline = CameraPipeline(video_name, gallery, shared_target_id, reid, model.names, headless, viewer_address,
+                              matcher, profile, resume)
+    roi_tracker = None
+    if pipeline.roi is not None:
+        # Régions d'intérêt : détection des régions puis tracker propre à la caméra (comme la détection par lots)
+        from inference import build_tracker, apply_tracker, detect_regions
+        roi_tracker = build_tracker(pipeline.fps, reid)
+    try:
+        for frame_idx, frame in pipeline.frames():
+            if not pipeline.needs_detection(frame):
+                # Scène immobile : pas de détection sur cette frame
+                if not pipeline.skip(frame_idx, frame):
+                    break
+                continue
+            # Lancer le tracking YOLO sur la frame décodée
+            with pipeline.timer.stage('detect_track'):
+                if roi_tracker is None:
+                    r = track_frame(model, frame)
+                else:
+                    r = apply_tracker(roi_tracker, detect_regions(model, frame, pipeline.roi, pipeline.track_boxes()))
+            if not pipeline.process(frame_idx, frame, r):
                 break
-            elif key == ord('s'):
-                # Touche 's' pour sélectionner un objet à suivre
-                if root:
-                    new_id = simpledialog.askstring(f"Select ID ({video_name})", "Entrer l'ID Global à suivre:", parent=root)
-                    if new_id:
-                        try:
-                            shared_target_id.value = int(new_id)
-                            print(f"Cible définie: {new_id}", flush=True)
-                        except ValueError:
-                            print("ID invalide")
-                    else:
-                        shared_target_id.value = -1
-                        cv2.destroyAllWindows()
-                        cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
-
-            frame_idx += 1
-
-    # Libérer les ressources
-    cap.release()
-    out.release()
-    cv2.destroyWindow(window_name)
-    if root: root.destroy()
-    print(f"[{video_name}] TERMINÉ.")
+        else:
+            pipeline.completed = True
+    finally:
+        pipeline.close()
@@ -0,0 +1,218 @@
+"""
+Module de mesure du temps passé dans chaque étape du traitement.
+
+Chaque caméra possède un StageTimer : la boucle de traitement entoure ses
+étapes (décodage, détection, tracking, ReID, matching, zones, sorties...)
+de `with timer.stage('nom'):`. Désactivé, le timer renvoie un contexte vide
+partagé (coût négligeable). Activé, il tient pour chaque étape le nombre
+d'appels, le temps total et maximal, et les percentiles p50/p95/p99 sur une
+fenêtre glissante des dernières mesures.
+
+En fin de vidéo, le profil est écrit dans profile_<video>.json et .csv ;
+main.py --profile affiche la répartition sur l'ensemble des vidéos.
+"""
+
+import os
+import csv
+import json
+import time
+
+import numpy as np
+
+PROFILE_PREFIX = 'profile_'
+PROFILE_COLUMNS = ['stage', 'count', 'total_ms', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms']
+
+
+def profile_path(folder, video_name, ext='json'):
+    """Renvoie le chemin du profil d'une vidéo."""
+    return os.path.join(folder, f"{PROFILE_PREFIX}{os.path.splitext(video_name)[0]}.{ext}")
+
+
+class _NullSpan:
+    """Contexte vide utilisé quand le timer est désactivé."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """Mesure d'une étape (contexte)."""
+
+    __slots__ = ('timer', 'name', 'start')
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _StageStats:
+    """Compteurs d'une étape : cumuls et fenêtre glissante des dernières durées."""
+
+    __slots__ = ('count', 'total', 'max', 'window', 'pos')
+
+    def __init__(self, window):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.window = np.zeros(window)
+        self.pos = 0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.window[self.pos] = seconds
+        self.pos = (self.pos + 1) % len(self.window)
+
+    def summary(self):
+        recent = self.window[:min(self.count, len(self.window))]
+        p50, p95, p99 = np.percentile(recent, [50, 95, 99]) if len(recent) else (0.0, 0.0, 0.0)
+        return {
+            'count': self.count,
+            'total_ms': 1000.0 * self.total,
+            'mean_ms': 1000.0 * self.total / self.count if self.count else 0.0,
+            'p50_ms': 1000.0 * p50,
+            'p95_ms': 1000.0 * p95,
+            'p99_ms': 1000.0 * p99,
+            'max_ms': 1000.0 * self.max,
+        }
+
+
+class StageTimer:
+    """
+    Chronomètres par étape d'une caméra.
+
+    `add` peut aussi être appelé depuis le thread d'écriture de la vidéo
+    annotée (étape 'encode').
+    """
+
+    def __init__(self, enabled=False, window=2048):
+        """
+        Args:
+            enabled (bool): False pour ne rien mesurer
+            window (int): Nombre de dernières mesures gardées pour les percentiles
+        """
+        self.enabled = enabled
+        self.window = window
+        self.stages = {}  # Dans l'ordre de première mesure
+        self.start_time = time.perf_counter()
+
+    def stage(self, name):
+        """Contexte mesurant la durée d'une étape."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def add(self, name, seconds):
+        """Ajoute une durée (s) mesurée par ailleurs à une étape."""
+        if not self.enabled:
+            return
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = _StageStats(self.window)
+        stats.add(seconds)
+
+    def stats(self):
+        """
+        Renvoie les statistiques de chaque étape.
+
+        Returns:
+            dict: {étape: {count, total_ms, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}
+        """
+        return {name: stats.summary() for name, stats in list(self.stages.items())}
+
+    def save(self, folder, video_name, frames):
+        """
+        Écrit le profil de la vidéo (JSON et CSV).
+
+        Args:
+            folder (str): Dossier de sortie
+            video_name (str): Nom de la vidéo
+            frames (int): Nombre de frames traitées
+        """
+        if not self.enabled:
+            return
+        stages = self.stats()
+        profile = {
+            'video': video_name,
+            'frames': frames,
+            'wall_s': time.perf_counter() - self.start_time,
+            'stages': stages,
+        }
+        with open(profile_path(folder, video_name, 'json'), 'w', encoding='utf-8') as f:
+            json.dump(profile, f, indent=2)
+        with open(profile_path(folder, video_name, 'csv'), 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(PROFILE_COLUMNS)
+            for name, s in stages.items():
+                writer.writerow([name] + [s['count']] + [f"{s[c]:.3f}" for c in PROFILE_COLUMNS[2:]])
+
+
+def load_profiles(folder, video_names):
+    """
+    Relit les profils JSON des vidéos traitées.
+
+    Returns:
+        list: Profils trouvés (les vidéos sans profil sont ignorées)
+    """
+    profiles = []
+    for video_name in video_names:
+        path = profile_path(folder, video_name, 'json')
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                profiles.append(json.load(f))
+    return profiles
+
+
+def print_profile_breakdown(profiles):
+    """
+    Affiche la répartition du temps par étape sur l'ensemble des vidéos,
+    puis le coût par frame et l'étape dominante de chaque vidéo.
+
+    Args:
+        profiles (list): Profils relus par load_profiles
+    """
+    if not profiles:
+        return
+    totals, worst_p95 = {}, {}
+    for profile in profiles:
+        for name, s in profile['stages'].items():
+            totals[name] = totals.get(name, 0.0) + s['total_ms']
+            if s['p95_ms'] > worst_p95.get(name, (0.0, None))[0]:
+                worst_p95[name] = (s['p95_ms'], profile['video'])
+    frames = sum(p['frames'] for p in profiles)
+    reference = totals.get('frame') or sum(totals.values())
+
+    print("\n" + "=" * 60)
+    print(f"PROFIL PAR ÉTAPE ({len(profiles)} vidéos, {frames} frames)")
+    print("=" * 60)
+    print(f"  {'étape':<12} {'total (s)':>10} {'part':>7} {'ms/frame':>9} {'p95 max (ms)':>13}  vidéo")
+    for name, total in sorted(totals.items(), key=lambda t: -t[1]):
+        share = f"{total / reference:.1%}" if name != 'frame' else ''
+        p95, video = worst_p95.get(name, (0.0, ''))
+        print(f"  {name:<12} {total / 1000.0:>10.1f} {share:>7} {total / max(frames, 1):>9.2f} {p95:>13.2f}  {video}")
+
+    print("\n--- PAR VIDÉO ---")
+    for profile in sorted(profiles, key=lambda p: -p['stages'].get('frame', {}).get('total_ms', 0.0)):
+        stages = {name: s for name, s in profile['stages'].items() if name != 'frame'}
+        frame_ms = profile['stages'].get('frame', {}).get('mean_ms', 0.0)
+        top = max(stages, key=lambda name: stages[name]['total_ms']) if stages else '-'
+        print(f"  {profile['video']}: {frame_ms:.1f} ms/frame (p95 "
+              f"{profile['stages'].get('frame', {}).get('p95_ms', 0.0):.1f} ms), étape dominante: {top}")
@@ -0,0 +1,133 @@
+"""
+Module de politique de calcul des embeddings ReID.
+Le tracker BoT-SORT garde des IDs locaux stables d'une frame à l'autre : il est
+inutile de recalculer l'embedding de chaque boîte à chaque frame.
+
+Un embedding n'est recalculé pour un track local que s'il est nouveau, si
+REID_REFRESH_INTERVAL frames se sont écoulées, ou si la taille de la boîte ou
+la confiance ont fortement changé. Entre deux calculs, l'ID global déjà
+attribué (local_to_global) est réutilisé.
+"""
+
+import numpy as np
+
+
+class ReIDPolicy:
+    """
+    Cache par track local : décision d'ID global et embedding agrégé.
+
+    Attributes:
+        local_to_global (dict): Mapping des IDs locaux vers IDs globaux
+        computed (int): Nombre d'embeddings calculés
+        skipped (int): Nombre d'embeddings évités grâce au cache
+    """
+
+    def __init__(self, refresh_interval=30, area_change=0.3, conf_change=0.15, track_timeout=90):
+        """
+        Args:
+            refresh_interval (int): Nombre de frames entre deux recalculs d'un même track
+            area_change (float): Variation relative de l'aire de la boîte déclenchant un recalcul
+            conf_change (float): Variation absolue de la confiance déclenchant un recalcul
+            track_timeout (int): Nombre de frames après lequel un track local absent est oublié
+        """
+        self.refresh_interval = refresh_interval
+        self.area_change = area_change
+        self.conf_change = conf_change
+        self.track_timeout = track_timeout
+
+        self.local_to_global = {}
+        self._tracks = {}  # local_id -> état du track (voir update())
+        self.computed = 0
+        self.skipped = 0
+
+    def needs_embedding(self, local_id, frame_idx, box, conf):
+        """
+        Indique si l'embedding d'une détection doit être recalculé.
+
+        Args:
+            local_id (int): ID local attribué par le tracker
+            frame_idx (int): Index de la frame courante
+            box (tuple): (x, y, w, h) de la détection
+            conf (float): Confiance de la détection
+
+        Returns:
+            bool: True si l'embedding doit être calculé
+        """
+        state = self._tracks.get(local_id)
+        if state is None or local_id not in self.local_to_global:
+            return True
+
+        state['last_seen'] = frame_idx
+        if frame_idx - state['frame'] >= self.refresh_interval:
+            return True
+
+        area = float(box[2] * box[3])
+        if state['area'] > 0 and abs(area - state['area']) / state['area'] > self.area_change:
+            return True
+        if abs(float(conf) - state['conf']) > self.conf_change:
+            return True
+
+        self.skipped += 1
+        return False
+
+    def update(self, local_id, frame_idx, box, conf, embedding):
+        """
+        Enregistre un embedding calculé et l'agrège à ceux du track local.
+
+        Args:
+            local_id (int): ID local attribué par le tracker
+            frame_idx (int): Index de la frame courante
+            box (tuple): (x, y, w, h) de la détection
+            conf (float): Confiance de la détection
+            embedding (np.array): Embedding calculé
+
+        Returns:
+            np.array: Embedding agrégé (moyenne courante normalisée) du track local
+        """
+        self.computed += 1
+        vec = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec = vec / norm
+
+        state = self._tracks.get(local_id)
+        if state is None or state['embedding'].shape != vec.shape:
+            state = {'embedding': vec, 'count': 1}
+            self._tracks[local_id] = state
+        else:
+            # Moyenne courante des embeddings normalisés
+            state['count'] += 1
+            state['embedding'] = state['embedding'] + (vec - state['embedding']) / state['count']
+
+        state['frame'] = frame_idx
+        state['last_seen'] = frame_idx
+        state['area'] = float(box[2] * box[3])
+        state['conf'] = float(conf)
+
+        aggregated = state['embedding']
+        norm = np.linalg.norm(aggregated)
+        return aggregated / norm if norm > 0 else aggregated
+
+    def forget_stale(self, frame_idx):
+        """
+        Oublie les tracks locaux absents depuis plus de track_timeout frames.
+
+        Args:
+            frame_idx (int): Index de la frame courante
+        """
+        stale = [lid for lid, s in self._tracks.items() if frame_idx - s['last_seen'] > self.track_timeout]
+        for lid in stale:
+            del self._tracks[lid]
+            self.local_to_global.pop(lid, None)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Nombre d'embeddings calculés, évités et taux d'évitement
+        """
+        total = self.computed + self.skipped
+        return {
+            'computed': self.computed,
+            'skipped': self.skipped,
+            'skip_rate': self.skipped / total if total else 0.0,
+        }
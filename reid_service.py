@@ -0,0 +1,103 @@
+"""
+Module du service ReID centralisé.
+
+Un seul processus charge le modèle ReID et calcule les embeddings pour tous
+les processus de travail : une seule copie du modèle en mémoire, et des lots
+plus grands. Les demandes (crops d'une frame) sont regroupées dynamiquement
+jusqu'à REID_SERVICE_MAX_BATCH crops ou REID_SERVICE_MAX_WAIT_MS d'attente
+(voir service.py), puis le modèle est lancé une fois pour tout le lot.
+
+Côté processus de travail, ReIDClient s'utilise exactement comme le modèle
+ReID d'ultralytics : embeddings = reid(frame, dets).
+"""
+
+import config
+from service import BatchedService, ServiceClient
+
+
+def embed_crops(reid, crops):
+    """
+    Calcule les embeddings d'une liste de crops en un seul appel au modèle.
+
+    Args:
+        reid (ReID): Modèle ReID d'ultralytics
+        crops (list): Images BGR des objets
+
+    Returns:
+        list: Un embedding (np.array) par crop
+    """
+    feats = reid.model.predictor(crops)
+    if len(feats) != len(crops) and feats[0].shape[0] == len(crops):
+        feats = feats[0]
+    return [f.cpu().numpy() for f in feats]
+
+
+def embed_batch(reid, requests):
+    """
+    Calcule les embeddings d'un lot de demandes : tous les crops du lot en
+    un seul appel au modèle, puis redécoupage par demande.
+
+    Args:
+        reid (ReID): Modèle ReID d'ultralytics
+        requests (list): Crops de chaque demande
+
+    Returns:
+        list: Embeddings de chaque demande, dans l'ordre des demandes
+    """
+    feats = embed_crops(reid, [crop for crops in requests for crop in crops])
+    results, start = [], 0
+    for crops in requests:
+        results.append(feats[start:start + len(crops)])
+        start += len(crops)
+    return results
+
+
+def _make_handler():
+    """Charge le modèle ReID dans le processus de service et renvoie (handle, size)."""
+    from ultralytics.trackers.bot_sort import ReID
+
+    reid = ReID(model=config.REID_MODEL_PATH)
+    return (lambda requests: embed_batch(reid, requests)), len
+
+
+class ReIDClient(ServiceClient):
+    """Client du service ReID, utilisable à la place du modèle ReID d'ultralytics."""
+
+    def __call__(self, img, dets):
+        """
+        Calcule les embeddings des objets d'une frame via le service.
+
+        Args:
+            img (np.array): Frame BGR
+            dets (np.array): Boîtes des objets (même format que ReID d'ultralytics)
+
+        Returns:
+            list: Un embedding par boîte
+        """
+        if len(dets) == 0:
+            return []
+        # Imports locaux : le processus principal n'a pas besoin de torch
+        import torch
+        from ultralytics.utils.ops import xywh2xyxy
+        from ultralytics.utils.plotting import save_one_box
+
+        # Mêmes crops que ReID.__call__ d'ultralytics
+        crops = [save_one_box(det, img, save=False) for det in xywh2xyxy(torch.from_numpy(dets[:, :4]))]
+        return self.request(crops)
+
+
+class ReIDService(BatchedService):
+    """Processus ReID unique partagé par les processus de travail."""
+
+    name = 'ReID'
+    client_class = ReIDClient
+
+    def __init__(self, n_clients, max_batch=None, max_wait_ms=None):
+        super().__init__(
+            n_clients,
+            max_batch or config.REID_SERVICE_MAX_BATCH,
+            config.REID_SERVICE_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms
+        )
+
+    def handler(self):
+        return _make_handler, ()
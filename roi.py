@@ -0,0 +1,184 @@
+"""
+Module des régions d'intérêt (ROI) de la détection.
+
+Pour une caméra où seules les zones d'alerte comptent, la détection n'est
+lancée que sur des régions de la frame : régions déclarées dans
+config.ROI_REGIONS, ou rectangles englobant les zones d'alerte agrandis de
+ROI_MARGIN (ROI_FROM_ZONES). Les objets suivis ajoutent leur propre région
+(boîte agrandie de ROI_TRACK_MARGIN) : un objet entré dans une région reste
+détecté jusqu'à sa sortie du champ.
+
+Les régions qui se touchent sont fusionnées, puis chaque région est
+découpée et détectée à la même densité de pixels qu'une détection pleine
+frame : sa taille d'entrée est imgsz réduit en proportion de son plus grand
+côté. Les entrées de même taille sont détectées ensemble (un appel au
+détecteur par taille, inference.detect_frames) : aucune région n'est
+agrandie à la taille d'une autre région ou d'une frame entière, et le
+nombre de pixels par inférence baisse avec la surface exclue. Les boîtes
+sont ramenées en coordonnées de la frame entière par
+inference.merge_regions_results.
+"""
+
+import math
+
+import config
+
+
+def _clip(rect, frame_size):
+    """Rectangle (x1, y1, x2, y2) entier, limité à la frame (None s'il est vide)."""
+    width, height = frame_size
+    x1, y1, x2, y2 = rect
+    x1, y1 = max(0, int(math.floor(x1))), max(0, int(math.floor(y1)))
+    x2, y2 = min(width, int(math.ceil(x2))), min(height, int(math.ceil(y2)))
+    return (x1, y1, x2, y2) if x2 > x1 and y2 > y1 else None
+
+
+def merge_regions(rects, gap=0):
+    """
+    Fusionne les rectangles qui se chevauchent ou sont à moins de `gap` pixels.
+
+    Args:
+        rects (list): Rectangles (x1, y1, x2, y2)
+        gap (int): Écart en dessous duquel deux rectangles sont fusionnés
+
+    Returns:
+        list: Rectangles disjoints
+    """
+    rects = [tuple(r) for r in rects]
+    merged = True
+    while merged:
+        merged = False
+        out = []
+        for rect in rects:
+            for i, other in enumerate(out):
+                if (rect[0] <= other[2] + gap and other[0] <= rect[2] + gap
+                        and rect[1] <= other[3] + gap and other[1] <= rect[3] + gap):
+                    out[i] = (min(rect[0], other[0]), min(rect[1], other[1]),
+                              max(rect[2], other[2]), max(rect[3], other[3]))
+                    merged = True
+                    break
+            else:
+                out.append(rect)
+        rects = out
+    return rects
+
+
+def zone_regions(zones, frame_size, margin=0.1):
+    """
+    Rectangles englobant les zones d'alerte, agrandis d'une marge.
+
+    Args:
+        zones (list): Zones rectangulaires ou polygonales (voir alerts.is_in_zone)
+        frame_size (tuple): (largeur, hauteur) des frames
+        margin (float): Marge en fraction de la plus grande dimension de la frame
+
+    Returns:
+        list: Rectangles (x1, y1, x2, y2)
+    """
+    pad = margin * max(frame_size)
+    rects = []
+    for zone in zones:
+        if len(zone) == 4 and not isinstance(zone[0], (list, tuple)):
+            x1, y1, x2, y2 = zone
+        else:
+            xs, ys = [p[0] for p in zone], [p[1] for p in zone]
+            x1, y1, x2, y2 = min(xs), min(ys), max(xs), max(ys)
+        rects.append((x1 - pad, y1 - pad, x2 + pad, y2 + pad))
+    return rects
+
+
+def camera_regions(video_name, frame_size):
+    """
+    Régions d'intérêt d'une caméra d'après la configuration.
+
+    Returns:
+        list: Rectangles (x1, y1, x2, y2), vide si la caméra est détectée en entier
+    """
+    if video_name in config.ROI_REGIONS:
+        return list(config.ROI_REGIONS[video_name])
+    if config.ROI_FROM_ZONES:
+        return zone_regions(config.ALERT_ZONES.get(video_name, []), frame_size, config.ROI_MARGIN)
+    return []
+
+
+class RegionPlanner:
+    """
+    Régions à détecter à chaque frame d'une caméra : régions fixes plus
+    régions des objets suivis.
+
+    Attributes:
+        pixels (int): Pixels des entrées envoyées au détecteur (imgsz² par entrée)
+        full_pixels (int): Pixels qu'aurait reçus une détection pleine frame
+    """
+
+    def __init__(self, frame_size, regions, imgsz=1280, track_margin=0.5, max_area=0.7, stride=32):
+        """
+        Args:
+            frame_size (tuple): (largeur, hauteur) des frames
+            regions (list): Régions fixes (x1, y1, x2, y2) en pixels pleine résolution
+            imgsz (int): Taille de détection d'une frame entière
+            track_margin (float): Marge autour des objets suivis (fraction de leur taille)
+            max_area (float): Part de la frame au-delà de laquelle la frame entière est détectée
+            stride (int): Pas de la taille d'entrée du détecteur
+        """
+        self.frame_size = frame_size
+        self.regions = merge_regions(r for r in (_clip(r, frame_size) for r in regions) if r)
+        self.imgsz = imgsz
+        self.track_margin = track_margin
+        self.max_area = max_area
+        self.stride = stride
+        self.scale = imgsz / float(max(frame_size))  # Densité de pixels d'une détection pleine frame
+        self.pixels = 0
+        self.full_pixels = 0
+
+    def plan(self, track_boxes=()):
+        """
+        Régions à détecter pour une frame.
+
+        Args:
+            track_boxes (list): Boîtes (x1, y1, x2, y2) des objets suivis
+
+        Returns:
+            list | None: Rectangles disjoints, None pour détecter la frame entière
+                         (régions trop grandes, ou aucune région dans la frame)
+        """
+        rects = list(self.regions)
+        for x1, y1, x2, y2 in track_boxes:
+            mx, my = self.track_margin * (x2 - x1), self.track_margin * (y2 - y1)
+            rect = _clip((x1 - mx, y1 - my, x2 + mx, y2 + my), self.frame_size)
+            if rect:
+                rects.append(rect)
+        rects = merge_regions(rects, gap=self.stride)
+
+        width, height = self.frame_size
+        area = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in rects)
+        if not rects or area >= self.max_area * width * height:
+            return None
+        return rects
+
+    def input_size(self, rects):
+        """Taille d'entrée du détecteur pour des régions (même densité qu'une frame entière)."""
+        if rects is None:
+            return self.imgsz
+        side = max(max(x2 - x1, y2 - y1) for x1, y1, x2, y2 in rects) if rects else 0
+        return min(self.imgsz, max(self.stride, int(math.ceil(side * self.scale / self.stride)) * self.stride))
+
+    def input_sizes(self, rects):
+        """Taille d'entrée du détecteur de chaque région (une seule entrée pour la frame entière)."""
+        if rects is None:
+            return [self.imgsz]
+        return [self.input_size([rect]) for rect in rects]
+
+    def record(self, sizes):
+        """
+        Compte les pixels envoyés au détecteur pour une frame.
+
+        Args:
+            sizes (list): Taille d'entrée (imgsz) passée au détecteur pour chaque entrée de la frame
+        """
+        self.pixels += sum(size * size for size in sizes)
+        self.full_pixels += self.imgsz * self.imgsz
+
+    def pixel_rate(self):
+        """Part des pixels détectés par rapport à des détections pleine frame."""
+        return self.pixels / self.full_pixels if self.full_pixels else 1.0
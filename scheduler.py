@@ -0,0 +1,354 @@
+"""
+Module d'ordonnancement des vidéos sur un nombre borné de processus.
+
+Chaque processus de travail charge les modèles une seule fois puis traite
+les vidéos d'une file commune, de la plus longue à la plus courte (durée lue
+dans les métadonnées du conteneur) pour équilibrer la fin du traitement.
+Une vidéo en échec est remise en file jusqu'à JOB_MAX_RETRIES fois ; un
+processus de travail qui meurt est remplacé.
+
+La mémoire occupée croît avec le nombre de processus de travail, et non plus
+avec le nombre de vidéos.
+"""
+
+import os
+import json
+import time
+import queue
+import traceback
+import multiprocessing
+from collections import deque
+
+import cv2
+
+import config
+
+STATUS_FILE = 'jobs_status.json'  # État des vidéos (dans OUTPUT_FOLDER)
+
+
+def video_duration(path):
+    """
+    Renvoie la durée d'une vidéo d'après les métadonnées du conteneur (sans décoder).
+
+    Args:
+        path (str): Chemin de la vidéo
+
+    Returns:
+        float: Durée en secondes (taille du fichier en Mo si les métadonnées sont absentes)
+    """
+    cap = cv2.VideoCapture(path)
+    try:
+        frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+    finally:
+        cap.release()
+    if frames > 0 and fps > 0:
+        return frames / fps
+    return os.path.getsize(path) / 1e6
+
+
+def order_jobs(folder, video_files):
+    """
+    Trie les vidéos de la plus longue à la plus courte.
+
+    Returns:
+        list: Liste de (video_name, durée)
+    """
+    jobs = [(name, video_duration(os.path.join(folder, name))) for name in video_files]
+    return sorted(jobs, key=lambda job: job[1], reverse=True)
+
+
+def _video_job(clients, gallery, shared_target_id, headless, viewer_address, profile):
+    """
+    Charge les modèles du processus de travail et renvoie la fonction de
+    traitement d'un groupe de vidéos. Un groupe de plusieurs vidéos est
+    traité avec la détection par lots (inference.py). `clients` contient les
+    clients des services actifs : 'reid' remplace le modèle ReID local,
+    'matcher' l'attribution locale des IDs globaux.
+
+    Returns:
+        callable: job(groupe, reprise)
+    """
+    # Import local : le processus principal n'a pas besoin des modèles
+    from processor import load_models, process_video_task
+
+    models = load_models(clients.get('reid'))
+
+    def job(group, resume):
+        if len(group) == 1:
+            process_video_task(group[0], gallery, shared_target_id, headless, viewer_address, models,
+                               clients.get('matcher'), profile, resume)
+        else:
+            from inference import process_video_group
+            process_video_group(list(group), gallery, shared_target_id, headless, viewer_address, models,
+                                clients.get('matcher'), profile, resume)
+    return job
+
+
+def _worker(worker_id, inbox, events, clients, make_job, gallery, shared_target_id, headless, viewer_address,
+            profile):
+    """
+    Boucle d'un processus de travail : prépare la fonction de traitement
+    (make_job, par défaut _video_job qui charge les modèles) puis traite les
+    groupes de vidéos reçus dans sa file jusqu'au marqueur de fin (None).
+    Chaque message est (groupe, reprise) : avec reprise, les vidéos
+    repartent de leur dernier point de reprise.
+    """
+    try:
+        job = make_job(clients, gallery, shared_target_id, headless, viewer_address, profile)
+    except Exception:
+        # Modèles introuvables ou invalides : inutile de remplacer ce processus
+        events.put(('fatal', worker_id, None, traceback.format_exc(limit=3)))
+        gallery.close()
+        return
+    try:
+        while True:
+            message = inbox.get()
+            if message is None:
+                break
+            group, resume = message
+            start = time.perf_counter()
+            try:
+                job(group, resume)
+            except Exception:
+                events.put(('failed', worker_id, group, traceback.format_exc(limit=3)))
+            else:
+                events.put(('done', worker_id, group, time.perf_counter() - start))
+    finally:
+        gallery.close()
+
+
+class JobScheduler:
+    """
+    Répartit les vidéos sur `n_workers` processus et suit leur état.
+
+    Le processus principal attribue lui-même chaque groupe de vidéos à un
+    processus de travail libre (une file par processus) : il sait toujours
+    quel groupe reprendre si un processus meurt. Avec group_size > 1, les
+    vidéos de durées voisines sont regroupées pour la détection par lots.
+    Avec use_reid_service, un processus ReID unique (reid_service.py) calcule
+    les embeddings de tous les processus de travail ; avec use_matcher, un
+    processus unique (matcher.py) attribue les IDs globaux.
+
+    Une nouvelle tentative reprend chaque vidéo à son dernier point de
+    reprise (CHECKPOINT_INTERVAL). Avec resume, les vidéos déjà terminées
+    lors de l'exécution précédente (fichier d'état) ne sont pas relancées et
+    les autres repartent de leur point de reprise.
+
+    make_job remplace la préparation du traitement dans chaque processus de
+    travail (même signature que _video_job) : une fonction légère suffit
+    pour exercer l'ordonnancement sans modèle.
+
+    États d'une vidéo : 'en attente', 'en cours', 'terminé', 'échec'.
+    """
+
+    def __init__(self, video_files, gallery, shared_target_id, headless=False, viewer_address=None,
+                 n_workers=None, max_retries=None, folder=None, status_path=None, group_size=None,
+                 use_reid_service=False, use_matcher=False, profile=False, resume=False, make_job=None):
+        self.folder = folder or config.INPUT_FOLDER
+        self.resume = resume
+        self.gallery = gallery
+        self.make_job = make_job or _video_job  # Préparation du traitement dans chaque processus de travail
+        self.worker_args = (gallery, shared_target_id, headless, viewer_address, profile)
+        self.use_reid_service = use_reid_service
+        self.use_matcher = use_matcher
+        self.services = {}  # Services actifs : 'reid', 'matcher'
+        self.service_stats = []
+        self.max_retries = config.JOB_MAX_RETRIES if max_retries is None else max_retries
+        self.status_path = status_path or os.path.join(config.OUTPUT_FOLDER, STATUS_FILE)
+
+        # Reprise : vidéos terminées lors de l'exécution précédente
+        done = {}
+        if resume and os.path.exists(self.status_path):
+            with open(self.status_path, 'r', encoding='utf-8') as f:
+                done = {name: s for name, s in json.load(f).items()
+                        if s.get('etat') == 'terminé' and name in video_files}
+            if done:
+                print(f"[scheduler] Reprise: {len(done)} vidéos déjà terminées", flush=True)
+
+        self.jobs = order_jobs(self.folder, [name for name in video_files if name not in done])
+        group_size = max(1, group_size or config.INFERENCE_BATCH_CAMERAS)
+        names = [name for name, _ in self.jobs]
+        # Groupes de vidéos traitées ensemble, plus longues d'abord
+        self.groups = [tuple(names[i:i + group_size]) for i in range(0, len(names), group_size)]
+        n_workers = n_workers or config.NUM_WORKERS or os.cpu_count() or 1
+        self.n_workers = max(1, min(n_workers, len(self.groups)))
+        self.status = {
+            name: {'etat': 'en attente', 'duree_video_s': round(duration, 1), 'tentatives': 0,
+                   'worker': None, 'temps_s': None, 'erreur': None}
+            for name, duration in self.jobs
+        }
+        self.status.update(done)
+
+        self._pending = deque(self.groups)  # Groupes à attribuer
+        self._events = multiprocessing.Queue()
+        self._workers = {}  # worker_id -> (processus, file de la vidéo attribuée)
+        self._running = {}  # worker_id -> groupe de vidéos
+        self._next_worker = 0
+        self._free_slots = list(range(self.n_workers))  # Emplacements clients des services
+        self._slot_of = {}  # worker_id -> emplacement
+
+    def _spawn_worker(self):
+        """Démarre un processus de travail et lui attribue un groupe."""
+        worker_id = self._next_worker
+        self._next_worker += 1
+        inbox = multiprocessing.Queue()
+        clients = {}
+        if self.services:
+            slot = self._slot_of[worker_id] = self._free_slots.pop()
+            clients = {name: service.client(slot) for name, service in self.services.items()}
+        p = multiprocessing.Process(
+            target=_worker,
+            args=(worker_id, inbox, self._events, clients, self.make_job) + self.worker_args,
+            name=f"worker-{worker_id}"
+        )
+        p.start()
+        self._workers[worker_id] = (p, inbox)
+        self._dispatch(worker_id)
+
+    def _dispatch(self, worker_id):
+        """Attribue le prochain groupe en attente à un processus libre."""
+        if not self._pending:
+            return
+        group = self._pending.popleft()
+        self._running[worker_id] = group
+        for video_name in group:
+            self.status[video_name]['tentatives'] += 1
+        self._set(group, 'en cours', worker=worker_id)
+        # Reprise au point de reprise pour une nouvelle tentative ou avec --resume
+        resume = self.resume or self.status[group[0]]['tentatives'] > 1
+        self._workers[worker_id][1].put((group, resume))
+
+    def _set(self, group, etat, **fields):
+        for video_name in group:
+            self.status[video_name].update(etat=etat, **fields)
+        print(f"[scheduler] {', '.join(group)}: {etat}"
+              + (f" (worker {fields['worker']})" if fields.get('worker') is not None else ""), flush=True)
+        self._save_status()
+
+    def _save_status(self):
+        """Écrit l'état des vidéos (remplacement atomique)."""
+        tmp_path = self.status_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.status, f, indent=2)
+        os.replace(tmp_path, self.status_path)
+
+    def _failed(self, group, error):
+        """
+        Remet le groupe en file ou le marque en échec.
+
+        Returns:
+            bool: True si le groupe est définitivement en échec
+        """
+        attempts = self.status[group[0]]['tentatives']
+        if attempts <= self.max_retries:
+            print(f"[scheduler] {', '.join(group)}: erreur, nouvelle tentative ({attempts}/{self.max_retries})\n{error}", flush=True)
+            self._set(group, 'en attente', worker=None, erreur=error)
+            self._pending.append(group)
+            return False
+        self._set(group, 'échec', worker=None, erreur=error)
+        return True
+
+    def _check_workers(self):
+        """
+        Détecte les processus de travail morts, reprend leur groupe et les remplace.
+
+        Returns:
+            int: Nombre de groupes définitivement en échec
+        """
+        finished = 0
+        for worker_id, (p, _) in list(self._workers.items()):
+            if p.is_alive():
+                continue
+            del self._workers[worker_id]
+            if worker_id in self._slot_of:
+                self._free_slots.append(self._slot_of.pop(worker_id))
+            group = self._running.pop(worker_id, None)
+            if group is None:
+                continue
+            finished += self._failed(group, f"processus arrêté (code {p.exitcode})")
+            if self._pending:
+                self._spawn_worker()
+        return finished
+
+    def _stop_workers(self, terminate=False):
+        for p, inbox in self._workers.values():
+            if terminate:
+                p.terminate()
+            else:
+                inbox.put(None)
+        for p, _ in self._workers.values():
+            p.join()
+        self._workers = {}
+
+    def run(self, refresh=None, refresh_interval=None):
+        """
+        Traite toutes les vidéos et attend la fin des processus de travail.
+
+        Args:
+            refresh (callable): Fonction appelée périodiquement pendant le traitement
+            refresh_interval (float): Période d'appel de `refresh` en secondes
+
+        Returns:
+            dict: État final des vidéos
+        """
+        print(f"[scheduler] {len(self.jobs)} vidéos en {len(self.groups)} groupes, "
+              f"{self.n_workers} processus de travail", flush=True)
+        self._save_status()
+        if not self.jobs:
+            return self.status
+        if self.use_reid_service:
+            from reid_service import ReIDService
+            self.services['reid'] = ReIDService(self.n_workers)
+        if self.use_matcher:
+            from matcher import MatcherService
+            self.services['matcher'] = MatcherService(self.gallery, self.n_workers)
+        for service in self.services.values():
+            service.start()
+        try:
+            return self._run(refresh, refresh_interval)
+        finally:
+            for service in self.services.values():
+                self.service_stats.append(service.stats())
+                service.stop()
+
+    def _run(self, refresh, refresh_interval):
+        for _ in range(self.n_workers):
+            self._spawn_worker()
+
+        remaining = len(self.groups)
+        last_refresh = time.monotonic()
+        while remaining:
+            try:
+                kind, worker_id, group, payload = self._events.get(timeout=1.0)
+            except queue.Empty:
+                remaining -= self._check_workers()
+            else:
+                if kind == 'fatal':
+                    self._stop_workers(terminate=True)
+                    raise RuntimeError(f"Chargement des modèles impossible (worker {worker_id}):\n{payload}")
+                self._running.pop(worker_id, None)
+                if kind == 'done':
+                    self._set(group, 'terminé', temps_s=round(payload, 1), erreur=None)
+                    remaining -= 1
+                else:
+                    remaining -= self._failed(group, payload)
+                self._dispatch(worker_id)
+
+            if refresh and refresh_interval and time.monotonic() - last_refresh >= refresh_interval:
+                refresh()
+                last_refresh = time.monotonic()
+
+        self._stop_workers()
+        return self.status
+
+
+def print_job_status(status):
+    """Affiche l'état final des vidéos."""
+    print("\n--- ÉTAT DES VIDÉOS ---")
+    for video_name, s in status.items():
+        if s['etat'] == 'terminé':
+            detail = f"{s['temps_s']} s"
+        else:
+            detail = s['erreur'].strip().splitlines()[-1] if s['erreur'] else ''
+        print(f"  {video_name}: {s['etat']} ({s['tentatives']} tentative(s)) {detail}")
@@ -0,0 +1,235 @@
+"""
+Module commun des services par lots (service ReID, service de matching).
+
+Un service est un processus unique qui reçoit les demandes de tous les
+processus de travail sur une file commune, les regroupe dynamiquement
+(jusqu'à `max_batch` éléments ou `max_wait` secondes après la première
+demande), les traite en un seul appel puis renvoie à chaque client sa
+réponse sur sa propre file (un emplacement par processus de travail).
+
+Des compteurs partagés suivent le nombre de demandes et d'éléments, la
+taille des lots, la latence (de l'envoi à la réponse) et la profondeur de
+la file.
+"""
+
+import os
+import queue
+import time
+import multiprocessing
+
+import config
+
+# Compteurs partagés (indices dans BatchedService.counters)
+_REQUESTS = 0      # Demandes servies
+_ITEMS = 1         # Éléments traités (crops, embeddings, ...)
+_BATCHES = 2       # Lots traités
+_LATENCY_SUM = 3   # Somme des latences (s), de l'envoi à la réponse
+_LATENCY_MAX = 4   # Latence maximale (s)
+_SUBMITTED = 5     # Demandes envoyées par les clients
+_DEPTH_MAX = 6     # Profondeur maximale observée de la file (demandes en attente)
+_N_COUNTERS = 7
+
+
+def _collect(requests, first, size, max_batch, max_wait):
+    """
+    Complète un lot commencé par `first` avec les demandes arrivées avant
+    `max_wait` secondes, sans dépasser `max_batch` éléments.
+
+    Returns:
+        tuple: (lot, arrêt demandé)
+    """
+    batch = [first]
+    n_items = size(first[3])
+    deadline = time.time() + max_wait
+    while n_items < max_batch:
+        timeout = deadline - time.time()
+        if timeout <= 0:
+            break
+        try:
+            request = requests.get(timeout=timeout)
+        except queue.Empty:
+            break
+        if request is None:
+            return batch, True
+        batch.append(request)
+        n_items += size(request[3])
+    return batch, False
+
+
+def serve(requests, responses, counters, max_batch, max_wait, make_handler, handler_args):
+    """
+    Boucle d'un processus de service.
+
+    Args:
+        requests (Queue): File commune des demandes (slot, id, heure d'envoi, contenu)
+        responses (list): Files de réponses, une par emplacement client
+        counters (Array): Compteurs partagés
+        max_batch (int): Nombre maximal d'éléments par lot
+        max_wait (float): Attente maximale pour compléter un lot (s)
+        make_handler (callable): Appelée une fois dans le processus de service avec
+                                 `handler_args` ; renvoie (handle, size) où
+                                 handle(contenus) -> réponses et size(contenu) -> nb d'éléments
+        handler_args (tuple): Arguments de make_handler
+    """
+    handle, size = make_handler(*handler_args)
+    stopping = False
+    while not stopping:
+        first = requests.get()
+        if first is None:
+            break
+        batch, stopping = _collect(requests, first, size, max_batch, max_wait)
+
+        with counters.get_lock():
+            depth = int(counters[_SUBMITTED] - counters[_REQUESTS])
+            counters[_DEPTH_MAX] = max(counters[_DEPTH_MAX], depth)
+
+        try:
+            results = handle([payload for _, _, _, payload in batch])
+        except Exception as e:
+            # Ne pas bloquer les clients : leur renvoyer l'erreur
+            results = [RuntimeError(f"{multiprocessing.current_process().name}: {e}")] * len(batch)
+
+        now = time.time()
+        latency_sum = latency_max = 0.0
+        for (slot, request_id, sent, _), result in zip(batch, results):
+            responses[slot].put((request_id, result))
+            latency = now - sent
+            latency_sum += latency
+            latency_max = max(latency_max, latency)
+
+        with counters.get_lock():
+            counters[_REQUESTS] += len(batch)
+            counters[_ITEMS] += sum(size(payload) for _, _, _, payload in batch)
+            counters[_BATCHES] += 1
+            counters[_LATENCY_SUM] += latency_sum
+            counters[_LATENCY_MAX] = max(counters[_LATENCY_MAX], latency_max)
+
+
+class ServiceClient:
+    """
+    Client d'un service par lots, transmissible à un processus de travail
+    au démarrage de celui-ci.
+    """
+
+    def __init__(self, requests, responses, slot, counters, timeout=None):
+        self._requests = requests
+        self._responses = responses
+        self._slot = slot
+        self._counters = counters
+        self._request_id = 0
+        self._pid = None  # Processus propriétaire (les IDs de demande incluent son PID)
+        self.timeout = timeout or config.SERVICE_TIMEOUT
+
+    def request(self, payload):
+        """
+        Envoie une demande et attend la réponse.
+
+        Raises:
+            RuntimeError: Service sans réponse ou en erreur
+        """
+        self._pid = self._pid or os.getpid()
+        self._request_id += 1
+        expected = (self._pid, self._request_id)
+        with self._counters.get_lock():
+            self._counters[_SUBMITTED] += 1
+        self._requests.put((self._slot, expected, time.time(), payload))
+        while True:
+            try:
+                request_id, result = self._responses.get(timeout=self.timeout)
+            except queue.Empty:
+                raise RuntimeError(f"Service sans réponse depuis {self.timeout} s") from None
+            # Ignorer une réponse destinée à un processus précédent sur cet emplacement
+            if request_id == expected:
+                break
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class BatchedService:
+    """
+    Processus de service et ses files (une file de demandes commune, une
+    file de réponses par emplacement client). Les sous-classes définissent
+    `name`, `client_class` et `handler()`.
+    """
+
+    name = 'service'
+    client_class = ServiceClient
+
+    def __init__(self, n_clients, max_batch, max_wait_ms):
+        """
+        Args:
+            n_clients (int): Nombre d'emplacements clients (processus de travail simultanés)
+            max_batch (int): Nombre maximal d'éléments par lot
+            max_wait_ms (float): Attente maximale après la première demande d'un lot (ms)
+        """
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.requests = multiprocessing.Queue()
+        self.responses = [multiprocessing.Queue() for _ in range(n_clients)]
+        self.counters = multiprocessing.Array('d', _N_COUNTERS)
+        self._process = None
+
+    def handler(self):
+        """Renvoie (make_handler, handler_args) pour serve()."""
+        raise NotImplementedError
+
+    def start(self):
+        """Démarre le processus de service."""
+        make_handler, handler_args = self.handler()
+        self._process = multiprocessing.Process(
+            target=serve,
+            args=(self.requests, self.responses, self.counters, self.max_batch, self.max_wait,
+                  make_handler, handler_args),
+            name=self.name,
+            daemon=True
+        )
+        self._process.start()
+
+    def client(self, slot):
+        """Renvoie le client associé à un emplacement (un par processus de travail vivant)."""
+        return self.client_class(self.requests, self.responses[slot], slot, self.counters)
+
+    def stop(self):
+        """Arrête le processus de service."""
+        if self._process is None:
+            return
+        self.requests.put(None)
+        self._process.join(timeout=10)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._process = None
+
+    def stats(self):
+        """
+        Renvoie les compteurs du service.
+
+        Returns:
+            dict: Demandes, éléments, lots, taille moyenne des lots, latences (ms), profondeur de file
+        """
+        with self.counters.get_lock():
+            c = list(self.counters)
+        requests = c[_REQUESTS]
+        return {
+            'name': self.name,
+            'requests': int(requests),
+            'items': int(c[_ITEMS]),
+            'batches': int(c[_BATCHES]),
+            'mean_batch': c[_ITEMS] / c[_BATCHES] if c[_BATCHES] else 0.0,
+            'mean_latency_ms': 1000.0 * c[_LATENCY_SUM] / requests if requests else 0.0,
+            'max_latency_ms': 1000.0 * c[_LATENCY_MAX],
+            'queue_depth': int(c[_SUBMITTED] - requests),
+            'max_queue_depth': int(c[_DEPTH_MAX]),
+        }
+
+
+def print_service_stats(stats):
+    """Affiche les compteurs d'un service (et de la topologie des caméras du service de matching)."""
+    print(f"Service {stats['name']}: {stats['items']} éléments en {stats['batches']} lots "
+          f"({stats['mean_batch']:.1f} éléments/lot, {stats['requests']} demandes), "
+          f"latence moyenne {stats['mean_latency_ms']:.1f} ms (max {stats['max_latency_ms']:.1f} ms), "
+          f"file max {stats['max_queue_depth']} demandes")
+    graph_stats = stats.get('topology')
+    if graph_stats is not None:
+        print(f"  Topologie: {graph_stats['candidates_per_query']:.1f} identités comparées par requête "
+              f"({graph_stats['candidate_rate']:.1%} de la galerie, {graph_stats['queries']} requêtes)")
@@ -1,104 +1,313 @@
 """
 Module pour générer des résumés statistiques des objets détectés.
-Ce module analyse les données CSV et crée des fichiers de synthèse.
+
+Chaque processus caméra tient ses compteurs à jour pendant le traitement
+(SummaryAccumulator) et les sauvegarde régulièrement dans un petit fichier
+d'état (summary_state_<video>.json). Le résumé fusionne ces états : il peut
+donc être régénéré à tout moment, même pendant le traitement, sans relire
+les fichiers de trajectoires. Ceux-ci ne sont relus que pour les vidéos sans
+fichier d'état.
+
+Hors reprise, main.py supprime au démarrage les états et trajectoires
+laissés par une exécution précédente pour les vidéos à traiter (reset_states),
+et limite le résumé aux vidéos de l'exécution.
+
+Usage (rafraîchir le résumé pendant un traitement) :
+    python summary.py
 """
 
 import os
 import csv
+import json
 from collections import defaultdict
 
+import numpy as np
+
+import config
+from gallery import count_archived_ids
+from trajectory import FORMAT_EXTENSIONS, list_trajectory_files, read_trajectories, trajectory_path
+
+STATE_PREFIX = 'summary_state_'
 
-def generate_object_summary(csv_folder, output_file="object_summary.csv"):
+
+def state_path(folder, video_name):
+    """Renvoie le chemin du fichier d'état du résumé d'une vidéo."""
+    return os.path.join(folder, f"{STATE_PREFIX}{video_name}.json")
+
+
+class SummaryAccumulator:
     """
-    Génère un fichier CSV résumant les classes d'objets et leur nombre d'apparitions.
-    
+    Compteurs du résumé d'une vidéo, mis à jour à chaque détection :
+    apparitions, IDs uniques et alertes par classe.
+
+    Les positions reportées sur les frames sans détection (porte de
+    mouvement, colonne interpole des trajectoires) ne sont pas des
+    apparitions : elles sont comptées à part (interpolated_counts).
+    """
+
+    def __init__(self, video_name):
+        self.video_name = video_name
+        self.class_counts = defaultdict(int)   # Apparitions par classe
+        self.unique_ids = defaultdict(set)     # IDs globaux uniques par classe
+        self.alert_counts = defaultdict(int)   # Apparitions en zone d'alerte par classe
+        self.frames = 0                        # Dernière frame traitée
+        self.skipped = 0                       # Frames sans détection (porte de mouvement)
+        self.interpolated_counts = defaultdict(int)  # Positions reportées par classe (hors apparitions)
+
+    def add(self, class_name, gid, alert, interpolated=False):
+        """
+        Compte une détection.
+
+        Args:
+            class_name (str): Classe de l'objet
+            gid (int): ID global de l'objet
+            alert (bool): Objet dans une zone d'alerte
+            interpolated (bool): Position reportée sur une frame sans détection
+        """
+        if interpolated:
+            self.interpolated_counts[class_name] += 1
+            return
+        self.class_counts[class_name] += 1
+        self.unique_ids[class_name].add(int(gid))
+        if alert:
+            self.alert_counts[class_name] += 1
+
+    def add_columns(self, cols):
+        """Compte toutes les détections d'un fichier de trajectoires (voir read_trajectories)."""
+        interpolated = cols['interpole']
+        for class_name, count in zip(*np.unique(cols['class_name'][interpolated], return_counts=True)):
+            self.interpolated_counts[str(class_name)] += int(count)
+        detected = ~interpolated
+        classes, ids, alert = cols['class_name'][detected], cols['id'][detected], cols['alerte'][detected]
+        names, counts = np.unique(classes, return_counts=True)
+        for class_name, count in zip(names.tolist(), counts.tolist()):
+            mask = classes == class_name
+            self.class_counts[class_name] += count
+            self.unique_ids[class_name].update(np.unique(ids[mask]).tolist())
+            self.alert_counts[class_name] += int(np.count_nonzero(alert[mask]))
+        if len(cols['frame']):
+            self.frames = max(self.frames, int(cols['frame'].max()))
+
+    def to_state(self):
+        """Renvoie l'état sérialisable en JSON."""
+        return {
+            'video': self.video_name,
+            'frames': self.frames,
+            'skipped': self.skipped,
+            'class_counts': dict(self.class_counts),
+            'unique_ids': {k: sorted(v) for k, v in self.unique_ids.items()},
+            'alert_counts': dict(self.alert_counts),
+            'interpolated_counts': dict(self.interpolated_counts),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """Reconstruit un accumulateur depuis un état sauvegardé."""
+        acc = cls(state['video'])
+        acc.frames = state.get('frames', 0)
+        acc.skipped = state.get('skipped', 0)
+        acc.class_counts.update(state.get('class_counts', {}))
+        for class_name, ids in state.get('unique_ids', {}).items():
+            acc.unique_ids[class_name] = set(ids)
+        acc.alert_counts.update(state.get('alert_counts', {}))
+        acc.interpolated_counts.update(state.get('interpolated_counts', {}))
+        return acc
+
+    def save(self, folder):
+        """
+        Écrit le fichier d'état de la vidéo (remplacement atomique : un lecteur
+        ne voit jamais un fichier à moitié écrit).
+        """
+        path = state_path(folder, self.video_name)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_state(), f)
+        os.replace(tmp_path, path)
+
+
+def reset_states(folder, video_names):
+    """
+    Supprime les fichiers d'état et de trajectoires d'une exécution
+    précédente : sans cela, le résumé rafraîchi pendant le traitement
+    compterait les anciens résultats des vidéos pas encore démarrées.
+
     Args:
-        csv_folder (str): Dossier contenant les fichiers CSV de trajectoires
-        output_file (str): Nom du fichier de sortie pour le résumé
-    
+        folder (str): Dossier de sortie
+        video_names (list): Vidéos de la nouvelle exécution
+    """
+    for video_name in video_names:
+        paths = [state_path(folder, video_name)]
+        paths += [trajectory_path(folder, video_name, fmt) for fmt in FORMAT_EXTENSIONS]
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def load_states(folder, video_names=None):
+    """
+    Charge les accumulateurs de toutes les vidéos du dossier.
+
+    Les fichiers d'état sont prioritaires ; les fichiers de trajectoires
+    sans état (anciens traitements) sont relus.
+
+    Args:
+        folder (str): Dossier contenant les fichiers de trajectoires et d'état
+        video_names (list): Vidéos à charger (None = toutes celles du dossier)
+
     Returns:
-        dict: Dictionnaire avec les statistiques par vidéo et globales
+        dict: video_name -> SummaryAccumulator
     """
-    # Dictionnaires pour compter les objets
-    global_class_counts = defaultdict(int)  # Compte global par classe
-    video_class_counts = defaultdict(lambda: defaultdict(int))  # Compte par vidéo et classe
-    unique_objects = defaultdict(set)  # IDs uniques par classe
-    
-    # Parcourir tous les fichiers CSV dans le dossier
-    csv_files = [f for f in os.listdir(csv_folder) if f.endswith('.csv') and f.startswith('donnees_')]
-    
-    for csv_file in csv_files:
-        csv_path = os.path.join(csv_folder, csv_file)
-        video_name = csv_file.replace('donnees_', '').replace('.csv', '')
-        
-        with open(csv_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                class_name = row.get('class_name', 'unknown')
-                obj_id = row.get('id', '0')
-                
-                # Compter les apparitions par classe
-                global_class_counts[class_name] += 1
-                video_class_counts[video_name][class_name] += 1
-                
-                # Suivre les IDs uniques par classe
-                unique_objects[class_name].add(obj_id)
-    
-    # Générer le fichier de résumé
-    summary_path = os.path.join(csv_folder, output_file)
-    with open(summary_path, 'w', newline='', encoding='utf-8') as f:
+    wanted = None if video_names is None else set(video_names)
+    accumulators = {}
+    for name in sorted(os.listdir(folder)):
+        if name.startswith(STATE_PREFIX) and name.endswith('.json'):
+            try:
+                with open(os.path.join(folder, name), 'r', encoding='utf-8') as f:
+                    acc = SummaryAccumulator.from_state(json.load(f))
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Warning: état de résumé illisible {name} ({e})")
+                continue
+            if wanted is None or acc.video_name in wanted:
+                accumulators[acc.video_name] = acc
+
+    for video_name, path in list_trajectory_files(folder):
+        if video_name not in accumulators and (wanted is None or video_name in wanted):
+            acc = SummaryAccumulator(video_name)
+            acc.add_columns(read_trajectories(path))
+            accumulators[video_name] = acc
+    return accumulators
+
+
+def merge_summaries(accumulators):
+    """
+    Fusionne les compteurs de plusieurs vidéos.
+
+    Args:
+        accumulators (iterable): SummaryAccumulator des vidéos
+
+    Returns:
+        dict: Statistiques globales et par vidéo
+    """
+    global_class_counts = defaultdict(int)
+    global_alert_counts = defaultdict(int)
+    global_interpolated = defaultdict(int)
+    unique_objects = defaultdict(set)  # IDs uniques par classe (toutes vidéos)
+    by_video, unique_by_video, alerts_by_video = {}, {}, {}
+    skipped_frames = 0
+
+    for acc in accumulators:
+        for class_name, count in acc.class_counts.items():
+            global_class_counts[class_name] += count
+            global_alert_counts[class_name] += acc.alert_counts.get(class_name, 0)
+            unique_objects[class_name] |= acc.unique_ids[class_name]
+        by_video[acc.video_name] = dict(acc.class_counts)
+        unique_by_video[acc.video_name] = {k: len(v) for k, v in acc.unique_ids.items()}
+        alerts_by_video[acc.video_name] = dict(acc.alert_counts)
+        skipped_frames += acc.skipped
+        for class_name, count in acc.interpolated_counts.items():
+            global_interpolated[class_name] += count
+
+    return {
+        'global': dict(global_class_counts),
+        'by_video': by_video,
+        'unique_ids': {k: len(v) for k, v in unique_objects.items()},
+        'unique_ids_by_video': unique_by_video,
+        'alerts': dict(global_alert_counts),
+        'alerts_by_video': alerts_by_video,
+        'skipped_frames': skipped_frames,
+        'interpolated': dict(global_interpolated),
+    }
+
+
+def write_summary(stats, summary_path):
+    """Écrit le fichier CSV de résumé à partir des statistiques fusionnées."""
+    tmp_path = summary_path + '.tmp'
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
-        writer.writerow(['Type', 'Classe', 'Nom_Video', 'Nombre_Apparitions', 'Objets_Uniques'])
-        
+        writer.writerow(['Type', 'Classe', 'Nom_Video', 'Nombre_Apparitions', 'Objets_Uniques', 'Alertes'])
+
         # Écrire les résumés globaux
-        for class_name in sorted(global_class_counts.keys()):
+        for class_name in sorted(stats['global'].keys()):
             writer.writerow([
                 'GLOBAL',
                 class_name,
                 'TOUTES_VIDEOS',
-                global_class_counts[class_name],
-                len(unique_objects[class_name])
+                stats['global'][class_name],
+                stats['unique_ids'].get(class_name, 0),
+                stats['alerts'].get(class_name, 0)
             ])
-        
+
         # Écrire les résumés par vidéo
-        for video_name in sorted(video_class_counts.keys()):
-            for class_name in sorted(video_class_counts[video_name].keys()):
+        for video_name in sorted(stats['by_video'].keys()):
+            for class_name in sorted(stats['by_video'][video_name].keys()):
                 writer.writerow([
                     'PAR_VIDEO',
                     class_name,
                     video_name,
-                    video_class_counts[video_name][class_name],
-                    ''  # Les objets uniques sont comptés globalement
+                    stats['by_video'][video_name][class_name],
+                    stats['unique_ids_by_video'][video_name].get(class_name, 0),
+                    stats['alerts_by_video'][video_name].get(class_name, 0)
                 ])
-    
-    print(f"Résumé généré: {summary_path}")
-    return {
-        'global': dict(global_class_counts),
-        'by_video': dict(video_class_counts),
-        'unique_ids': {k: len(v) for k, v in unique_objects.items()}
-    }
+    os.replace(tmp_path, summary_path)
+
+
+def generate_object_summary(csv_folder, output_file="object_summary.csv", archive_file="gallery_archive.csv", verbose=True,
+                            video_names=None):
+    """
+    Génère un fichier CSV résumant les classes d'objets et leur nombre d'apparitions.
+    Peut être appelée pendant le traitement (les compteurs sont ceux de la dernière sauvegarde).
+
+    Args:
+        csv_folder (str): Dossier contenant les fichiers de trajectoires et d'état
+        output_file (str): Nom du fichier de sortie pour le résumé
+        archive_file (str): Archive des tracks globaux évincés de la galerie
+        verbose (bool): Afficher le chemin du résumé généré
+        video_names (list): Vidéos à résumer (None = toutes celles du dossier)
+
+    Returns:
+        dict: Dictionnaire avec les statistiques par vidéo et globales
+    """
+    stats = merge_summaries(load_states(csv_folder, video_names).values())
+    stats['archived_ids'] = count_archived_ids(os.path.join(csv_folder, archive_file))
+
+    summary_path = os.path.join(csv_folder, output_file)
+    write_summary(stats, summary_path)
+    if verbose:
+        print(f"Résumé généré: {summary_path}")
+    return stats
 
 
 def print_summary_stats(stats):
     """
     Affiche les statistiques de manière lisible dans la console.
-    
+
     Args:
         stats (dict): Dictionnaire de statistiques retourné par generate_object_summary
     """
     print("\n" + "="*60)
     print("RÉSUMÉ DES OBJETS DÉTECTÉS")
     print("="*60)
-    
+
     print("\n--- STATISTIQUES GLOBALES ---")
     for class_name, count in sorted(stats['global'].items()):
         unique_count = stats['unique_ids'].get(class_name, 0)
-        print(f"  {class_name}: {count} apparitions, {unique_count} objets uniques")
-    
+        alert_count = stats['alerts'].get(class_name, 0)
+        print(f"  {class_name}: {count} apparitions, {unique_count} objets uniques, {alert_count} en alerte")
+    if stats.get('archived_ids'):
+        print(f"  (dont {stats['archived_ids']} IDs globaux archivés hors de la galerie)")
+    if stats.get('skipped_frames'):
+        print(f"  Porte de mouvement: {stats['skipped_frames']} frames sans détection, "
+              f"{sum(stats.get('interpolated', {}).values())} positions reportées (non comptées)")
+
     print("\n--- STATISTIQUES PAR VIDÉO ---")
     for video_name, classes in sorted(stats['by_video'].items()):
         print(f"\n  Vidéo: {video_name}")
         for class_name, count in sorted(classes.items()):
-            print(f"    - {class_name}: {count} apparitions")
-    
+            unique_count = stats['unique_ids_by_video'][video_name].get(class_name, 0)
+            print(f"    - {class_name}: {count} apparitions, {unique_count} objets uniques")
+
     print("\n" + "="*60 + "\n")
+
+
+if __name__ == "__main__":
+    print_summary_stats(generate_object_summary(config.OUTPUT_FOLDER))
@@ -0,0 +1,121 @@
+"""Tests des index de recherche de la galerie et de leur synchronisation."""
+
+import numpy as np
+
+import config
+import gallery as gallery_module
+import tracking
+from ann_index import IVFIndex, PartitionedIndex, make_index
+from gallery import SharedGallery
+
+DIM = 16
+
+
+def _embeddings(n, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, DIM)).astype(np.float32)
+
+
+def test_partitioned_ivf_matches_exact_class_search(monkeypatch):
+    monkeypatch.setattr(config, 'MATCH_INDEX', 'ivf')
+    monkeypatch.setattr(config, 'GALLERY_CLASS_PARTITION', True)
+    monkeypatch.setattr(config, 'GALLERY_EMBEDDING_DIM', DIM)
+    # Toutes les listes sondées : l'IVF doit retrouver exactement la recherche exacte
+    monkeypatch.setattr(config, 'IVF_N_LISTS', 4)
+    monkeypatch.setattr(config, 'IVF_N_PROBE', 4)
+    index = tracking.make_matching_index()
+    assert isinstance(index, PartitionedIndex)
+
+    gallery = SharedGallery.create(512, DIM)
+    try:
+        emb = _embeddings(300)
+        classes = ['person', 'car', 'backpack']
+        for i in range(300):
+            gallery.append(emb[i], (0, 0), 'cam.mp4', 0.0, i, classes[i % 3] if i % 7 else None)
+        queries = list(_embeddings(12, seed=1))
+        query_classes = ['person', 'car', None, 'bicycle'] * 3
+
+        ids, sims = tracking.search_gallery(gallery, queries, index, classes=query_classes)
+        exact_ids, exact_sims = tracking.search_gallery(gallery, queries, classes=query_classes)
+        assert ids == exact_ids
+        np.testing.assert_allclose(sims, exact_sims, atol=1e-5)
+        assert ids[3] is None  # Classe absente de la galerie
+        # Les sous-index ont dépassé leur taille d'apprentissage : recherche IVF
+        assert all(isinstance(part, IVFIndex) and part.centroids is not None
+                   for code, part in index._parts.items() if code >= 0)
+        assert index.partition_size(gallery.class_code('person')) == gallery.read_subset(
+            lambda ids, matrix, scales: len(ids), class_code=gallery.class_code('person'))
+
+        # Retraits (quota LRU, TTL) propagés à la synchronisation suivante
+        gallery.expire(frame_idx=400, ttl_frames=200)
+        ids, _ = tracking.search_gallery(gallery, queries, index, classes=query_classes)
+        assert ids == tracking.search_gallery(gallery, queries, classes=query_classes)[0]
+        assert sorted(index.indexed_ids().tolist()) == sorted(gallery.read(lambda ids, m, s: ids.tolist()))
+    finally:
+        gallery.unlink()
+
+
+def test_partitioned_search_without_class_combines_partitions():
+    index = make_index('exact', DIM, partitioned=True)
+    emb = _embeddings(6)
+    emb /= np.linalg.norm(emb, axis=1, keepdims=True)
+    index.add(np.arange(1, 7), emb, np.array([0, 0, 1, 1, -1, -1]))
+    ids, sims = index.search(emb)
+    assert ids.tolist() == [1, 2, 3, 4, 5, 6]
+    np.testing.assert_allclose(sims, 1.0, atol=1e-6)
+    assert index.search(emb[:1], class_code=1)[0][0] in (3, 4)
+    assert index.search(emb[:1], class_code=7)[0].tolist() == [-1]
+    # Identité changée de partition
+    index.add([1], emb[:1], [1])
+    assert index.partition_size(0) == 1 and index.partition_size(1) == 3
+    index.remove([1, 99])
+    assert len(index) == 5
+
+
+def _gallery_ids(gallery):
+    return sorted(gallery.read(lambda ids, matrix, scales: ids.tolist()))
+
+
+def test_ivf_sync_follows_adds_updates_and_removals():
+    gallery = SharedGallery.create(400, DIM)
+    index = IVFIndex(DIM, n_lists=4, n_probe=4, train_size=64)
+    try:
+        emb = _embeddings(300)
+        for i in range(100):
+            gallery.append(emb[i], (0, 0), 'cam.mp4', 0.0, i)
+        index.sync(gallery)
+        assert index.centroids is not None and len(index) == 100
+
+        # Mise à jour : la nouvelle valeur remplace l'ancienne dans l'index
+        gallery.update(5, emb[200], (0, 0), 'cam.mp4', 0.0, 200)
+        gallery.expire(frame_idx=150, ttl_frames=100)  # IDs 1 à 49 sauf 5
+        for i in range(100, 150):
+            gallery.append(emb[i], (0, 0), 'cam.mp4', 0.0, i)
+        index.sync(gallery)
+        assert sorted(index.indexed_ids().tolist()) == _gallery_ids(gallery)
+
+        queries = tracking.normalize_embeddings(emb[[200, 120, 3]])
+        ids, sims = index.search(queries)
+        assert ids[:2].tolist() == [5, 121]
+        np.testing.assert_allclose(sims[:2], 1.0, atol=1e-5)
+        assert ids[2] != 4  # Retiré de la galerie
+    finally:
+        gallery.unlink()
+
+
+def test_sync_after_removed_log_overflow(monkeypatch):
+    monkeypatch.setattr(gallery_module, 'REMOVED_LOG_LEN', 4)
+    gallery = SharedGallery.create(64, DIM)
+    index = make_index('exact', DIM)
+    try:
+        emb = _embeddings(40)
+        for i in range(20):
+            gallery.append(emb[i], (0, 0), 'cam.mp4', 0.0, i)
+        index.sync(gallery)
+        # Plus de retraits que le journal n'en garde : resynchronisation complète
+        assert gallery.expire(frame_idx=30, ttl_frames=20) == 10
+        gallery.append(emb[30], (0, 0), 'cam.mp4', 0.0, 30)
+        index.sync(gallery)
+        assert sorted(index.indexed_ids().tolist()) == _gallery_ids(gallery)
+        assert len(index) == 11
+    finally:
+        gallery.unlink()
@@ -0,0 +1,60 @@
+"""Tests de la suite de benchmarks (tailles minimales) et de la comparaison des résultats."""
+
+import json
+import sys
+
+import pytest
+
+import benchmark
+
+TINY = dict(benchmark.QUICK, dets_per_frame=4, n_zones=2, frame_size=(160, 120), trajectory_rows=300)
+
+
+def _main(monkeypatch, *args):
+    monkeypatch.setattr(benchmark, 'QUICK', TINY)
+    monkeypatch.setattr(sys, 'argv', ['benchmark.py', '--quick', '--only', 'zones', 'trajectories'] + list(args))
+    benchmark.main()
+
+
+def test_zones_and_trajectories_results(monkeypatch, tmp_path):
+    path = tmp_path / 'avant.json'
+    _main(monkeypatch, '--json', str(path))
+    with open(path, encoding='utf-8') as f:
+        saved = json.load(f)
+    assert saved['params']['trajectory_rows'] == 300
+    results = saved['results']
+    assert results['zones/locate/mask']['points'] == 4
+    for fmt in ('csv', 'npz'):
+        write = results[f'trajectories/write/{fmt}']
+        assert write['rows'] == 300 and write['bytes'] > 0 and write['ms'] > 0
+    assert all(result['ms'] >= 0 for result in results.values())
+
+
+def test_compare_flags_regressions_and_new_cases(monkeypatch, tmp_path, capsys):
+    path = tmp_path / 'avant.json'
+    _main(monkeypatch, '--json', str(path))
+    with open(path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    # Référence : un cas bien plus rapide (régression), un cas absent (nouveau)
+    baseline['results']['zones/compile']['ms'] = 1e-6
+    del baseline['results']['trajectories/write/csv']
+    baseline['environment']['commit'] = 'abc1234'
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f)
+    capsys.readouterr()
+
+    with pytest.raises(SystemExit) as exc:
+        _main(monkeypatch, '--compare', str(path), '--threshold', '1000')
+    assert exc.value.code == 1
+    lines = capsys.readouterr().out.splitlines()
+    assert any('abc1234' in line for line in lines)
+    assert any('zones/compile' in line and 'RÉGRESSION' in line for line in lines)
+    assert any('trajectories/write/csv' in line and '(nouveau)' in line for line in lines)
+    assert not any('RÉGRESSION' in line for line in lines if 'zones/compile' not in line)
+
+
+def test_compare_without_regression():
+    current = {'results': {'a': {'ms': 1.0}, 'b': {'ms': 2.0}}}
+    baseline = {'environment': {}, 'results': {'a': {'ms': 1.1}, 'b': {'ms': 4.0}}}
+    assert benchmark.compare(current, baseline, 0.2) == []
+    assert benchmark.compare(current, {'environment': {}, 'results': {'a': {'ms': 0.5}}}, 0.2) == ['a']
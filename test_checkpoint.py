@@ -0,0 +1,68 @@
+"""Tests des points de reprise et de la reprise de la galerie."""
+
+import os
+
+import numpy as np
+
+from checkpoint import checkpoint_path, load_checkpoint, remove_checkpoint, save_checkpoint
+from gallery import SharedGallery
+from summary import SummaryAccumulator
+from zone_events import ZoneEventEngine
+
+
+def test_save_load_remove(tmp_path):
+    folder = str(tmp_path)
+    assert load_checkpoint(folder, 'cam.mp4') is None
+    state = {'video': 'cam.mp4', 'frame': 120, 'next_frame': 121, 'n_frames': 121,
+             'trajectories': {'rows': 40, 'offset': 1234}, 'events': 3, 'next_id': 17}
+    save_checkpoint(folder, 'cam.mp4', state)
+    assert load_checkpoint(folder, 'cam.mp4') == state
+    assert not os.path.exists(checkpoint_path(folder, 'cam.mp4') + '.tmp')
+    remove_checkpoint(folder, 'cam.mp4')
+    remove_checkpoint(folder, 'cam.mp4')
+    assert load_checkpoint(folder, 'cam.mp4') is None
+
+
+def test_pipeline_state_round_trip(tmp_path):
+    """Résumé et visites de zone repris à l'identique depuis le JSON du point de reprise."""
+    folder = str(tmp_path)
+    summary = SummaryAccumulator('cam.mp4')
+    summary.add('person', 4, True)
+    engine = ZoneEventEngine(enter_frames=1, exit_frames=2, min_duration=0.0, dwell_seconds=10.0)
+    engine.update(10, 1.0, [(4, 0, 'person')])
+    save_checkpoint(folder, 'cam.mp4', {'summary': summary.to_state(), 'zone_events': engine.to_state()})
+
+    ckpt = load_checkpoint(folder, 'cam.mp4')
+    assert SummaryAccumulator.from_state(ckpt['summary']).to_state() == summary.to_state()
+    resumed = ZoneEventEngine(enter_frames=1, exit_frames=2, min_duration=0.0, dwell_seconds=10.0)
+    resumed.load_state(ckpt['zone_events'])
+    assert resumed.to_state() == engine.to_state()
+
+
+def test_gallery_snapshot_resume_does_not_reuse_ids(tmp_path):
+    path = str(tmp_path / 'gallery_checkpoint.npz')
+    rng = np.random.default_rng(0)
+    gallery = SharedGallery.create(16, 8, dtype='int8')
+    try:
+        ids = [gallery.append(rng.standard_normal(8), (1, 2), 'cam.mp4', 1.0, 1, 'person') for _ in range(3)]
+        assert gallery.snapshot_generation == 0
+        gallery.save(path)
+        assert gallery.save(path) == gallery.snapshot_generation == 2
+        snapshot = gallery.read(lambda ids, matrix, scales: (ids.copy(), matrix.copy()))
+        next_id = gallery.next_id
+    finally:
+        gallery.unlink()
+
+    resumed = SharedGallery.create(16, 8, dtype='int8')
+    try:
+        resumed.load(path)
+        assert len(resumed) == 3 and resumed.next_id == next_id and resumed.snapshot_generation == 2
+        ids_back, matrix_back = resumed.read(lambda ids, matrix, scales: (ids.copy(), matrix.copy()))
+        assert ids_back.tolist() == snapshot[0].tolist() == ids
+        np.testing.assert_array_equal(matrix_back, snapshot[1])
+        assert resumed.class_names() == ['person']
+        # Point de reprise d'une vidéo en avance sur la galerie sauvegardée
+        resumed.reserve_ids(next_id + 5)
+        assert resumed.append(rng.standard_normal(8), (0, 0), 'cam.mp4') == next_id + 5
+    finally:
+        resumed.unlink()
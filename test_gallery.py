@@ -0,0 +1,272 @@
+"""Tests de la galerie partagée des tracks globaux."""
+
+import csv
+import multiprocessing
+
+import numpy as np
+import pytest
+
+import config
+import tracking
+from gallery import SharedGallery, count_archived_ids
+
+DIM = 8
+CLASSES = ['person', 'car', None, 'backpack']
+
+
+def _embeddings(n, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, DIM)).astype(np.float32)
+
+
+def _snapshot(gallery):
+    """{gid: (code de classe, embedding)} des lignes utilisées, et codes dans l'ordre des lignes."""
+    def _read(size):
+        codes = gallery._class_code[:size].copy()
+        rows = {int(gid): (int(code), gallery._embeddings[row].copy())
+                for row, (gid, code) in enumerate(zip(gallery._ids[:size], codes))}
+        return rows, codes
+    return gallery._consistent(_read)
+
+
+def _assert_sorted_by_class(gallery):
+    _, codes = _snapshot(gallery)
+    assert np.all(codes[1:] >= codes[:-1])
+
+
+@pytest.fixture
+def gallery():
+    g = SharedGallery.create(32, DIM, class_capacity={'car': 3})
+    yield g
+    g.unlink()
+
+
+def test_partitions_stay_contiguous(gallery):
+    emb = _embeddings(40)
+    expected = {}
+    for i in range(24):
+        class_name = CLASSES[i % len(CLASSES)]
+        gid = gallery.append(emb[i], (i, i), 'cam.mp4', float(i), i, class_name)
+        expected[gid] = class_name
+        _assert_sorted_by_class(gallery)
+    # Quota de 'car' : seules les 3 dernières restent
+    cars = [gid for gid, name in expected.items() if name == 'car']
+    for gid in cars[:-3]:
+        del expected[gid]
+
+    gallery.update(cars[-1], emb[30], (0, 0), 'cam.mp4', 30.0, 30)
+    # Inactives depuis plus de 90 frames : frames 0 à 9 (IDs 1 à 10), sauf la voiture mise à jour
+    survivors = {gid: name for gid, name in expected.items() if gid > 10 or gid == cars[-1]}
+    assert gallery.expire(frame_idx=100, ttl_frames=90) == len(expected) - len(survivors)
+    expected = survivors
+    _assert_sorted_by_class(gallery)
+
+    rows, _ = _snapshot(gallery)
+    assert sorted(rows) == sorted(expected)
+    for gid, name in expected.items():
+        assert gallery.get(gid)['class_name'] == name
+    # Les données déplacées suivent leur identité
+    for gid in expected:
+        if gid != cars[-1]:
+            np.testing.assert_allclose(rows[gid][1], emb[gid - 1] / np.linalg.norm(emb[gid - 1]), rtol=1e-6)
+
+
+def test_read_subset_is_a_view_on_the_partition(gallery):
+    emb = _embeddings(12)
+    for i in range(12):
+        gallery.append(emb[i], (0, 0), 'cam.mp4', float(i), i, CLASSES[i % len(CLASSES)])
+    code = gallery.class_code('person')
+    ids, is_view = gallery.read_subset(
+        lambda ids, matrix, scales: (ids.tolist(), np.shares_memory(matrix, gallery._embeddings)),
+        class_code=code)
+    assert is_view
+    assert sorted(ids) == [1, 5, 9]
+    assert gallery.read_subset(lambda ids, matrix, scales: len(ids), class_code=-1) == 3
+    # Filtre supplémentaire (topologie) : seulement les lignes retenues de la partition
+    recent = gallery.read_subset(lambda ids, matrix, scales: ids.tolist(), class_code=code,
+                                 select=lambda last_camera, last_time: last_time > 2.0)
+    assert sorted(recent) == [5, 9]
+
+
+def test_class_search_matches_brute_force(gallery):
+    emb = _embeddings(30, seed=1)
+    classes = [CLASSES[i % 3] for i in range(30)]
+    for i in range(30):
+        gallery.append(emb[i], (0, 0), 'cam.mp4', 0.0, i, classes[i])
+    queries = _embeddings(6, seed=2)
+    query_classes = ['person', None, 'person', 'car', 'backpack', None]
+    ids, _ = tracking.search_gallery(gallery, list(queries), classes=query_classes)
+
+    rows, _ = _snapshot(gallery)
+    for query, class_name, gid in zip(queries, query_classes, ids):
+        code = -1 if class_name is None else gallery.class_code(class_name)
+        candidates = [g for g, (c, _) in rows.items() if c == code]
+        if not candidates:
+            assert gid is None
+            continue
+        sims = [float(rows[g][1] @ query) for g in candidates]
+        assert gid == candidates[int(np.argmax(sims))]
+
+
+def test_unsorted_saved_gallery_is_sorted_on_load(gallery, tmp_path):
+    emb = _embeddings(8)
+    for i in range(8):
+        gallery.append(emb[i], (0, 0), 'cam.mp4', 0.0, i, CLASSES[i % len(CLASSES)])
+    # Galerie sauvegardée avant le tri par partition : lignes dans l'ordre d'arrivée
+    with gallery.writing():
+        order = np.argsort(gallery._ids[:8])
+        for name in gallery._row_fields:
+            arr = getattr(gallery, f'_{name}')
+            arr[:8] = arr[:8][order]
+    path = str(tmp_path / 'gallery.npz')
+    gallery.save(path)
+
+    loaded = SharedGallery.create(32, DIM)
+    try:
+        loaded.load(path)
+        _assert_sorted_by_class(loaded)
+        assert _snapshot(loaded)[0].keys() == _snapshot(gallery)[0].keys()
+        assert loaded.get(3)['class_name'] is None
+    finally:
+        loaded.unlink()
+
+
+def _write_pairs(gallery, vectors, rounds):
+    """Processus écrivain : les deux premières identités reçoivent toujours le même embedding."""
+    for k in range(rounds):
+        with gallery.writing():
+            gallery.update(1, vectors[k % len(vectors)], (k, k), 'cam.mp4', float(k), k)
+            gallery.update(2, vectors[k % len(vectors)], (k, k), 'cam.mp4', float(k), k)
+    gallery.append(vectors[0], (0, 0), 'cam.mp4')
+    gallery.close()
+
+
+def test_seqlock_reads_are_consistent_under_a_concurrent_writer():
+    ctx = multiprocessing.get_context('fork')
+    gallery = SharedGallery.create(8, DIM)
+    try:
+        vectors = _embeddings(2, seed=3)
+        gallery.append(vectors[0], (0, 0), 'cam.mp4')
+        gallery.append(vectors[0], (0, 0), 'cam.mp4')
+        writer = ctx.Process(target=_write_pairs, args=(gallery, vectors, 20000))
+        writer.start()
+        reads = 0
+        while writer.is_alive() or reads == 0:
+            first, second = gallery.read(lambda ids, matrix, scales: (matrix[0].copy(), matrix[1].copy()))
+            np.testing.assert_array_equal(first, second)
+            reads += 1
+        writer.join()
+        assert writer.exitcode == 0
+        # Écritures du processus enfant visibles dans le segment partagé
+        assert len(gallery) == 3 and gallery.get(1)['last_frame'] == 19999
+    finally:
+        gallery.unlink()
+
+
+def test_lru_eviction_archives_least_recently_used(tmp_path):
+    archive = str(tmp_path / 'archive.csv')
+    gallery = SharedGallery.create(3, DIM, archive_path=archive)
+    try:
+        emb = _embeddings(5)
+        for i in range(3):
+            gallery.append(emb[i], (i, i), 'cam.mp4', float(i), i)
+        assert gallery.update(1, emb[0], (9, 9), 'cam.mp4', 5.0, 5)  # 1 redevient récent
+        assert gallery.append(emb[3], (0, 0), 'cam.mp4', 6.0, 6) == 4
+        assert gallery.read(lambda ids, matrix, scales: sorted(ids.tolist())) == [1, 3, 4]
+        assert not gallery.update(2, emb[1], (0, 0), 'cam.mp4')  # Évincé entre-temps
+        assert count_archived_ids(archive) == 1
+        with open(archive, encoding='utf-8') as f:
+            row = next(csv.DictReader(f))
+        assert row['id'] == '2' and row['reason'] == 'lru'
+    finally:
+        gallery.unlink()
+
+
+def test_ema_update_and_ttl_in_seconds():
+    gallery = SharedGallery.create(8, DIM, ema_alpha=0.25)
+    try:
+        old, new = np.eye(DIM, dtype=np.float32)[:2]
+        gid = gallery.append(old, (0, 0), 'cam.mp4', 0.0, 0)
+        gallery.update(gid, new, (1, 1), 'cam.mp4', 10.0, 250)
+        expected = 0.75 * old + 0.25 * new
+        np.testing.assert_allclose(gallery.get(gid)['embedding'], expected / np.linalg.norm(expected), rtol=1e-6)
+        assert gallery.get(gid)['hits'] == 2
+
+        other = gallery.append(new, (0, 0), 'cam.mp4', 2.0, 50)
+        assert gallery.expire(timestamp=40.0, ttl_seconds=30.0) == 1
+        assert gallery.get(other) is None and gallery.get(gid) is not None
+    finally:
+        gallery.unlink()
+
+
+def test_default_config_keeps_the_original_behaviour():
+    assert not config.GALLERY_CLASS_PARTITION
+    gallery = SharedGallery.create(8, DIM, ema_alpha=config.GALLERY_EMA_ALPHA)
+    try:
+        old, new = np.eye(DIM, dtype=np.float32)[:2]
+        gid = gallery.append(old, (0, 0), 'cam.mp4', 0.0, 0)
+        gallery.update(gid, new, (1, 1), 'cam.mp4', 1e6, 10 ** 7)
+        # Embedding remplacé, et aucune expiration même après une longue inactivité
+        np.testing.assert_array_equal(gallery.get(gid)['embedding'], new)
+        other = gallery.append(old, (0, 0), 'cam.mp4', 0.0, 0)
+        assert tracking.expire_global_tracks(gallery, 10 ** 7, 1e6, 'cam.mp4') == 0
+        assert gallery.get(other) is not None
+    finally:
+        gallery.unlink()
+
+
+@pytest.mark.parametrize('dtype, tolerance', [('float16', 1e-3), ('int8', 1e-2)])
+def test_compact_storage_matches_float32(dtype, tolerance, tmp_path):
+    reference = SharedGallery.create(600, DIM)
+    compact = SharedGallery.create(600, DIM, dtype=dtype)
+    try:
+        emb = _embeddings(500, seed=4)
+        for i, vec in enumerate(emb):
+            camera = f'cam{i % 3}.mp4'
+            reference.append(vec, (0, 0), camera)
+            compact.append(vec, (0, 0), camera)
+        assert compact._embeddings.dtype == np.dtype(dtype)
+        assert compact.camera_names() == ['cam0.mp4', 'cam1.mp4', 'cam2.mp4']
+
+        queries = list(emb[:50] + 0.3 * _embeddings(50, seed=5))
+        ref_ids, ref_sims = tracking.search_gallery(reference, queries)
+        ids, sims = tracking.search_gallery(compact, queries)
+        assert ids == ref_ids
+        np.testing.assert_allclose(sims, ref_sims, atol=tolerance)
+        np.testing.assert_allclose(compact.get(7)['embedding'], reference.get(7)['embedding'], atol=tolerance)
+
+        path = str(tmp_path / 'gallery.npz')
+        compact.save(path)
+        loaded = SharedGallery.create(600, DIM, dtype=dtype)
+        try:
+            loaded.load(path)
+            assert tracking.search_gallery(loaded, queries) == (ids, sims)
+            assert loaded.get(9)['last_video'] == 'cam2.mp4'  # i = 8
+        finally:
+            loaded.unlink()
+    finally:
+        reference.unlink()
+        compact.unlink()
+
+
+def test_persistent_gallery_survives_reopen(tmp_path):
+    path = str(tmp_path / 'gallery.dat')
+    emb = _embeddings(4)
+    gallery = SharedGallery.open(path, 16, DIM, first_id=100)
+    try:
+        ids = [gallery.append(emb[i], (i, i), 'cam.mp4', float(i), i, CLASSES[i]) for i in range(3)]
+    finally:
+        gallery.unlink()
+    assert ids == [100, 101, 102]
+
+    reopened = SharedGallery.open(path, 16, DIM, first_id=1)
+    try:
+        assert len(reopened) == 3
+        assert reopened.get(101)['class_name'] == 'car' and reopened.get(101)['last_pos'] == (1, 1)
+        ids, _ = tracking.search_gallery(reopened, [emb[2]])
+        assert ids == [102]
+        assert reopened.append(emb[3], (0, 0), 'cam.mp4') == 103
+    finally:
+        reopened.unlink()
+
+    with pytest.raises(ValueError):
+        SharedGallery.open(path, 32, DIM)
@@ -0,0 +1,82 @@
+"""Tests du découpage et de la répartition des lots de détection (sans modèle)."""
+
+from types import SimpleNamespace
+
+import numpy as np
+
+from inference import detect_frames, detect_regions, region_boxes
+from roi import RegionPlanner
+
+SIZE = (1920, 1080)
+
+
+class _Model:
+    """Détecteur factice : un résultat par entrée, qui garde l'image reçue ; note chaque appel."""
+
+    names = {0: 'person', 1: 'car'}
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, source, **kwargs):
+        self.calls.append((kwargs['imgsz'], [img.shape[:2] for img in source]))
+        return [SimpleNamespace(img=img) for img in source]
+
+
+def _frame(value):
+    return np.full((SIZE[1], SIZE[0], 3), value, dtype=np.uint8)
+
+
+def test_region_boxes_are_offset_to_frame_coordinates():
+    rects = [(100, 50, 300, 250), (1000, 600, 1200, 800)]
+    boxes = [np.array([[10, 20, 30, 40, 0.9, 0]]), np.array([[0, 0, 50, 60, 0.8, 1], [5, 5, 10, 10, 0.7, 0]])]
+    np.testing.assert_allclose(region_boxes(rects, boxes), [
+        [110, 70, 130, 90, 0.9, 0],
+        [1000, 600, 1050, 660, 0.8, 1],
+        [1005, 605, 1010, 610, 0.7, 0],
+    ])
+    assert region_boxes(rects, [np.zeros((0, 6)), np.zeros((0, 6))]).shape == (0, 6)
+
+
+def test_duplicates_across_neighbouring_regions_are_kept_once():
+    rects = [(0, 0, 100, 100), (90, 0, 200, 100)]
+    boxes = [
+        np.array([[80, 10, 100, 50, 0.6, 0],     # Objet coupé au bord de la première région
+                  [85, 60, 100, 90, 0.9, 0]]),   # Autre objet, au bord aussi
+        np.array([[-8, 10, 12, 50, 0.8, 0],      # Même objet vu en entier par la seconde
+                  [-8, 10, 12, 50, 0.7, 1],      # Autre classe au même endroit
+                  [-6, 62, 8, 88, 0.5, 0]]),     # Doublon de la boîte à 0.9
+    ]
+    out = region_boxes(rects, boxes, overlap=0.5)
+    np.testing.assert_allclose(out, [
+        [85, 60, 100, 90, 0.9, 0],
+        [82, 10, 102, 50, 0.8, 0],
+        [82, 10, 102, 50, 0.7, 1],
+    ])
+
+
+def test_batch_results_go_back_to_their_camera():
+    model = _Model()
+    planner = RegionPlanner(SIZE, [(0, 0, 120, 90), (900, 500, 1500, 900)], imgsz=1280)
+    frames = [_frame(1), _frame(2), _frame(3)]
+    out = detect_frames(model, frames, [None, planner, None], [(), (), ()])
+
+    # Un appel par taille d'entrée : frames entières ensemble, chaque région à sa taille
+    assert model.calls == [(1280, [(1080, 1920), (1080, 1920)]), (416, [(400, 600)]), (96, [(90, 120)])]
+    (rects0, res0), (rects1, res1), (rects2, res2) = out
+    assert rects0 is None and len(res0) == 1 and res0[0].img[0, 0, 0] == 1
+    assert rects2 is None and len(res2) == 1 and res2[0].img[0, 0, 0] == 3
+    assert rects1 == [(0, 0, 120, 90), (900, 500, 1500, 900)]
+    assert [r.img.shape[:2] for r in res1] == [(90, 120), (400, 600)]
+    assert all(r.img[0, 0, 0] == 2 for r in res1)
+    # Pixels comptés d'après les tailles réellement envoyées
+    assert planner.pixels == 96 ** 2 + 416 ** 2
+
+
+def test_regions_outside_the_frame_are_detected_in_full():
+    model = _Model()
+    planner = RegionPlanner(SIZE, [(5000, 0, 6000, 100)])
+    result = detect_regions(model, _frame(4), planner)
+    assert model.calls == [(1280, [(1080, 1920)])]
+    assert result.img[0, 0, 0] == 4
+    assert planner.pixel_rate() == 1.0
@@ -0,0 +1,53 @@
+"""Tests de la porte de mouvement."""
+
+import numpy as np
+
+from alerts import ZoneMap
+from motion import MotionGate
+
+SIZE = (320, 240)
+
+
+def _frame(blocks=()):
+    """Scène fixe grise ; `blocks` = carrés blancs (x, y, côté) d'un objet en mouvement."""
+    frame = np.full((SIZE[1], SIZE[0], 3), 60, dtype=np.uint8)
+    for x, y, side in blocks:
+        frame[y:y + side, x:x + side] = 255
+    return frame
+
+
+def _gate(**kwargs):
+    params = dict(idle_stride=5, hold_frames=3)
+    params.update(kwargs)
+    return MotionGate(SIZE, **params)
+
+
+def test_static_scene_is_detected_every_idle_stride():
+    gate = _gate()
+    decisions = [gate.check(_frame()) for _ in range(11)]
+    assert decisions == [True, False, False, False, False, True, False, False, False, False, True]
+    assert gate.skip_rate() == 8 / 11
+
+
+def test_motion_triggers_detection_and_holds():
+    gate = _gate()
+    gate.check(_frame())
+    assert gate.check(_frame([(100, 80, 60)]))
+    # Le mouvement a cessé : encore hold_frames frames détectées
+    decisions = [gate.check(_frame()) for _ in range(3)]
+    assert decisions[:2] == [True, True]
+
+
+def test_small_motion_counts_only_near_tracks_and_zones():
+    small = [(40, 40, 6)]  # Sous MOTION_MIN_AREA, au-dessus de MOTION_ROI_AREA
+    gate = _gate()
+    gate.check(_frame())
+    assert not gate.check(_frame(small))
+
+    gate = _gate()
+    gate.check(_frame())
+    assert gate.check(_frame(small), boxes=[(30, 30, 60, 60)])
+
+    gate = _gate(zones=ZoneMap([[20, 20, 80, 80]], SIZE))
+    gate.check(_frame())
+    assert gate.check(_frame(small))
@@ -0,0 +1,169 @@
+"""Tests de CameraPipeline sur une petite vidéo synthétique, sans modèle de détection."""
+
+import os
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+import config
+import processor
+from checkpoint import load_checkpoint, save_checkpoint
+from gallery import SharedGallery
+from trajectory import read_trajectories, trajectory_path
+
+DIM = 8
+SIZE = (64, 48)
+CLASS_NAMES = {0: 'person', 1: 'car'}
+
+
+class _Tensor:
+    """Tenseur minimal (int, cpu, numpy, tolist) comme les boîtes d'un Results."""
+
+    def __init__(self, data):
+        self.data = np.asarray(data)
+
+    def int(self):
+        return _Tensor(self.data.astype(int))
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.data
+
+    def tolist(self):
+        return self.data.tolist()
+
+
+def _result(tracks):
+    """Résultat tracké : `tracks` = [(id local, x, y, w, h, classe)]."""
+    if not tracks:
+        return SimpleNamespace(boxes=SimpleNamespace(id=None))
+    tracks = np.array(tracks, dtype=np.float32)
+    return SimpleNamespace(boxes=SimpleNamespace(
+        id=_Tensor(tracks[:, 0]), xywh=_Tensor(tracks[:, 1:5]), cls=_Tensor(tracks[:, 5]),
+        conf=_Tensor(np.full(len(tracks), 0.9))))
+
+
+def _reid(frame, dets):
+    """Embedding déterminé par la position de la boîte : un même objet garde son identité."""
+    embeddings = []
+    for x1, _, _, _ in dets:
+        emb = np.zeros(DIM, dtype=np.float32)
+        emb[int(x1) // 10 % DIM] = 1.0
+        embeddings.append(emb)
+    return embeddings
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    """CameraPipeline réel (headless) sur une vidéo de 20 frames, sorties dans tmp_path."""
+    monkeypatch.setattr(config, 'INPUT_FOLDER', str(tmp_path))
+    monkeypatch.setattr(config, 'OUTPUT_FOLDER', str(tmp_path))
+    monkeypatch.setattr(config, 'WRITE_ANNOTATED_VIDEO', False)
+    monkeypatch.setattr(config, 'EVENT_CONSOLE', False)
+    monkeypatch.setattr(config, 'TRAJECTORY_FORMAT', 'csv')
+    monkeypatch.setattr(config, 'CHECKPOINT_INTERVAL', 0)
+    writer = cv2.VideoWriter(str(tmp_path / 'cam.mp4'), cv2.VideoWriter_fourcc(*'mp4v'), 10, SIZE)
+    for _ in range(20):
+        writer.write(np.zeros((SIZE[1], SIZE[0], 3), dtype=np.uint8))
+    writer.release()
+
+    gallery = SharedGallery.create(16, DIM)
+    pipelines = []
+
+    def _make(**kwargs):
+        p = processor.CameraPipeline('cam.mp4', gallery, SimpleNamespace(value=-1), _reid, CLASS_NAMES, headless=True,
+                                     **kwargs)
+        pipelines.append(p)
+        return p
+
+    yield _make
+    for p in pipelines:
+        p.cap.release()
+    gallery.unlink()
+
+
+def test_pipeline_writes_trajectories_and_global_ids(pipeline, tmp_path):
+    p = pipeline()
+    assert p.fps == 10.0 and p.roi is None and p.motion is None
+    for frame_idx, frame in p.frames():
+        tracks = [(1, 15, 20, 10, 10, 0)] if frame_idx < 5 else [(1, 15, 20, 10, 10, 0), (2, 45, 20, 10, 10, 1)]
+        assert p.process(frame_idx, frame, _result(tracks))
+    p.completed = True
+    p.close()
+
+    rows = read_trajectories(trajectory_path(str(tmp_path), 'cam.mp4', 'csv'))
+    assert len(rows['frame']) == 5 + 2 * 15
+    ids = {}
+    for gid, name in zip(rows['id'], rows['class_name']):
+        ids.setdefault(name, set()).add(int(gid))
+    # Une identité globale par objet, stable d'une frame à l'autre
+    assert len(ids['person']) == 1 and len(ids['car']) == 1 and ids['person'] != ids['car']
+    assert p.summary.frames == 19 and p.n_frames == 20
+    assert p.track_boxes() == [(10.0, 15.0, 20.0, 25.0), (40.0, 15.0, 50.0, 25.0)]
+
+
+@pytest.mark.parametrize('stride', [1, 3])
+def test_maintenance_runs_with_stride(pipeline, monkeypatch, stride):
+    monkeypatch.setattr(config, 'VID_STRIDE', stride)
+    monkeypatch.setattr(config, 'REID_TRACK_TIMEOUT', 10)
+    monkeypatch.setattr(config, 'GALLERY_EXPIRE_INTERVAL', 7)
+    p = pipeline()
+    calls = []
+    monkeypatch.setattr(p.reid_policy, 'forget_stale', lambda frame_idx: calls.append(('forget', frame_idx)))
+    monkeypatch.setattr(processor.tracking, 'expire_global_tracks',
+                        lambda gallery, frame_idx, *args: calls.append(('expire', frame_idx)))
+    frame = np.zeros((SIZE[1], SIZE[0], 3), dtype=np.uint8)
+    for n in range(1, 43):
+        # Index de frame jamais multiples des périodes (stride, porte de mouvement)
+        assert p.process(n * stride * 11 + 1, frame, _result([]))
+    p.close()
+    forgets = [c for c in calls if c[0] == 'forget']
+    expires = [c for c in calls if c[0] == 'expire']
+    assert len(forgets) == 42 // max(1, 10 // stride)
+    assert len(expires) == 42 // 7
+
+
+def test_skipped_frames_carry_rows_flagged_as_interpolated(pipeline, tmp_path):
+    p = pipeline()
+    for frame_idx, frame in p.frames():
+        if frame_idx < 6 or frame_idx % 2 == 0:
+            assert p.process(frame_idx, frame, _result([(1, 15, 20, 10, 10, 0)]))
+        else:
+            assert p.skip(frame_idx, frame)
+    p.completed = True
+    p.close()
+
+    rows = read_trajectories(trajectory_path(str(tmp_path), 'cam.mp4', 'csv'))
+    assert rows['frame'].tolist() == list(range(20))
+    assert rows['interpole'].tolist() == [f >= 6 and f % 2 == 1 for f in range(20)]
+    # Positions reportées comptées à part, pas comme apparitions
+    assert p.summary.class_counts['person'] == 13 and p.summary.interpolated_counts['person'] == 7
+    assert p.summary.skipped == 7
+
+
+def test_checkpoint_saves_the_gallery_and_resume_checks_its_generation(pipeline, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'CHECKPOINT_INTERVAL', 4)
+    p = pipeline()
+    for frame_idx, frame in p.frames():
+        if frame_idx == 10:
+            break
+        assert p.process(frame_idx, frame, _result([(1, 15, 20, 10, 10, 0)]))
+    p.close()
+    # Galerie sauvegardée dans la même étape que le point de reprise (frame 7)
+    ckpt = load_checkpoint(str(tmp_path), 'cam.mp4')
+    assert ckpt['frame'] == 7 and ckpt['gallery_snapshot'] == p.gallery.snapshot_generation == 2
+    assert os.path.exists(tmp_path / config.GALLERY_CHECKPOINT_FILE)
+
+    resumed = pipeline(resume=True)
+    assert resumed.start_frame == 8
+    resumed.close()
+
+    # Galerie rechargée plus ancienne que le point de reprise : pas de reprise
+    save_checkpoint(str(tmp_path), 'cam.mp4', dict(ckpt, gallery_snapshot=3))
+    restarted = pipeline(resume=True)
+    assert restarted.start_frame == 0
+    assert load_checkpoint(str(tmp_path), 'cam.mp4') is None
@@ -0,0 +1,53 @@
+"""Tests des chronomètres par étape et des profils écrits par vidéo."""
+
+import csv
+
+import pytest
+
+from profiling import StageTimer, load_profiles, print_profile_breakdown, profile_path
+
+
+def test_disabled_timer_measures_nothing(tmp_path):
+    timer = StageTimer(enabled=False)
+    with timer.stage('decode'):
+        pass
+    timer.add('encode', 1.0)
+    assert timer.stats() == {}
+    timer.save(str(tmp_path), 'cam.mp4', 10)
+    assert load_profiles(str(tmp_path), ['cam.mp4']) == []
+
+
+def test_percentiles_use_the_rolling_window():
+    timer = StageTimer(enabled=True, window=4)
+    for seconds in [1.0, 1.0, 0.001, 0.002, 0.003, 0.004]:
+        timer.add('detect', seconds)
+    with timer.stage('decode'):
+        pass
+    stats = timer.stats()
+    assert list(stats) == ['detect', 'decode']
+    detect = stats['detect']
+    assert detect['count'] == 6 and detect['max_ms'] == pytest.approx(1000.0)
+    assert detect['total_ms'] == pytest.approx(2010.0)
+    # Les deux premières mesures sont sorties de la fenêtre
+    assert detect['p99_ms'] < 5.0 and detect['p50_ms'] == pytest.approx(2.5)
+
+
+def test_profiles_round_trip_and_breakdown(tmp_path, capsys):
+    folder = str(tmp_path)
+    for video, seconds in [('a.mp4', 0.010), ('b.mp4', 0.030)]:
+        timer = StageTimer(enabled=True)
+        for _ in range(5):
+            timer.add('detect', seconds)
+            timer.add('reid', seconds / 2)
+        timer.save(folder, video, frames=5)
+
+    profiles = load_profiles(folder, ['a.mp4', 'b.mp4', 'absente.mp4'])
+    assert [p['video'] for p in profiles] == ['a.mp4', 'b.mp4']
+    assert profiles[1]['stages']['detect']['total_ms'] == pytest.approx(150.0)
+    with open(profile_path(folder, 'a.mp4', 'csv'), newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [row['stage'] for row in rows] == ['detect', 'reid'] and rows[0]['count'] == '5'
+
+    print_profile_breakdown(profiles)
+    out = capsys.readouterr().out
+    assert 'detect' in out and 'b.mp4' in out
@@ -0,0 +1,54 @@
+"""Tests de la politique de recalcul des embeddings ReID."""
+
+import numpy as np
+import pytest
+
+from reid_policy import ReIDPolicy
+
+BOX = (10, 10, 40, 80)
+
+
+@pytest.fixture
+def policy():
+    return ReIDPolicy(refresh_interval=10, area_change=0.3, conf_change=0.15, track_timeout=20)
+
+
+def _known(policy, local_id=1, frame_idx=0, box=BOX, conf=0.8):
+    """Track dont l'embedding a été calculé et l'ID global attribué."""
+    policy.update(local_id, frame_idx, box, conf, np.ones(4))
+    policy.local_to_global[local_id] = 100 + local_id
+
+
+def test_new_track_needs_embedding(policy):
+    assert policy.needs_embedding(1, 0, BOX, 0.8)
+    # Embedding calculé mais aucun ID global encore attribué
+    policy.update(1, 0, BOX, 0.8, np.ones(4))
+    assert policy.needs_embedding(1, 1, BOX, 0.8)
+
+
+def test_refresh_interval_and_changes(policy):
+    _known(policy)
+    assert not policy.needs_embedding(1, 9, BOX, 0.8)
+    assert policy.needs_embedding(1, 10, BOX, 0.8)
+    assert policy.needs_embedding(1, 1, (10, 10, 40, 120), 0.8)  # Aire +50 %
+    assert not policy.needs_embedding(1, 1, (10, 10, 40, 100), 0.8)  # Aire +25 %
+    assert policy.needs_embedding(1, 1, BOX, 0.6)
+    assert policy.stats() == {'computed': 1, 'skipped': 2, 'skip_rate': pytest.approx(2 / 3)}
+
+
+def test_update_returns_normalized_running_mean(policy):
+    first = policy.update(1, 0, BOX, 0.8, [3.0, 0.0])
+    np.testing.assert_allclose(first, [1.0, 0.0])
+    mean = policy.update(1, 5, BOX, 0.8, [0.0, 2.0])
+    np.testing.assert_allclose(mean, [np.sqrt(0.5), np.sqrt(0.5)], rtol=1e-6)
+    # Dimension différente (modèle ReID changé) : l'agrégat repart de zéro
+    np.testing.assert_allclose(policy.update(1, 6, BOX, 0.8, [0.0, 0.0, 5.0]), [0.0, 0.0, 1.0])
+
+
+def test_forget_stale_uses_last_seen(policy):
+    _known(policy, 1, frame_idx=0)
+    _known(policy, 2, frame_idx=0)
+    policy.needs_embedding(1, 15, BOX, 0.8)  # Track 1 encore visible à la frame 15
+    policy.forget_stale(30)
+    assert policy.local_to_global == {1: 101}
+    assert policy.needs_embedding(2, 30, BOX, 0.8)
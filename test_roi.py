@@ -0,0 +1,63 @@
+"""Tests des régions d'intérêt de la détection."""
+
+import config
+from roi import RegionPlanner, camera_regions, merge_regions, zone_regions
+
+SIZE = (1920, 1080)
+
+
+def test_merge_regions_joins_touching_rectangles():
+    rects = [(0, 0, 10, 10), (50, 50, 60, 60), (9, 9, 20, 20), (25, 0, 30, 5)]
+    assert sorted(merge_regions(rects)) == [(0, 0, 20, 20), (25, 0, 30, 5), (50, 50, 60, 60)]
+    # Chaîne de fusions : (0..20) touche (25..30) avec un écart de 5
+    assert sorted(merge_regions(rects, gap=5)) == [(0, 0, 30, 20), (50, 50, 60, 60)]
+
+
+def test_zone_regions_and_camera_config(monkeypatch):
+    zones = [[100, 100, 200, 150], [(300, 300), (400, 320), (350, 500)]]
+    assert zone_regions(zones, (1000, 500), margin=0.01) == [(90, 90, 210, 160), (290, 290, 410, 510)]
+
+    monkeypatch.setattr(config, 'ROI_REGIONS', {'a.mp4': [(0, 0, 10, 10)]})
+    monkeypatch.setattr(config, 'ALERT_ZONES', {'b.mp4': zones})
+    monkeypatch.setattr(config, 'ROI_FROM_ZONES', True)
+    monkeypatch.setattr(config, 'ROI_MARGIN', 0.0)
+    assert camera_regions('a.mp4', SIZE) == [(0, 0, 10, 10)]
+    assert camera_regions('b.mp4', SIZE) == [(100, 100, 200, 150), (300, 300, 400, 500)]
+    assert camera_regions('c.mp4', SIZE) == []
+    monkeypatch.setattr(config, 'ROI_FROM_ZONES', False)
+    assert camera_regions('b.mp4', SIZE) == []
+
+
+def test_planner_adds_tracks_and_falls_back_to_full_frame():
+    planner = RegionPlanner(SIZE, [(-50, -50, 400, 300)], imgsz=1280, track_margin=0.5, max_area=0.5)
+    assert planner.regions == [(0, 0, 400, 300)]  # Limitée à la frame
+    assert planner.plan() == [(0, 0, 400, 300)]
+    # Objet suivi hors de la région : sa boîte agrandie est ajoutée
+    rects = planner.plan([(1000, 500, 1100, 700)])
+    assert sorted(rects) == [(0, 0, 400, 300), (950, 400, 1150, 800)]
+    # Même densité de pixels qu'une frame entière (1280 / 1920), arrondie au pas du détecteur
+    assert planner.input_size(rects) == 288
+    assert planner.input_size(None) == 1280
+
+    # Régions couvrant plus de max_area : frame entière
+    assert planner.plan([(0, 0, 1800, 1000)]) is None
+
+
+def test_input_sizes_and_pixels_sent():
+    planner = RegionPlanner(SIZE, [(0, 0, 120, 90), (900, 500, 1500, 900)], imgsz=1280)
+    rects = planner.plan()
+    # Chaque région à sa propre taille, pas à celle de la plus grande
+    assert planner.input_sizes(rects) == [96, 416]
+    assert planner.input_sizes(None) == [1280]
+    planner.record(planner.input_sizes(rects))
+    planner.record(planner.input_sizes(None))
+    assert planner.pixels == 96 ** 2 + 416 ** 2 + 1280 ** 2
+    assert planner.pixel_rate() == planner.pixels / (2 * 1280 ** 2)
+
+
+def test_regions_outside_the_frame_fall_back_to_full_frame():
+    planner = RegionPlanner(SIZE, [(2000, 0, 2500, 100)])
+    assert planner.regions == []
+    assert planner.plan() is None
+    # Un objet suivi garde sa propre région
+    assert planner.plan([(100, 100, 200, 200)]) == [(50, 50, 250, 250)]
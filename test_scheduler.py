@@ -0,0 +1,117 @@
+"""Tests de l'ordonnancement des vidéos (fonctions de traitement légères, sans modèle)."""
+
+import functools
+import json
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from gallery import SharedGallery
+from scheduler import JobScheduler, STATUS_FILE, order_jobs
+
+DURATIONS = {'courte.mp4': 1, 'longue.mp4': 4, 'moyenne.mp4': 2}  # Secondes à 10 fps
+
+
+def _write_video(path, seconds):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 10, (32, 32))
+    for _ in range(10 * seconds):
+        writer.write(np.zeros((32, 32, 3), dtype=np.uint8))
+    writer.release()
+
+
+def _job(folder, fail, crash, clients, gallery, *args):
+    """
+    Traitement factice : note chaque vidéo traitée ; les vidéos de `fail`
+    lèvent une exception et celles de `crash` tuent le processus, à leur
+    première tentative seulement (marqueur dans `folder`).
+    """
+    def job(group, resume):
+        for name in group:
+            marker = os.path.join(folder, f'{name}.vu')
+            first = not os.path.exists(marker)
+            open(marker, 'a').close()
+            if first and name in crash:
+                os._exit(3)
+            if first and name in fail:
+                raise ValueError(f"échec de {name}")
+            with open(os.path.join(folder, 'traitees.txt'), 'a') as f:
+                f.write(f"{name} {int(resume)}\n")
+    return job
+
+
+@pytest.fixture
+def videos(tmp_path):
+    folder = tmp_path / 'videos'
+    folder.mkdir()
+    for name, seconds in DURATIONS.items():
+        _write_video(str(folder / name), seconds)
+    return str(folder)
+
+
+@pytest.fixture
+def gallery():
+    g = SharedGallery.create(4, 8)
+    yield g
+    g.unlink()
+
+
+def _scheduler(videos, gallery, tmp_path, fail=(), crash=(), **kwargs):
+    return JobScheduler(sorted(DURATIONS), gallery, None, headless=True, folder=videos,
+                        status_path=str(tmp_path / STATUS_FILE),
+                        make_job=functools.partial(_job, str(tmp_path), fail, crash), **kwargs)
+
+
+def _processed(tmp_path):
+    with open(tmp_path / 'traitees.txt') as f:
+        return [line.split() for line in f]
+
+
+def test_jobs_are_ordered_longest_first(videos, tmp_path):
+    # Sans métadonnées lisibles : taille du fichier en Mo
+    with open(os.path.join(videos, 'illisible.mp4'), 'wb') as f:
+        f.write(b'\0' * 3_000_000)
+    jobs = order_jobs(videos, sorted(DURATIONS) + ['illisible.mp4'])
+    assert [name for name, _ in jobs] == ['longue.mp4', 'illisible.mp4', 'moyenne.mp4', 'courte.mp4']
+    assert [round(d, 1) for _, d in jobs] == [4.0, 3.0, 2.0, 1.0]
+
+
+def test_failed_job_is_retried(videos, gallery, tmp_path):
+    status = _scheduler(videos, gallery, tmp_path, fail={'moyenne.mp4'}, n_workers=1).run()
+    # Un seul processus : ordre de la file, la vidéo en échec repasse en fin de file
+    assert _processed(tmp_path) == [['longue.mp4', '0'], ['courte.mp4', '0'], ['moyenne.mp4', '1']]
+    assert status['moyenne.mp4']['etat'] == 'terminé'
+    assert status['moyenne.mp4']['tentatives'] == 2 and status['moyenne.mp4']['erreur'] is None
+
+
+def test_job_fails_after_max_retries(videos, gallery, tmp_path):
+    status = _scheduler(videos, gallery, tmp_path, fail={'courte.mp4'}, n_workers=1, max_retries=0).run()
+    assert status['courte.mp4']['etat'] == 'échec'
+    assert 'échec de courte.mp4' in status['courte.mp4']['erreur']
+    assert status['longue.mp4']['etat'] == 'terminé'
+
+
+def test_dead_worker_is_replaced_and_its_job_resumed(videos, gallery, tmp_path):
+    status = _scheduler(videos, gallery, tmp_path, crash={'longue.mp4'}, n_workers=2).run()
+    assert all(s['etat'] == 'terminé' for s in status.values())
+    assert status['longue.mp4']['tentatives'] == 2
+    # La nouvelle tentative repart du point de reprise
+    assert ['longue.mp4', '1'] in _processed(tmp_path)
+
+
+def test_status_file_records_each_video(videos, gallery, tmp_path):
+    _scheduler(videos, gallery, tmp_path, n_workers=2).run()
+    with open(tmp_path / STATUS_FILE, encoding='utf-8') as f:
+        saved = json.load(f)
+    assert sorted(saved) == sorted(DURATIONS)
+    for name, seconds in DURATIONS.items():
+        entry = saved[name]
+        assert entry['etat'] == 'terminé' and entry['tentatives'] == 1 and entry['erreur'] is None
+        assert entry['duree_video_s'] == seconds and entry['worker'] in (0, 1)
+        assert entry['temps_s'] >= 0
+
+    # Reprise : les vidéos terminées ne sont pas relancées
+    os.remove(tmp_path / 'traitees.txt')
+    resumed = _scheduler(videos, gallery, tmp_path, resume=True)
+    assert resumed.jobs == [] and resumed.run() == saved
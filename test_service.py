@@ -0,0 +1,113 @@
+"""Tests des services par lots (service.py) et du découpage des lots ReID."""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import config
+from gallery import SharedGallery
+from matcher import MatcherService
+from service import BatchedService, ServiceClient
+from reid_service import embed_batch
+
+DIM = 8
+
+
+def _make_doubler(fail_on=None):
+    """Traitement d'un lot : double chaque élément (erreur si `fail_on` apparaît)."""
+    def handle(requests):
+        if any(fail_on in items for items in requests):
+            raise ValueError("élément refusé")
+        return [[2 * x for x in items] for items in requests]
+    return handle, len
+
+
+class _DoublerService(BatchedService):
+    name = 'doubler'
+
+    def __init__(self, n_clients, max_batch=8, max_wait_ms=20, fail_on=None):
+        super().__init__(n_clients, max_batch, max_wait_ms)
+        self.fail_on = fail_on
+
+    def handler(self):
+        return _make_doubler, (self.fail_on,)
+
+
+@pytest.fixture
+def service():
+    s = _DoublerService(2, fail_on=-1)
+    s.start()
+    yield s
+    s.stop()
+
+
+def test_requests_are_answered_in_order(service):
+    client = service.client(0)
+    assert isinstance(client, ServiceClient)
+    assert client.request([1, 2, 3]) == [2, 4, 6]
+    assert client.request([]) == []
+    stats = service.stats()
+    assert stats['requests'] == 2 and stats['items'] == 3
+    assert stats['queue_depth'] == 0
+
+
+def test_handler_errors_reach_the_client(service):
+    client = service.client(1)
+    with pytest.raises(RuntimeError, match="refusé"):
+        client.request([-1])
+    # Le service continue après une erreur
+    assert client.request([5]) == [10]
+
+
+def test_stale_responses_are_ignored(service):
+    client = service.client(0)
+    # Réponse laissée par un processus précédent sur le même emplacement
+    service.responses[0].put(((0, 1), ['périmée']))
+    assert client.request([4]) == [8]
+
+
+class _FakeFeature:
+    def __init__(self, value):
+        self.value = value
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return np.array([self.value], dtype=np.float32)
+
+
+def test_embed_batch_splits_one_model_call_per_request():
+    calls = []
+
+    def predictor(crops):
+        calls.append(len(crops))
+        return [_FakeFeature(c) for c in crops]
+
+    reid = SimpleNamespace(model=SimpleNamespace(predictor=predictor))
+    results = embed_batch(reid, [[1, 2], [], [3]])
+    assert calls == [3]
+    assert [[float(f[0]) for f in r] for r in results] == [[1.0, 2.0], [], [3.0]]
+
+
+def test_matcher_stats_include_the_camera_topology(monkeypatch):
+    monkeypatch.setattr(config, 'CAMERA_GRAPH', {('a.mp4', 'b.mp4'): (2.0, 60.0)})
+    monkeypatch.setattr(config, 'MATCH_INDEX', 'exact')
+    gallery = SharedGallery.create(16, DIM)
+    matcher = MatcherService(gallery, 1, max_wait_ms=0)
+    matcher.start()
+    try:
+        client = matcher.client(0)
+        emb = np.eye(DIM, dtype=np.float32)
+        client.assign([emb[0], emb[1]], [(0, 0), (5, 5)], 'a.mp4', 0, 0.0)
+        # 'b.mp4' à 100 s : les identités de 'a.mp4' (0 s) sont hors de la fenêtre de trajet
+        client.assign([emb[2]], [(0, 0)], 'b.mp4', 0, 100.0)
+        # À 30 s : les deux identités de 'a.mp4' sont candidates, pas celle de 'b.mp4' (vue à 100 s)
+        client.assign([emb[3]], [(0, 0)], 'b.mp4', 0, 30.0)
+        stats = matcher.stats()
+    finally:
+        matcher.stop()
+        gallery.unlink()
+    assert stats['items'] == 4
+    assert stats['topology'] == {'queries': 4, 'candidates_per_query': 0.5, 'candidate_rate': 0.4}
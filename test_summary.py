@@ -0,0 +1,76 @@
+"""Tests du résumé : états sauvegardés, reprise et nettoyage au démarrage."""
+
+import os
+
+from summary import (SummaryAccumulator, generate_object_summary, load_states, merge_summaries, reset_states,
+                     state_path)
+from trajectory import open_trajectory_sink, read_trajectories, trajectory_path
+
+
+def _write_video(folder, video_name, gids):
+    acc = SummaryAccumulator(video_name)
+    sink = open_trajectory_sink(folder, video_name, 'csv')
+    for frame_idx, gid in enumerate(gids):
+        acc.add('person', gid, alert=gid % 2)
+        sink.add(frame_idx, gid, 'person', 1.0, 2.0, gid % 2)
+    sink.close()
+    acc.frames = len(gids)
+    acc.save(folder)
+    return acc
+
+
+def test_state_round_trip():
+    acc = SummaryAccumulator('cam.mp4')
+    acc.add('person', 3, True)
+    acc.add('car', 4, False)
+    acc.add('car', 4, False, interpolated=True)
+    acc.skipped = 5
+    back = SummaryAccumulator.from_state(acc.to_state())
+    assert back.to_state() == acc.to_state()
+
+
+def test_interpolated_rows_are_counted_apart(tmp_path):
+    folder = str(tmp_path)
+    acc = SummaryAccumulator('cam.mp4')
+    sink = open_trajectory_sink(folder, 'cam.mp4', 'csv')
+    for frame_idx, interpolated in enumerate([False, True, True, False]):
+        acc.add('person', 1, True, interpolated=interpolated)
+        sink.add(frame_idx, 1, 'person', 1.0, 2.0, True, interpolated=interpolated)
+    sink.close()
+    assert acc.class_counts['person'] == 2 and acc.alert_counts['person'] == 2
+    assert acc.interpolated_counts['person'] == 2
+    # Relecture des trajectoires : mêmes compteurs
+    replay = SummaryAccumulator('cam.mp4')
+    replay.add_columns(read_trajectories(trajectory_path(folder, 'cam.mp4', 'csv')))
+    assert replay.to_state() == {**acc.to_state(), 'frames': 3}
+    stats = merge_summaries([acc])
+    assert stats['global'] == {'person': 2} and stats['interpolated'] == {'person': 2}
+
+
+def test_state_preferred_over_trajectories(tmp_path):
+    folder = str(tmp_path)
+    _write_video(folder, 'a.mp4', [1, 2, 3])
+    # Trajectoires sans état (ancien traitement) : relues
+    os.remove(state_path(folder, 'a.mp4'))
+    states = load_states(folder)
+    assert states['a.mp4'].class_counts['person'] == 3
+    assert states['a.mp4'].unique_ids['person'] == {1, 2, 3}
+
+
+def test_reset_removes_previous_run_for_new_videos(tmp_path):
+    folder = str(tmp_path)
+    _write_video(folder, 'a.mp4', [1, 2])
+    _write_video(folder, 'b.mp4', [7])
+    reset_states(folder, ['a.mp4'])
+    assert 'a.mp4' not in load_states(folder)
+    assert not os.path.exists(state_path(folder, 'a.mp4'))
+    assert not any(name.startswith('donnees_a.mp4') for name in os.listdir(folder))
+
+
+def test_summary_limited_to_run_videos(tmp_path):
+    folder = str(tmp_path)
+    _write_video(folder, 'a.mp4', [1, 2])
+    _write_video(folder, 'ancienne.mp4', [9, 9, 9])
+    stats = generate_object_summary(folder, verbose=False, video_names=['a.mp4', 'b.mp4'])
+    assert set(stats['by_video']) == {'a.mp4'}
+    assert stats['global']['person'] == 2
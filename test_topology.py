@@ -0,0 +1,106 @@
+"""Tests de la topologie des caméras et de la base de temps commune."""
+
+import numpy as np
+import pytest
+
+import config
+import tracking
+from gallery import SharedGallery
+from topology import CameraGraph, camera_time
+
+DIM = 8
+
+
+def _embedding(seed):
+    return np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+
+
+@pytest.fixture
+def gallery():
+    g = SharedGallery.create(64, DIM)
+    yield g
+    g.unlink()
+
+
+def test_windows_are_bidirectional_and_same_camera():
+    graph = CameraGraph({('a', 'b'): (2, 60)}, same_camera_seconds=5)
+    assert graph.allows('a', 'b', 10) and graph.allows('b', 'a', 10)
+    assert not graph.allows('a', 'b', 1) and not graph.allows('a', 'b', 61)
+    assert graph.allows('a', 'a', 4) and not graph.allows('a', 'a', 6)
+    assert graph.window('a', 'c') is None and not graph.gates('c')
+    assert not CameraGraph({('a', 'b'): (2, 60)}, bidirectional=False).allows('b', 'a', 10)
+
+
+def test_select_masks_rows_outside_windows():
+    graph = CameraGraph({('a', 'b'): (2, 60)}, same_camera_seconds=5)
+    select = graph.select('b', 100.0, ['a', 'b', 'c'])
+    last_camera = np.array([0, 0, 1, 1, 2, 3])  # 3 : caméra ajoutée depuis la lecture des noms
+    last_time = np.array([90.0, 30.0, 97.0, 80.0, 99.0, 99.0])
+    assert select(last_camera, last_time).tolist() == [True, False, True, False, False, False]
+
+
+def test_search_only_compares_identities_inside_the_window(gallery):
+    graph = CameraGraph({('a.mp4', 'b.mp4'): (2.0, 60.0)}, same_camera_seconds=5.0)
+    person = _embedding(7)
+    gid = gallery.append(person, (0, 0), 'a.mp4', timestamp=100.0, frame_idx=100)
+
+    # 30 s après le départ de A : dans la fenêtre de transition
+    ids, sims = tracking.search_gallery(gallery, [person], camera='b.mp4', timestamp=130.0, graph=graph)
+    assert ids == [gid] and sims[0] == pytest.approx(1.0, abs=1e-5)
+    # Trop tard : l'identité n'est plus candidate
+    ids, _ = tracking.search_gallery(gallery, [person], camera='b.mp4', timestamp=200.0, graph=graph)
+    assert ids == [None]
+
+
+def test_camera_time_uses_start_offsets(monkeypatch):
+    monkeypatch.setattr(config, 'CAMERA_START_TIMES', {'b.mp4': 3600.0})
+    assert camera_time('a.mp4', 250, 25.0) == pytest.approx(10.0)
+    assert camera_time('b.mp4', 250, 25.0) == pytest.approx(3610.0)
+    assert camera_time('b.mp4', 250, 0.0) == pytest.approx(3600.0)
+
+
+def test_staggered_jobs_expire_on_their_own_clock(gallery, monkeypatch):
+    """Caméra A traitée loin dans sa vidéo pendant que B, démarrée plus tard, en est au début."""
+    monkeypatch.setattr(config, 'GALLERY_TTL_SECONDS', 600)
+    monkeypatch.setattr(config, 'GALLERY_TTL_FRAMES', None)
+    old_a = gallery.append(_embedding(1), (0, 0), 'a.mp4', timestamp=100.0, frame_idx=100)
+    recent_a = gallery.append(_embedding(2), (0, 0), 'a.mp4', timestamp=42950.0, frame_idx=42950)
+    # Job B démarré après le début du job A : son horloge en est à 100 s
+    b_id = gallery.append(_embedding(3), (0, 0), 'b.mp4', timestamp=100.0, frame_idx=100)
+
+    # Maintenance de A à 43000 s : seul son vieux track expire
+    assert tracking.expire_global_tracks(gallery, 43000, 43000.0, 'a.mp4') == 1
+    ids = set(gallery.read(lambda ids, matrix, scales: ids.tolist()))
+    assert ids == {recent_a, b_id}
+    assert old_a not in ids
+
+    # Maintenance de B à 200 s : rien ne dépasse le TTL sur son horloge
+    assert tracking.expire_global_tracks(gallery, 200, 200.0, 'b.mp4') == 0
+    # Plus tard dans B, son propre track expire
+    assert tracking.expire_global_tracks(gallery, 800, 800.0, 'b.mp4') == 1
+    assert set(gallery.read(lambda ids, matrix, scales: ids.tolist())) == {recent_a}
+    # Caméra jamais vue : aucun track ne suit son horloge
+    assert tracking.expire_global_tracks(gallery, 10 ** 6, 10 ** 6, 'c.mp4') == 0
+
+
+def test_staggered_jobs_match_on_common_time_base(gallery, monkeypatch):
+    """A (traitée en premier) puis B, enregistrée une heure plus tard, reliées par une transition de 2 à 60 s."""
+    monkeypatch.setattr(config, 'CAMERA_START_TIMES', {'b.mp4': 3600.0})
+    graph = CameraGraph({('a.mp4', 'b.mp4'): (2.0, 60.0)}, same_camera_seconds=5.0)
+    person = _embedding(7)
+    # Job A : la personne quitte A à la fin de sa vidéo (3590 s)
+    gid = gallery.append(person, (0, 0), 'a.mp4', timestamp=camera_time('a.mp4', 3590, 1.0), frame_idx=3590)
+    # Autre identité vue par A bien après l'arrivée sur B : apparition « future » pour B
+    future = gallery.append(_embedding(8), (0, 0), 'a.mp4', timestamp=camera_time('a.mp4', 7000, 1.0), frame_idx=7000)
+
+    # Job B, lancé ensuite : frame 20 = 3620 s sur la base commune (30 s de trajet)
+    ids, sims = tracking.search_gallery(gallery, [person, _embedding(8)], camera='b.mp4',
+                                        timestamp=camera_time('b.mp4', 20, 1.0), graph=graph)
+    assert ids[0] == gid and sims[0] == pytest.approx(1.0, abs=1e-5)
+    assert ids[1] != future  # Délai négatif : jamais candidate
+
+    # Sans décalage, B serait à 20 s, avant le départ de A : aucun candidat
+    monkeypatch.setattr(config, 'CAMERA_START_TIMES', {})
+    ids, _ = tracking.search_gallery(gallery, [person], camera='b.mp4',
+                                     timestamp=camera_time('b.mp4', 20, 1.0), graph=graph)
+    assert ids == [None]
@@ -0,0 +1,76 @@
+"""Tests du matching des IDs globaux (tracking.py)."""
+
+import numpy as np
+import pytest
+
+import config
+import tracking
+from gallery import SharedGallery
+
+DIM = 16
+
+
+def _embeddings(n, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, DIM)).astype(np.float32)
+
+
+@pytest.fixture
+def gallery():
+    g = SharedGallery.create(256, DIM)
+    yield g
+    g.unlink()
+
+
+def test_batched_matches_equal_one_by_one_search(gallery):
+    emb = _embeddings(50)
+    for i in range(50):
+        gallery.append(emb[i], (0, 0), 'cam.mp4', 0.0, i)
+    queries = _embeddings(9, seed=1)
+    queries[3] = 0.0  # Embedding nul : reste comparable sans division par zéro
+
+    ids, sims = tracking.search_gallery(gallery, list(queries))
+    for query, gid, sim in zip(queries, ids, sims):
+        assert tracking.find_best_match(query, gallery) == (gid, pytest.approx(sim, abs=1e-6))
+    assert tracking.search_gallery(gallery, []) == ([], [])
+
+    normed = tracking.normalize_embeddings(emb)
+    expected = np.argmax(tracking.normalize_embeddings(queries) @ normed.T, axis=1) + 1
+    assert ids == expected.tolist()
+
+
+def test_empty_gallery_has_no_match(gallery):
+    assert tracking.find_best_match(_embeddings(1)[0], gallery) == (None, -1.0)
+
+
+def test_assign_reuses_known_ids_and_creates_new_ones(gallery, monkeypatch):
+    monkeypatch.setattr(config, 'SIMILARITY_THRESHOLD', 0.9)
+    monkeypatch.setattr(config, 'CLASS_SIMILARITY_THRESHOLDS', {})
+    emb = _embeddings(4)
+    first = tracking.assign_global_ids(gallery, list(emb[:3]), [(0, 0)] * 3, 'a.mp4', 0, 0.0)
+    assert first == [1, 2, 3]
+    # Mêmes objets (légèrement bruités) plus un nouveau, vus par une autre caméra
+    noisy = emb[:3] + 0.01 * _embeddings(3, seed=5)
+    second = tracking.assign_global_ids(gallery, list(noisy) + [emb[3]], [(5, 5)] * 4, 'b.mp4', 10, 1.0)
+    assert second == [1, 2, 3, 4]
+    assert gallery.get(2)['last_video'] == 'b.mp4' and gallery.get(2)['last_frame'] == 10
+    assert tracking.assign_global_ids(gallery, [], [], 'b.mp4') == []
+
+
+def test_batch_gives_one_id_to_a_new_object_seen_by_two_cameras(gallery, monkeypatch):
+    monkeypatch.setattr(config, 'SIMILARITY_THRESHOLD', 0.9)
+    monkeypatch.setattr(config, 'CLASS_SIMILARITY_THRESHOLDS', {})
+    monkeypatch.setattr(config, 'GALLERY_CLASS_PARTITION', True)
+    emb = _embeddings(3)
+    known = gallery.append(emb[0], (0, 0), 'a.mp4', 0.0, 0, 'person')
+    requests = [
+        ([emb[0], emb[1]], [(0, 0), (1, 1)], 'a.mp4', 5, 0.2, ['person', 'person']),
+        ([emb[1], emb[1]], [(2, 2), (3, 3)], 'b.mp4', 7, 0.3, ['person', 'backpack']),
+    ]
+    a_ids, b_ids = tracking.assign_global_ids_batch(gallery, requests)
+    assert a_ids[0] == known
+    # Même nouvel objet vu par B dans le même lot : même ID ; autre classe : nouvel ID
+    assert b_ids[0] == a_ids[1] != known
+    assert b_ids[1] not in (known, a_ids[1])
+    assert len(gallery) == 3
+    # Lot sans détection
+    assert tracking.assign_global_ids_batch(gallery, [([], [], 'a.mp4', 6, 0.2, None)]) == [[]]
@@ -0,0 +1,103 @@
+"""Tests des fichiers de trajectoires : formats, reprise et arrêt pendant une écriture."""
+
+import os
+
+import numpy as np
+import pytest
+
+from trajectory import is_resumable, list_trajectory_files, open_trajectory_sink, read_trajectories, trajectory_path
+
+FORMATS = ['csv', 'npz']
+
+
+def _rows(start, stop):
+    return [(f, f % 5, 'person' if f % 2 else 'car', f + 0.5, 2.0 * f, f % 3 == 0, f % 4 == 1)
+            for f in range(start, stop)]
+
+
+def _write(sink, rows):
+    for row in rows:
+        sink.add(*row)
+
+
+def _assert_rows(path, rows):
+    cols = read_trajectories(path)
+    assert cols['frame'].tolist() == [r[0] for r in rows]
+    assert cols['id'].tolist() == [r[1] for r in rows]
+    assert cols['class_name'].tolist() == [r[2] for r in rows]
+    np.testing.assert_allclose(cols['x_center'], [r[3] for r in rows])
+    assert cols['alerte'].tolist() == [r[5] for r in rows]
+    assert cols['interpole'].tolist() == [r[6] for r in rows]
+
+
+@pytest.mark.parametrize('fmt', FORMATS + ['parquet'])
+def test_round_trip(tmp_path, fmt):
+    if fmt == 'parquet':
+        pytest.importorskip('pyarrow')
+    rows = _rows(0, 25)
+    with open_trajectory_sink(str(tmp_path), 'cam.mp4', fmt, chunk_size=7) as sink:
+        _write(sink, rows)
+    path = trajectory_path(str(tmp_path), 'cam.mp4', fmt)
+    _assert_rows(path, rows)
+    assert list_trajectory_files(str(tmp_path)) == [('cam.mp4', path)]
+
+
+def test_csv_without_interpolated_column_reads_as_detected(tmp_path):
+    path = tmp_path / 'donnees_cam.mp4.csv'
+    path.write_text('camera,frame,id,class_name,x_center,y_center,alerte\ncam.mp4,3,1,person,1.5,2.0,1\n')
+    cols = read_trajectories(str(path))
+    assert cols['frame'].tolist() == [3] and cols['alerte'].tolist() == [True]
+    assert cols['interpole'].tolist() == [False]
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_resume_drops_rows_after_checkpoint(tmp_path, fmt):
+    folder = str(tmp_path)
+    sink = open_trajectory_sink(folder, 'cam.mp4', fmt, chunk_size=4)
+    _write(sink, _rows(0, 10))
+    position = sink.checkpoint()
+    # Lignes écrites après le point de reprise, puis arrêt brutal (pas de close)
+    _write(sink, _rows(10, 19))
+    sink.flush()
+    if fmt == 'csv':
+        sink._file.close()
+    del sink
+
+    assert is_resumable(fmt)
+    with open_trajectory_sink(folder, 'cam.mp4', fmt, chunk_size=4, resume=position) as sink:
+        assert sink.rows_written == 10
+        _write(sink, _rows(10, 15))
+    _assert_rows(trajectory_path(folder, 'cam.mp4', fmt), _rows(0, 15))
+
+
+def test_npz_crash_during_chunk_write_keeps_previous_chunks(tmp_path):
+    folder = str(tmp_path)
+    sink = open_trajectory_sink(folder, 'cam.mp4', 'npz', chunk_size=4)
+    _write(sink, _rows(0, 8))
+    position = sink.checkpoint()
+    path = trajectory_path(folder, 'cam.mp4', 'npz')
+    # Arrêt pendant l'écriture du bloc suivant : fichier temporaire incomplet
+    with open(f"{path}.{position['chunks']:06d}.part.tmp", 'wb') as f:
+        f.write(b'PK\x03\x04tronque')
+    del sink
+
+    with open_trajectory_sink(folder, 'cam.mp4', 'npz', chunk_size=4, resume=position) as sink:
+        _write(sink, _rows(8, 11))
+    _assert_rows(path, _rows(0, 11))
+    # Le fichier temporaire a été réécrit par le bloc repris, les blocs réunis supprimés
+    assert os.listdir(folder) == [os.path.basename(path)]
+
+
+def test_npz_new_run_ignores_previous_parts(tmp_path):
+    folder = str(tmp_path)
+    sink = open_trajectory_sink(folder, 'cam.mp4', 'npz', chunk_size=2)
+    _write(sink, _rows(0, 6))
+    del sink  # Exécution précédente interrompue
+    with open_trajectory_sink(folder, 'cam.mp4', 'npz', chunk_size=2) as sink:
+        _write(sink, _rows(100, 103))
+    _assert_rows(trajectory_path(folder, 'cam.mp4', 'npz'), _rows(100, 103))
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        trajectory_path(str(tmp_path), 'cam.mp4', 'xlsx')
@@ -0,0 +1,45 @@
+"""Tests de l'écriture asynchrone des vidéos annotées."""
+
+import cv2
+import numpy as np
+import pytest
+
+from video_writer import AsyncVideoWriter, Annotation
+
+
+def _read(path):
+    cap = cv2.VideoCapture(path)
+    try:
+        return cap.get(cv2.CAP_PROP_FPS), int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        cap.release()
+
+
+@pytest.mark.parametrize('stride, divisor', [(1, 1), (3, 1), (2, 2), (3, 2)])
+def test_duration_is_kept_with_stride_and_divisor(tmp_path, stride, divisor):
+    path = str(tmp_path / 'out.mp4')
+    writer = AsyncVideoWriter(path, 30.0, (64, 48), [], fps_divisor=divisor, stride=stride)
+    frame = np.zeros((48, 64, 3), np.uint8)
+    # 60 frames source (2 s) traitées avec VID_STRIDE = stride
+    processed = range(0, 60, stride)
+    for frame_idx in processed:
+        writer.submit(frame_idx, frame.copy(), [Annotation(1, 1, 10, 10, 5, 5, 1, 0, 0)])
+    writer.close()
+    fps, count = _read(path)
+    # Une frame traitée sur `divisor`, quel que soit son index
+    assert writer.written == count == -(-len(processed) // divisor)
+    assert fps == pytest.approx(30.0 / (stride * divisor), rel=0.01)
+    assert count / fps == pytest.approx(2.0, abs=2 / fps)
+
+
+def test_disabled_writer_writes_nothing(tmp_path):
+    writer = AsyncVideoWriter(str(tmp_path / 'out.mp4'), 30.0, (64, 48), [], enabled=False)
+    writer.submit(0, np.zeros((48, 64, 3), np.uint8))
+    writer.close()
+    assert writer.written == 0
+    assert not (tmp_path / 'out.mp4').exists()
+
+
+def test_unknown_policy_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        AsyncVideoWriter(str(tmp_path / 'out.mp4'), 30.0, (64, 48), [], policy='wait', enabled=False)
@@ -0,0 +1,66 @@
+"""Tests du visualiseur : clé d'authentification et publication à la demande."""
+
+import os
+import stat
+import time
+import multiprocessing
+
+import numpy as np
+import pytest
+
+import viewer
+
+
+def test_new_authkey_is_random_and_private(tmp_path):
+    first = viewer.new_authkey(str(tmp_path))
+    second = viewer.new_authkey(str(tmp_path))
+    assert len(first) == 32 and first != second
+    assert viewer.read_authkey(str(tmp_path)) == second
+    mode = stat.S_IMODE(os.stat(viewer.key_path(str(tmp_path))).st_mode)
+    assert mode == 0o600
+
+
+class _FakeState:
+    def __init__(self, attached):
+        self.attached = attached
+        self.published = []
+
+    def is_attached(self):
+        return self.attached
+
+    def publish(self, video_name, frame_idx, jpeg):
+        self.published.append(frame_idx)
+
+
+def test_publisher_prepares_nothing_without_viewer():
+    publisher = viewer.ViewerPublisher('cam.mp4', address=('127.0.0.1', 0), interval=1)
+    publisher._state = _FakeState(attached=False)
+    assert not publisher.wants(0)
+    publisher.publish(0, np.zeros((48, 64, 3), np.uint8))
+    assert publisher._state.published == []
+
+
+def test_publisher_publishes_once_attached(monkeypatch):
+    monkeypatch.setattr(viewer, 'ATTACH_CHECK_SECONDS', 0.0)
+    publisher = viewer.ViewerPublisher('cam.mp4', address=('127.0.0.1', 0), interval=2, width=32)
+    publisher._state = _FakeState(attached=True)
+    assert publisher.wants(0) and not publisher.wants(1)
+    publisher.publish(0, np.zeros((48, 64, 3), np.uint8))
+    assert publisher._state.published == [0]
+
+
+def test_publisher_disabled_without_address():
+    assert not viewer.ViewerPublisher('cam.mp4').wants(0)
+
+
+def test_client_with_wrong_key_is_rejected(tmp_path):
+    target = multiprocessing.Value('i', -1)
+    authkey = viewer.new_authkey(str(tmp_path))
+    server = viewer.serve(target, address=('127.0.0.1', 0), authkey=authkey)
+    address = server.address
+    time.sleep(0.05)
+    with pytest.raises(multiprocessing.AuthenticationError):
+        viewer.connect(address, authkey=b'object_detection')
+    state = viewer.connect(address, authkey=authkey)
+    state.set_target(7)
+    assert target.value == 7
@@ -0,0 +1,89 @@
+"""Tests des événements de zone (entrée, stationnement, sortie) et de leur écriture."""
+
+import csv
+
+import pytest
+
+from zone_events import EventLogger, ZoneEvent, ZoneEventEngine, events_path
+
+FPS = 10.0
+
+
+def _run(engine, presence, start=0):
+    """Présence de l'objet 7 dans la zone 0 frame par frame ; renvoie (frame, type) des événements."""
+    events = []
+    for frame_idx, present in enumerate(presence, start):
+        hits = [(7, 0, 'person')] if present else []
+        events += engine.update(frame_idx, frame_idx / FPS, hits)
+    return [(e.frame, e.kind) for e in events]
+
+
+@pytest.fixture
+def engine():
+    return ZoneEventEngine(enter_frames=3, exit_frames=5, min_duration=0.5, dwell_seconds=2.0)
+
+
+def test_short_visit_produces_no_event(engine):
+    assert _run(engine, [True] * 4 + [False] * 10) == []
+    assert not engine.visits
+
+
+def test_entry_dwell_and_exit_with_hysteresis(engine):
+    # Visite de 3 s avec des détections manquées (moins de exit_frames d'affilée)
+    presence = [True] * 10 + [False] * 4 + [True] * 17 + [False] * 6
+    assert _run(engine, presence) == [(0, 'entree'), (20, 'stationnement'), (30, 'sortie')]
+    assert engine.counts == {'entree': 1, 'sortie': 1, 'stationnement': 1}
+
+
+def test_close_ends_open_visits(engine):
+    assert _run(engine, [True] * 8) == [(0, 'entree')]
+    [event] = engine.close()
+    assert event == ZoneEvent(7, 0.7, 7, 'person', 0, 'sortie', pytest.approx(0.7))
+
+
+def test_state_round_trip_continues_the_visit(engine):
+    _run(engine, [True] * 8)
+    resumed = ZoneEventEngine(enter_frames=3, exit_frames=5, min_duration=0.5, dwell_seconds=2.0)
+    resumed.load_state(engine.to_state())
+    # Pas de seconde entrée après la reprise ; stationnement mesuré depuis le début de la visite
+    assert _run(resumed, [True] * 15, start=8) == [(20, 'stationnement')]
+    assert resumed.counts['entree'] == 1
+
+
+def test_alerts_are_rate_limited_per_zone():
+    engine = ZoneEventEngine(enter_frames=1, exit_frames=2, min_duration=0.0, dwell_seconds=0, min_interval=1.0)
+    events = []
+    for frame_idx in range(30):
+        # Objets 1 à 4 entrent dans la zone 0 à 0.2 s d'écart, l'objet 9 dans la zone 1
+        hits = [(gid, 0, 'person') for gid in range(1, 5) if frame_idx >= 2 * (gid - 1)] + [(9, 1, 'car')]
+        events += engine.update(frame_idx, frame_idx / FPS, hits)
+    events += engine.close()
+    assert [(e.gid, e.zone, e.kind) for e in events] == [
+        (1, 0, 'entree'), (9, 1, 'entree'), (1, 0, 'sortie'), (9, 1, 'sortie')]
+    assert engine.limited == 3
+
+    # Au-delà de l'intervalle, une nouvelle alerte passe ; la limite survit à la reprise
+    resumed = ZoneEventEngine(enter_frames=1, exit_frames=2, min_duration=0.0, dwell_seconds=0, min_interval=1.0)
+    resumed.load_state(engine.to_state())
+    assert resumed.limited == 3
+    assert [e.kind for e in resumed.update(30, 0.5, [(5, 0, 'person')])] == []
+    assert [e.kind for e in resumed.update(31, 1.0, [(6, 0, 'person')])] == ['entree']
+
+
+def test_logger_writes_and_resumes(tmp_path):
+    path = events_path(str(tmp_path), 'cam.mp4')
+    events = [ZoneEvent(f, f / FPS, 7, 'person', 0, 'entree', 0.0) for f in range(5)]
+    logger = EventLogger(path, 'cam.mp4', console=False)
+    logger.log(events)
+    logger.flush()
+    assert logger.written == 5
+    logger.close()
+
+    # Reprise : seuls les 3 premiers événements étaient couverts par le point de reprise
+    logger = EventLogger(path, 'cam.mp4', console=False, resume_rows=3)
+    logger.log(events[3:4])
+    logger.close()
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [row['frame'] for row in rows] == ['0', '1', '2', '3']
+    assert rows[0]['evenement'] == 'entree' and rows[0]['classe'] == 'person'
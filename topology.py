@@ -0,0 +1,159 @@
+"""
+Module de la topologie des caméras (filtrage spatio-temporel du ReID).
+
+Sans topologie, chaque détection est comparée à toutes les identités de la
+galerie, quelles que soient la caméra et l'heure où elles ont été vues :
+c'est lent et source de fusions erronées (deux personnes semblables vues à
+deux bouts du site). config.CAMERA_GRAPH déclare les transitions possibles
+entre caméras avec un temps de trajet minimal et maximal, par exemple :
+
+    CAMERA_GRAPH = {('CAMERA_HALL_PORTE_GAUCHE.mp4', 'CAMERA_COULOIR_DEBUT.mp4'): (2.0, 60.0)}
+
+Pour une caméra du graphe, une identité n'est candidate que si sa dernière
+apparition est :
+- sur la même caméra, depuis au plus CAMERA_SAME_MAX_SECONDS (track perdu
+  récemment : occultation, sortie brève du champ) ;
+- sur une caméra reliée par une transition, depuis un temps compris dans la
+  fenêtre de trajet de cette transition.
+Le filtre est appliqué avant tout calcul de similarité. Les caméras absentes
+du graphe ne sont pas filtrées.
+
+Les temps sont ceux d'une base commune à toutes les caméras : début de la
+vidéo (config.CAMERA_START_TIMES, 0 par défaut) + temps dans la vidéo. Les
+caméras ne sont pas traitées en même temps (processus de travail en nombre
+borné) : une caméra traitée plus tôt a laissé des apparitions « futures »
+pour une caméra traitée ensuite ; leur délai est négatif et aucune fenêtre
+ne les accepte. Seules les identités déjà vues, sur la base commune, avant
+la détection sont candidates.
+"""
+
+import numpy as np
+
+import config
+
+
+class CameraGraph:
+    """
+    Transitions autorisées entre caméras et fenêtres de temps de trajet.
+
+    Attributes:
+        queries (int): Requêtes (détections) recherchées
+        candidates (int): Identités comparées, toutes requêtes confondues
+        gallery_rows (int): Identités présentes dans la galerie, toutes requêtes confondues
+    """
+
+    def __init__(self, transitions, same_camera_seconds=5.0, bidirectional=True):
+        """
+        Args:
+            transitions (dict): {(caméra de départ, caméra d'arrivée): (min_s, max_s)}
+            same_camera_seconds (float): Inactivité maximale d'une identité de la même caméra
+            bidirectional (bool): Chaque transition vaut aussi dans l'autre sens
+        """
+        self.windows = {}  # (départ, arrivée) -> (min_s, max_s)
+        for (src, dst), (lo, hi) in transitions.items():
+            self.windows[(src, dst)] = (float(lo), float(hi))
+            if bidirectional:
+                self.windows.setdefault((dst, src), (float(lo), float(hi)))
+        self.cameras = {camera for pair in self.windows for camera in pair}
+        self.same_camera_seconds = same_camera_seconds
+        self._bounds = {}  # Caméra d'arrivée -> (nb de caméras connues, bornes min, bornes max par code)
+        self.queries = 0
+        self.candidates = 0
+        self.gallery_rows = 0
+
+    def gates(self, camera):
+        """True si les recherches de cette caméra sont filtrées."""
+        return camera in self.cameras
+
+    def window(self, src, dst):
+        """Fenêtre (min_s, max_s) entre la dernière apparition sur `src` et une détection sur `dst` (None = impossible)."""
+        if src == dst:
+            return (0.0, self.same_camera_seconds)
+        return self.windows.get((src, dst))
+
+    def allows(self, src, dst, delay):
+        """True si un objet vu sur `src` peut réapparaître sur `dst` après `delay` secondes."""
+        window = self.window(src, dst)
+        return window is not None and window[0] <= delay <= window[1]
+
+    def _bounds_for(self, camera, names):
+        """Bornes min/max du délai par code de caméra de la galerie (code inconnu : aucune ligne)."""
+        cached = self._bounds.get(camera)
+        if cached is not None and cached[0] == len(names):
+            return cached[1], cached[2]
+        lo = np.full(len(names) + 1, np.inf)
+        hi = np.full(len(names) + 1, -np.inf)
+        for code, name in enumerate(names):
+            window = self.window(name, camera)
+            if window is not None:
+                lo[code], hi[code] = window
+        self._bounds[camera] = (len(names), lo, hi)
+        return lo, hi
+
+    def select(self, camera, timestamp, names):
+        """
+        Prépare le filtre des lignes de la galerie pour une détection.
+
+        Args:
+            camera (str): Caméra de la détection
+            timestamp (float): Instant de la détection (secondes, base de temps commune)
+            names (list): Noms des caméras de la galerie, par code (SharedGallery.camera_names)
+
+        Returns:
+            callable: select(last_camera, last_time) -> masque booléen des lignes candidates
+                      (voir SharedGallery.read_subset, dans une partition de classe)
+        """
+        lo, hi = self._bounds_for(camera, names)
+        last = len(lo) - 1
+
+        def _select(last_camera, last_time):
+            # Caméra ajoutée à la galerie depuis la lecture des noms : dernière case (aucune fenêtre)
+            codes = np.minimum(last_camera, last)
+            delay = timestamp - last_time
+            return (delay >= lo[codes]) & (delay <= hi[codes])
+        return _select
+
+    def record(self, n_queries, n_candidates, n_rows):
+        """Compte les identités comparées pour `n_queries` requêtes."""
+        self.queries += n_queries
+        self.candidates += n_queries * n_candidates
+        self.gallery_rows += n_queries * n_rows
+
+    def stats(self):
+        """
+        Returns:
+            dict: Identités comparées par requête et part de la galerie comparée
+        """
+        return {
+            'queries': self.queries,
+            'candidates_per_query': self.candidates / self.queries if self.queries else 0.0,
+            'candidate_rate': self.candidates / self.gallery_rows if self.gallery_rows else 1.0,
+        }
+
+
+def camera_time(video_name, frame_idx, fps):
+    """
+    Temps d'une frame sur la base de temps commune à toutes les caméras.
+
+    Args:
+        video_name (str): Vidéo de la frame
+        frame_idx (int): Index de la frame dans la vidéo
+        fps (float): Cadence de la vidéo (0 si inconnue)
+
+    Returns:
+        float: Début de la vidéo (config.CAMERA_START_TIMES) + temps dans la vidéo, en secondes
+    """
+    start = float(config.CAMERA_START_TIMES.get(video_name, 0.0))
+    return start + (frame_idx / fps if fps else 0.0)
+
+
+def make_camera_graph():
+    """
+    Construit la topologie de config.CAMERA_GRAPH.
+
+    Returns:
+        CameraGraph | None: None si aucune transition n'est déclarée (pas de filtrage)
+    """
+    if not config.CAMERA_GRAPH:
+        return None
+    return CameraGraph(config.CAMERA_GRAPH, config.CAMERA_SAME_MAX_SECONDS, config.CAMERA_GRAPH_BIDIRECTIONAL)
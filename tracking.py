@@ -1,55 +1,397 @@
 """
 Module de tracking global des objets.
 Gère l'identification et le suivi des objets à travers plusieurs vidéos.
+
+Le matching est vectorisé : la galerie des tracks globaux (voir gallery.py) est
+une matrice NumPy normalisée (L2) en mémoire partagée, et toutes les détections
+d'une frame sont comparées à tous les tracks par un unique produit matriciel.
+Une galerie compacte (float16, ou int8 avec une échelle par ligne) est
+déquantifiée par blocs pendant ce produit, sans copie float32 complète.
+Pour les très grandes galeries, un index approximatif (voir ann_index.py) peut
+remplacer cette recherche exacte (config.MATCH_INDEX). Une topologie des
+caméras (voir topology.py) limite les identités comparées à celles qui ont pu
+atteindre la caméra depuis leur dernière apparition. La galerie est
+partitionnée par classe (config.GALLERY_CLASS_PARTITION) : une détection
+n'est comparée qu'aux identités de sa classe, avec un seuil propre à la
+classe (config.CLASS_SIMILARITY_THRESHOLDS).
 """
 
-from sklearn.metrics.pairwise import cosine_similarity
+import numpy as np
 import config
+from ann_index import PartitionedIndex, make_index
+
+
+def normalize_embeddings(embeddings):
+    """
+    L2-normalizes a batch of embeddings.
+
+    Args:
+        embeddings (np.array | list): One vector (n_features,) or a batch (n, n_features).
+
+    Returns:
+        np.array: float32 matrix (n, n_features) whose rows have unit norm
+                  (zero vectors are left at zero).
+    """
+    mat = np.asarray(embeddings, dtype=np.float32)
+    if mat.ndim == 1:
+        mat = mat.reshape(1, -1)
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+
+def gallery_similarities(queries, gallery_matrix, scales=None, block_rows=4096):
+    """
+    Cosine similarities between normalized queries and a gallery stored as
+    float32, float16 or int8 (see gallery.EMBEDDING_DTYPES).
+
+    Args:
+        queries (np.array): L2-normalized float32 queries (n, n_features).
+        gallery_matrix (np.array): Gallery rows in their storage dtype (n_tracks, n_features).
+        scales (np.array): Per-row scale of an int8 gallery (n_tracks,), None otherwise.
+        block_rows (int): Rows converted to float32 at a time.
+
+    Returns:
+        np.array: float32 similarities (n, n_tracks).
+    """
+    if gallery_matrix.dtype == np.float32:
+        return queries @ gallery_matrix.T
+    # Déquantification par blocs : seul un bloc float32 existe à la fois
+    sims = np.empty((len(queries), len(gallery_matrix)), dtype=np.float32)
+    for start in range(0, len(gallery_matrix), block_rows):
+        block = gallery_matrix[start:start + block_rows].astype(np.float32)
+        np.matmul(queries, block.T, out=sims[:, start:start + block_rows])
+    if scales is not None:
+        sims *= scales
+    return sims
+
+
+def find_best_matches(embeddings, gallery_ids, gallery_matrix, scales=None):
+    """
+    Finds the best matching Global ID for every embedding of a frame in one matrix multiply.
+
+    Args:
+        embeddings (np.array | list): Batch of feature vectors (n_dets, n_features).
+        gallery_ids (np.array): Global IDs of the gallery rows (n_tracks,).
+        gallery_matrix (np.array): L2-normalized gallery (n_tracks, n_features), float32,
+                                   float16 or int8.
+        scales (np.array): Per-row scale of an int8 gallery (None otherwise).
+
+    Returns:
+        tuple: (best_ids, best_sims) - lists of length n_dets. Entries are (None, -1.0)
+               when the gallery is empty.
+    """
+    n_dets = len(embeddings)
+    if n_dets == 0:
+        return [], []
+    if len(gallery_ids) == 0:
+        return [None] * n_dets, [-1.0] * n_dets
 
-def find_best_match(embedding, tracks_snapshot):
+    queries = normalize_embeddings(embeddings)
+    # Similarités cosinus (n_dets, n_tracks) en un seul produit matriciel
+    sims = gallery_similarities(queries, gallery_matrix, scales)
+    best_rows = np.argmax(sims, axis=1)
+    best_sims = sims[np.arange(n_dets), best_rows]
+    return gallery_ids[best_rows].tolist(), best_sims.astype(float).tolist()
+
+
+def similarity_threshold(class_name):
+    """
+    Similarity above which a detection of this class is matched to an existing global track.
+
+    Args:
+        class_name (str): Detected class (None = unknown).
+
+    Returns:
+        float: config.CLASS_SIMILARITY_THRESHOLDS[class_name], or config.SIMILARITY_THRESHOLD.
+    """
+    return config.CLASS_SIMILARITY_THRESHOLDS.get(class_name, config.SIMILARITY_THRESHOLD)
+
+
+def make_matching_index():
+    """
+    Builds the search index selected by config.MATCH_INDEX.
+
+    Returns:
+        GalleryIndex | None: None for 'exact' (direct zero-copy search on the shared gallery).
+                             With config.GALLERY_CLASS_PARTITION, one sub-index per class partition.
+    """
+    if config.MATCH_INDEX == 'exact':
+        return None
+    return make_index(
+        config.MATCH_INDEX,
+        config.GALLERY_EMBEDDING_DIM,
+        partitioned=config.GALLERY_CLASS_PARTITION,
+        n_lists=config.IVF_N_LISTS,
+        n_probe=config.IVF_N_PROBE
+    )
+
+
+def _class_groups(gallery, classes, n_dets):
+    """
+    Groups the detections of a frame by gallery partition.
+
+    Returns:
+        list: (class_code, rows) pairs. class_code is None for all classes (classes not given)
+              and False for a class without any track in the gallery.
+    """
+    groups = {}
+    for i, class_name in enumerate(classes if classes is not None else [None] * n_dets):
+        groups.setdefault(class_name, []).append(i)
+    result = []
+    for class_name, rows in groups.items():
+        code = None  # Toutes les classes
+        if classes is not None:
+            code = -1 if class_name is None else gallery.class_code(class_name)
+            if code is None:
+                code = False  # Aucun track de cette classe dans la galerie
+        result.append((code, rows))
+    return result
+
+
+def search_gallery(gallery, embeddings, index=None, camera=None, timestamp=0.0, graph=None, classes=None):
+    """
+    Finds the best matching Global ID for every embedding of a frame.
+
+    Args:
+        gallery (SharedGallery): Shared gallery of global tracks.
+        embeddings (list): Feature vectors of the frame's detections.
+        index (GalleryIndex): Optional search index, synchronized with the gallery
+                              before searching. None means exact search.
+        camera (str): Camera of the detections (used by the camera graph).
+        timestamp (float): Video time of the detections, in seconds (used by the camera graph).
+        graph (CameraGraph): Optional camera topology. For a camera of the graph, only the
+                             identities that could have reached it are compared (exact search,
+                             the index is not used).
+        classes (list): Class name of each detection. When given, each detection is only
+                        compared with the gallery partition of its class (through the index
+                        when it is partitioned, see make_matching_index; exact search otherwise).
+
+    Returns:
+        tuple: (best_ids, best_sims) - lists of length n_dets, (None, -1.0) when nothing matches.
+    """
+    n_dets = len(embeddings)
+    if n_dets == 0:
+        return [], []
+    best_ids, best_sims = [None] * n_dets, [-1.0] * n_dets
+    gated = graph is not None and graph.gates(camera)
+    if index is not None and not gated and (classes is None or isinstance(index, PartitionedIndex)):
+        index.sync(gallery)
+        queries = normalize_embeddings(embeddings)
+        if classes is None:
+            if graph is not None:
+                graph.record(n_dets, len(gallery), len(gallery))
+            ids, sims = index.search(queries)
+            return ([None if gid < 0 else gid for gid in ids.tolist()], sims.astype(float).tolist())
+        for code, rows in _class_groups(gallery, classes, n_dets):
+            n_candidates = 0
+            if code is not False:
+                ids, sims = index.search(queries[rows], code)
+                n_candidates = index.partition_size(code)
+                for i, gid, sim in zip(rows, ids.tolist(), sims.tolist()):
+                    if gid >= 0:
+                        best_ids[i], best_sims[i] = gid, sim
+            if graph is not None:
+                graph.record(len(rows), n_candidates, len(gallery))
+        return best_ids, best_sims
+
+    if classes is None and not gated:
+        if graph is not None:
+            graph.record(n_dets, len(gallery), len(gallery))
+        return gallery.read(lambda ids, matrix, scales: find_best_matches(embeddings, ids, matrix, scales))
+
+    # Candidats filtrés (partition de la classe, caméra d'origine et temps de trajet) avant toute similarité
+    topology = graph.select(camera, timestamp, gallery.camera_names()) if gated else None
+    for code, rows in _class_groups(gallery, classes, n_dets):
+        n_candidates = 0
+        if code is not False:
+            queries = [embeddings[i] for i in rows]
+            (ids, sims), n_candidates = gallery.read_subset(
+                lambda ids, matrix, scales: (find_best_matches(queries, ids, matrix, scales), len(ids)),
+                class_code=code, select=topology)
+            for i, gid, sim in zip(rows, ids, sims):
+                best_ids[i], best_sims[i] = gid, sim
+        if graph is not None:
+            graph.record(len(rows), n_candidates, len(gallery))
+    return best_ids, best_sims
+
+
+def find_best_match(embedding, gallery, index=None, class_name=None):
     """
     Finds the best matching Global ID for a given embedding.
 
     Args:
         embedding (np.array): Visual feature vector of the current object.
-        tracks_snapshot (dict): Read-only copy of global tracks {gid: data}.
+        gallery (SharedGallery): Shared gallery of global tracks.
+        index (GalleryIndex): Optional search index (None = exact search).
+        class_name (str): Detected class; only its gallery partition is searched (None = all classes).
 
     Returns:
         tuple: (best_match_id, best_similarity_score) OR (None, -1.0)
     """
-    best_match_id = None
-    best_sim = -1.0
-    
-    for g_id, data in tracks_snapshot.items():
-        # cosine_similarity expects 2D arrays (1, n_features)
-        sim = cosine_similarity(embedding.reshape(1, -1), data['embedding'].reshape(1, -1))[0][0]
-        if sim > best_sim:
-            best_sim = sim
-            best_match_id = g_id
-            
-    return best_match_id, best_sim
+    classes = [class_name] if class_name is not None and config.GALLERY_CLASS_PARTITION else None
+    best_ids, best_sims = search_gallery(gallery, [np.ravel(embedding)], index, classes=classes)
+    return best_ids[0], best_sims[0]
+
+
+def assign_global_ids(gallery, embeddings, positions, video_name, frame_idx=0, timestamp=0.0, index=None,
+                      graph=None, class_names=None):
+    """
+    Resolves the Global IDs of all detections of a frame.
+
+    Every detection is scored in a single batch against a zero-copy view of the
+    shared gallery (or the search index), then matched tracks are updated and unmatched ones created
+    inside one write section.
+
+    Args:
+        gallery (SharedGallery): Shared gallery of global tracks.
+        embeddings (list): Feature vectors of the frame's detections.
+        positions (list): (x, y) centers of the detections.
+        video_name (str): Name of the current video.
+        frame_idx (int): Index of the current frame.
+        timestamp (float): Video time of the current frame, in seconds.
+        index (GalleryIndex): Optional search index (None = exact search).
+        graph (CameraGraph): Optional camera topology (None = every identity is a candidate).
+        class_names (list): Class name of each detection (partition and threshold).
+                            None = unknown classes: the whole gallery is searched.
 
-def update_global_track(shared_global_tracks, gid, embedding, pos, video_name, lock):
+    Returns:
+        list: Global ID assigned to each detection.
+    """
+    if len(embeddings) == 0:
+        return []
+
+    classes = class_names if config.GALLERY_CLASS_PARTITION else None
+    class_names = class_names or [None] * len(embeddings)
+    best_ids, best_sims = search_gallery(gallery, embeddings, index, video_name, timestamp, graph, classes)
+
+    global_ids = []
+    with gallery.writing():
+        for embedding, pos, class_name, best_id, best_sim in zip(embeddings, positions, class_names, best_ids, best_sims):
+            # Objet reconnu : utiliser l'ID existant (s'il n'a pas été évincé entre-temps)
+            if (best_id is not None and best_sim > similarity_threshold(class_name)
+                    and update_global_track(gallery, best_id, embedding, pos, video_name, frame_idx, timestamp)):
+                global_ids.append(best_id)
+            else:
+                # Nouvel objet, créer un nouvel ID global
+                global_ids.append(create_new_track(gallery, embedding, pos, video_name, frame_idx, timestamp,
+                                                   class_name))
+    return global_ids
+
+
+def assign_global_ids_batch(gallery, requests, index=None, graph=None):
+    """
+    Resolves the Global IDs of several frames, possibly from different cameras,
+    as a single authority (see matcher.py).
+
+    All detections are scored against the gallery in one search. Requests are
+    then resolved in order inside one write section; a detection that matches
+    no existing track is also compared with the tracks created earlier in the
+    same batch, so the same new object seen by two cameras at once gets one ID.
+
+    Args:
+        gallery (SharedGallery): Shared gallery of global tracks.
+        requests (list): (embeddings, positions, video_name, frame_idx, timestamp, class_names) per frame.
+        index (GalleryIndex): Optional search index (None = exact search).
+        graph (CameraGraph): Optional camera topology (None = every identity is a candidate).
+
+    Returns:
+        list: Global IDs of each request's detections.
+    """
+    flat = [emb for request in requests for emb in request[0]]
+    if not flat:
+        return [[] for _ in requests]
+
+    # Classe de chaque détection (None = inconnue)
+    flat_classes = [class_name for embeddings, _, _, _, _, class_names in requests
+                    for class_name in (class_names or [None] * len(embeddings))]
+    partition = config.GALLERY_CLASS_PARTITION and any(request[5] is not None for request in requests)
+
+    queries = normalize_embeddings(flat)
+    if graph is None:
+        best_ids, best_sims = search_gallery(gallery, queries, index, classes=flat_classes if partition else None)
+    else:
+        # Candidats propres à la caméra et à l'instant de chaque demande : une recherche par demande
+        best_ids, best_sims, q = [], [], 0
+        for embeddings, _, video_name, _, timestamp, _ in requests:
+            n = len(embeddings)
+            ids, sims = search_gallery(gallery, queries[q:q + n], index, video_name, timestamp, graph,
+                                       flat_classes[q:q + n] if partition else None)
+            best_ids.extend(ids)
+            best_sims.extend(sims)
+            q += n
+
+    created_ids, created = [], np.empty((len(flat), queries.shape[1]), dtype=np.float32)
+    created_at = []  # (caméra, instant, classe) de création des tracks du lot
+    results, q = [], 0
+    with gallery.writing():
+        for embeddings, positions, video_name, frame_idx, timestamp, _ in requests:
+            global_ids = []
+            for embedding, pos in zip(embeddings, positions):
+                class_name = flat_classes[q]
+                best_id, best_sim = best_ids[q], best_sims[q]
+                if created_ids:
+                    # Tracks créés plus tôt dans ce lot (absents de la recherche groupée)
+                    sims = created[:len(created_ids)] @ queries[q]
+                    if partition:
+                        sims[[created_class != class_name for _, _, created_class in created_at]] = -np.inf
+                    if graph is not None and graph.gates(video_name):
+                        sims[[not graph.allows(camera, video_name, timestamp - created_time)
+                              for camera, created_time, _ in created_at]] = -np.inf
+                    j = int(np.argmax(sims))
+                    if sims[j] > best_sim:
+                        best_id, best_sim = created_ids[j], float(sims[j])
+
+                if (best_id is not None and best_sim > similarity_threshold(class_name)
+                        and update_global_track(gallery, best_id, embedding, pos, video_name, frame_idx, timestamp)):
+                    global_ids.append(best_id)
+                else:
+                    gid = create_new_track(gallery, embedding, pos, video_name, frame_idx, timestamp, class_name)
+                    created[len(created_ids)] = queries[q]
+                    created_ids.append(gid)
+                    created_at.append((video_name, timestamp, class_name))
+                    global_ids.append(gid)
+                q += 1
+            results.append(global_ids)
+    return results
+
+
+def update_global_track(gallery, gid, embedding, pos, video_name, frame_idx=0, timestamp=0.0):
     """
     Updates the shared global track data safely.
+
+    Returns:
+        bool: False if the track has been evicted from the gallery.
+    """
+    return gallery.update(gid, embedding, pos, video_name, timestamp, frame_idx)
+
+
+def create_new_track(gallery, embedding, pos, video_name, frame_idx=0, timestamp=0.0, class_name=None):
+    """
+    Creates a new global track safely, in the gallery partition of its class.
+
+    Returns:
+        int: The new Global ID.
+    """
+    return gallery.append(embedding, pos, video_name, timestamp, frame_idx, class_name)
+
+
+def expire_global_tracks(gallery, frame_idx, timestamp, camera=None):
+    """
+    Evicts the global tracks idle for longer than the configured TTL.
+
+    Cameras run at different times (bounded worker pool), so a camera only
+    expires the tracks it saw last: its clock says nothing about the others.
+
+    Args:
+        gallery (SharedGallery): Shared gallery of global tracks.
+        frame_idx (int): Index of the current frame.
+        timestamp (float): Time of the current frame on the run-wide time base, in seconds.
+        camera (str): Camera whose clock is used (None = every track).
+
+    Returns:
+        int: Number of evicted tracks.
     """
-    with lock:
-        d = shared_global_tracks[gid]
-        d['embedding'] = embedding
-        d['last_pos'] = pos
-        d['last_video'] = video_name
-        shared_global_tracks[gid] = d
-
-def create_new_track(shared_global_tracks, global_id_counter, embedding, pos, video_name, lock):
-    """
-    Creates a new global track safely.
-    """
-    with lock:
-        new_gid = global_id_counter.value
-        global_id_counter.value += 1
-        shared_global_tracks[new_gid] = {
-            'embedding': embedding, 
-            'last_pos': pos, 
-            'last_video': video_name
-        }
-        return new_gid
+    if config.GALLERY_TTL_SECONDS is None and config.GALLERY_TTL_FRAMES is None:
+        return 0
+    return gallery.expire(timestamp, frame_idx, config.GALLERY_TTL_SECONDS, config.GALLERY_TTL_FRAMES, camera)
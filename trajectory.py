@@ -0,0 +1,411 @@
+"""
+Module d'écriture et de lecture des trajectoires (fichiers donnees_*).
+Les détections sont accumulées en mémoire puis écrites par blocs.
+
+Formats disponibles (config.TRAJECTORY_FORMAT) :
+- 'csv'     : texte, une ligne par détection (format historique) ;
+- 'npz'     : colonnes typées NumPy compressées, un fichier par bloc réunis à la fermeture ;
+- 'parquet' : colonnes typées Parquet (nécessite pyarrow).
+
+Colonnes : camera, frame (int32), id (int32), class_name (catégoriel),
+x_center / y_center (float32), alerte (bool), interpole (bool : objet
+reporté depuis la dernière frame détectée, sans détection sur cette frame).
+Les fichiers écrits avant la colonne interpole se relisent avec interpole à
+False.
+"""
+
+import os
+import csv
+import zipfile
+from collections import defaultdict
+
+import numpy as np
+
+COLUMNS = ['camera', 'frame', 'id', 'class_name', 'x_center', 'y_center', 'alerte', 'interpole']
+
+FORMAT_EXTENSIONS = {'csv': '.csv', 'npz': '.npz', 'parquet': '.parquet'}
+
+FILE_PREFIX = 'donnees_'
+
+
+def trajectory_path(folder, video_name, fmt):
+    """
+    Renvoie le chemin du fichier de trajectoires d'une vidéo.
+
+    Args:
+        folder (str): Dossier de sortie
+        video_name (str): Nom de la vidéo
+        fmt (str): Format ('csv', 'npz' ou 'parquet')
+
+    Returns:
+        str: Chemin du fichier
+    """
+    if fmt not in FORMAT_EXTENSIONS:
+        raise ValueError(f"Format de trajectoires inconnu: {fmt} (attendu: {', '.join(FORMAT_EXTENSIONS)})")
+    return os.path.join(folder, f"{FILE_PREFIX}{video_name}{FORMAT_EXTENSIONS[fmt]}")
+
+
+def list_trajectory_files(folder):
+    """
+    Liste les fichiers de trajectoires d'un dossier, tous formats confondus.
+
+    Args:
+        folder (str): Dossier de sortie
+
+    Returns:
+        list: Liste de (nom_video, chemin)
+    """
+    files = []
+    for name in sorted(os.listdir(folder)):
+        if not name.startswith(FILE_PREFIX):
+            continue
+        for ext in FORMAT_EXTENSIONS.values():
+            if name.endswith(ext):
+                files.append((name[len(FILE_PREFIX):-len(ext)], os.path.join(folder, name)))
+                break
+    return files
+
+
+class TrajectorySink:
+    """
+    Base des écrivains de trajectoires : accumule les détections par colonnes
+    et les écrit par blocs de `chunk_size` lignes.
+
+    `checkpoint()` renvoie la position du fichier après écriture des blocs ;
+    un écrivain rouvert avec `resume=position` supprime ce qui a été écrit
+    après et continue le fichier (reprise après un arrêt).
+    """
+
+    resumable = True  # Le format permet de reprendre un fichier existant
+
+    def __init__(self, path, camera, chunk_size=10000, resume=None):
+        self.path = path
+        self.camera = camera
+        self.chunk_size = chunk_size
+        self.rows_written = resume['rows'] if resume else 0
+        self._reset_buffers()
+
+    def _reset_buffers(self):
+        self._frames, self._ids, self._classes = [], [], []
+        self._xs, self._ys, self._alerts = [], [], []
+        self._interpolated = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self):
+        return len(self._frames)
+
+    def add(self, frame_idx, gid, class_name, x, y, alert, interpolated=False):
+        """
+        Ajoute une détection.
+
+        Args:
+            frame_idx (int): Index de la frame
+            gid (int): ID global de l'objet
+            class_name (str): Classe de l'objet
+            x (float): Abscisse du centre
+            y (float): Ordonnée du centre
+            alert (bool): Objet dans une zone d'alerte
+            interpolated (bool): Position reportée d'une frame précédente (frame sans détection)
+        """
+        self._frames.append(frame_idx)
+        self._ids.append(gid)
+        self._classes.append(class_name)
+        self._xs.append(x)
+        self._ys.append(y)
+        self._alerts.append(alert)
+        self._interpolated.append(interpolated)
+        if len(self._frames) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Écrit le bloc en mémoire sur le disque."""
+        if not self._frames:
+            return
+        self._write_chunk()
+        self.rows_written += len(self._frames)
+        self._reset_buffers()
+
+    def close(self):
+        """Écrit le dernier bloc et ferme le fichier."""
+        self.flush()
+
+    def checkpoint(self):
+        """
+        Écrit les blocs en mémoire et renvoie la position du fichier.
+
+        Returns:
+            dict: Position (sérialisable en JSON) à passer à `resume`
+        """
+        self.flush()
+        return {'rows': self.rows_written}
+
+    def _columns(self):
+        """Convertit le bloc en mémoire en colonnes typées."""
+        categories, codes = np.unique(np.asarray(self._classes, dtype=str), return_inverse=True)
+        return {
+            'frame': np.asarray(self._frames, dtype=np.int32),
+            'id': np.asarray(self._ids, dtype=np.int32),
+            'class_code': codes.astype(np.int16),
+            'class_categories': categories,
+            'x_center': np.asarray(self._xs, dtype=np.float32),
+            'y_center': np.asarray(self._ys, dtype=np.float32),
+            'alerte': np.asarray(self._alerts, dtype=bool),
+            'interpole': np.asarray(self._interpolated, dtype=bool),
+        }
+
+    def _write_chunk(self):
+        raise NotImplementedError
+
+
+class CsvTrajectorySink(TrajectorySink):
+    """Trajectoires au format CSV (une ligne par détection)."""
+
+    def __init__(self, path, camera, chunk_size=10000, resume=None):
+        super().__init__(path, camera, chunk_size, resume)
+        if resume:
+            # Supprimer les lignes écrites après le point de reprise
+            os.truncate(path, resume['offset'])
+            self._file = open(path, mode='a', newline='')
+            self._writer = csv.writer(self._file)
+        else:
+            self._file = open(path, mode='w', newline='')
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(COLUMNS)
+
+    def _write_chunk(self):
+        camera = self.camera
+        self._writer.writerows(
+            [camera, f, i, c, x, y, int(a), int(p)]
+            for f, i, c, x, y, a, p in zip(self._frames, self._ids, self._classes, self._xs, self._ys, self._alerts,
+                                           self._interpolated)
+        )
+
+    def checkpoint(self):
+        position = super().checkpoint()
+        self._file.flush()
+        position['offset'] = self._file.tell()
+        return position
+
+    def close(self):
+        super().close()
+        self._file.close()
+
+
+class NpzTrajectorySink(TrajectorySink):
+    """
+    Trajectoires en colonnes NumPy compressées.
+
+    Pendant le traitement, chaque bloc est écrit compressé dans son propre
+    fichier (<fichier>.<numéro>.part, écrit à côté puis renommé) : un arrêt pendant
+    une écriture ne peut pas abîmer les blocs précédents. À la fermeture,
+    les blocs sont réunis dans l'archive .npz, sous des noms préfixés par
+    leur numéro, puis supprimés.
+    """
+
+    def __init__(self, path, camera, chunk_size=10000, resume=None):
+        super().__init__(path, camera, chunk_size, resume)
+        self._chunks = resume['chunks'] if resume else 0
+        # Blocs d'une exécution précédente (ou écrits après le point de reprise)
+        for index, part in self._parts():
+            if index >= self._chunks:
+                os.remove(part)
+
+    def _part_path(self, index):
+        return f"{self.path}.{index:06d}.part"
+
+    def _parts(self):
+        """Blocs présents sur disque, par numéro croissant : liste de (numéro, chemin)."""
+        folder, base = os.path.split(self.path)
+        parts = []
+        for name in os.listdir(folder or '.'):
+            index = name[len(base) + 1:-len('.part')]
+            if name.startswith(base + '.') and name.endswith('.part') and index.isdigit():
+                parts.append((int(index), os.path.join(folder, name)))
+        return sorted(parts)
+
+    def _write_chunk(self):
+        part = self._part_path(self._chunks)
+        tmp_path = part + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, **self._columns())
+        os.replace(tmp_path, part)
+        self._chunks += 1
+
+    def checkpoint(self):
+        position = super().checkpoint()
+        position['chunks'] = self._chunks
+        return position
+
+    def close(self):
+        """Écrit le dernier bloc puis réunit les blocs dans l'archive .npz (remplacement atomique)."""
+        super().close()
+        parts = [part for index, part in self._parts() if index < self._chunks]
+        tmp_path = self.path + '.tmp'
+        with zipfile.ZipFile(tmp_path, mode='w', compression=zipfile.ZIP_DEFLATED) as zf:
+            _save_member(zf, 'camera', np.asarray(self.camera))
+            for index, part in enumerate(parts):
+                with np.load(part, allow_pickle=False) as chunk:
+                    for name in chunk.files:
+                        _save_member(zf, f"{index:06d}_{name}", chunk[name])
+        os.replace(tmp_path, self.path)
+        for part in parts:
+            os.remove(part)
+
+
+def _save_member(zf, name, array):
+    """Ajoute un tableau .npy à une archive zip (lisible par np.load)."""
+    with zf.open(f"{name}.npy", mode='w', force_zip64=True) as member:
+        np.lib.format.write_array(member, np.asanyarray(array), allow_pickle=False)
+
+
+class ParquetTrajectorySink(TrajectorySink):
+    """
+    Trajectoires au format Parquet (un groupe de lignes par bloc, compression zstd).
+
+    Le pied de page n'est écrit qu'à la fermeture : un fichier interrompu
+    n'est pas relisible, la reprise n'est donc pas possible avec ce format.
+    """
+
+    resumable = False
+
+    def __init__(self, path, camera, chunk_size=10000, resume=None):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Le format 'parquet' nécessite pyarrow (pip install pyarrow)") from e
+        super().__init__(path, camera, chunk_size)
+        self._pa = pa
+        self._schema = pa.schema([
+            ('camera', pa.dictionary(pa.int8(), pa.string())),
+            ('frame', pa.int32()),
+            ('id', pa.int32()),
+            ('class_name', pa.dictionary(pa.int16(), pa.string())),
+            ('x_center', pa.float32()),
+            ('y_center', pa.float32()),
+            ('alerte', pa.bool_()),
+            ('interpole', pa.bool_()),
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema, compression='zstd')
+
+    def _write_chunk(self):
+        pa = self._pa
+        cols = self._columns()
+        n = len(cols['frame'])
+        table = pa.Table.from_arrays([
+            pa.DictionaryArray.from_arrays(pa.array(np.zeros(n, dtype=np.int8)), pa.array([self.camera])),
+            pa.array(cols['frame']),
+            pa.array(cols['id']),
+            pa.DictionaryArray.from_arrays(pa.array(cols['class_code']), pa.array(cols['class_categories'].tolist())),
+            pa.array(cols['x_center']),
+            pa.array(cols['y_center']),
+            pa.array(cols['alerte']),
+            pa.array(cols['interpole']),
+        ], schema=self._schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        super().close()
+        self._writer.close()
+
+
+_SINKS = {'csv': CsvTrajectorySink, 'npz': NpzTrajectorySink, 'parquet': ParquetTrajectorySink}
+
+
+def open_trajectory_sink(folder, video_name, fmt='csv', chunk_size=10000, resume=None):
+    """
+    Ouvre l'écrivain de trajectoires d'une vidéo.
+
+    Args:
+        folder (str): Dossier de sortie
+        video_name (str): Nom de la vidéo
+        fmt (str): Format ('csv', 'npz' ou 'parquet')
+        chunk_size (int): Nombre de détections par bloc écrit
+        resume (dict): Position renvoyée par checkpoint() pour continuer le fichier existant
+
+    Returns:
+        TrajectorySink: Écrivain (à fermer avec close() ou via `with`)
+    """
+    return _SINKS[fmt](trajectory_path(folder, video_name, fmt), video_name, chunk_size, resume)
+
+
+def is_resumable(fmt):
+    """Vrai si le format de trajectoires permet la reprise d'un fichier existant."""
+    return _SINKS[fmt].resumable
+
+
+def read_trajectories(path):
+    """
+    Lit un fichier de trajectoires, quel que soit son format.
+
+    Args:
+        path (str): Chemin du fichier (.csv, .npz ou .parquet)
+
+    Returns:
+        dict: Colonnes 'frame', 'id', 'class_name', 'x_center', 'y_center', 'alerte', 'interpole' (tableaux NumPy)
+    """
+    if path.endswith('.npz'):
+        return _read_npz(path)
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        names = [name for name in COLUMNS[1:] if name in pq.read_schema(path).names]
+        table = pq.read_table(path, columns=names)
+        cols = {name: table.column(name).to_numpy() for name in ('frame', 'id', 'x_center', 'y_center', 'alerte')}
+        cols['class_name'] = np.asarray(table.column('class_name').to_pylist(), dtype=str)
+        cols['interpole'] = (table.column('interpole').to_numpy() if 'interpole' in names
+                             else np.zeros(table.num_rows, dtype=bool))
+        return cols
+    return _read_csv(path)
+
+
+def _read_csv(path):
+    """Lit un fichier de trajectoires CSV en colonnes."""
+    cols = defaultdict(list)
+    with open(path, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            cols['frame'].append(int(row.get('frame', 0)))
+            cols['id'].append(int(row.get('id', 0)))
+            cols['class_name'].append(row.get('class_name', 'unknown'))
+            cols['x_center'].append(float(row.get('x_center', 0.0)))
+            cols['y_center'].append(float(row.get('y_center', 0.0)))
+            cols['alerte'].append(row.get('alerte', '0') not in ('0', '', 'False'))
+            cols['interpole'].append(row.get('interpole', '0') not in ('0', '', 'False'))
+    return {
+        'frame': np.asarray(cols['frame'], dtype=np.int32),
+        'id': np.asarray(cols['id'], dtype=np.int32),
+        'class_name': np.asarray(cols['class_name'], dtype=str),
+        'x_center': np.asarray(cols['x_center'], dtype=np.float32),
+        'y_center': np.asarray(cols['y_center'], dtype=np.float32),
+        'alerte': np.asarray(cols['alerte'], dtype=bool),
+        'interpole': np.asarray(cols['interpole'], dtype=bool),
+    }
+
+
+def _read_npz(path):
+    """Lit un fichier de trajectoires .npz (concatène les blocs)."""
+    chunks = defaultdict(dict)
+    with np.load(path, allow_pickle=False) as data:
+        for key in data.files:
+            prefix, _, name = key.partition('_')
+            if prefix.isdigit():
+                chunks[prefix][name] = data[key]
+
+    cols = defaultdict(list)
+    for prefix in sorted(chunks):
+        chunk = chunks[prefix]
+        for name in ('frame', 'id', 'x_center', 'y_center', 'alerte'):
+            cols[name].append(chunk[name])
+        cols['class_name'].append(chunk['class_categories'][chunk['class_code']])
+        cols['interpole'].append(chunk['interpole'] if 'interpole' in chunk else np.zeros(len(chunk['frame']), dtype=bool))
+
+    dtypes = {'frame': np.int32, 'id': np.int32, 'class_name': str,
+              'x_center': np.float32, 'y_center': np.float32, 'alerte': bool, 'interpole': bool}
+    return {
+        name: np.concatenate(cols[name]) if cols[name] else np.empty(0, dtype=dtype)
+        for name, dtype in dtypes.items()
+    }
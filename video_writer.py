@@ -0,0 +1,168 @@
+"""
+Module d'écriture asynchrone des vidéos annotées.
+Le dessin des annotations et l'encodage vidéo se font dans un thread dédié,
+alimenté par une file bornée : la boucle de détection ne dépend plus de la
+vitesse de l'encodeur.
+
+Quand la file est pleine, deux politiques sont possibles :
+- 'block' : la boucle de détection attend (aucune frame perdue) ;
+- 'drop'  : la frame est abandonnée (la détection n'est jamais ralentie).
+"""
+
+import queue
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+
+import config
+import alerts
+
+# Annotation d'un objet : boîte (x1, y1, x2, y2), centre (cx, cy), ID global,
+# alerte en cours et objet ciblé
+Annotation = namedtuple('Annotation', ['x1', 'y1', 'x2', 'y2', 'cx', 'cy', 'gid', 'alert', 'target'])
+
+_STOP = object()  # Marqueur de fin de file
+
+
+def draw_annotations(frame, zones, annotations, scale=1.0):
+    """
+    Dessine les zones d'alerte et les objets annotés sur une frame.
+
+    Args:
+        frame (np.array): Image sur laquelle dessiner (modifiée sur place)
+        zones (ZoneMap|list): Zones d'alerte de la vidéo (coordonnées pleine résolution)
+        annotations (list): Liste d'Annotation (coordonnées pleine résolution)
+        scale (float): Facteur d'échelle de `frame` par rapport à la pleine résolution
+
+    Returns:
+        np.array: Frame annotée
+    """
+    if scale != 1.0 and not isinstance(zones, alerts.ZoneMap):
+        # Une ZoneMap met son tracé à l'échelle de la frame elle-même
+        zones = [_scale_zone(zone, scale) for zone in zones]
+    frame = alerts.draw_zones(frame, zones, config.ZONE_COLOR, config.ZONE_THICKNESS)
+
+    for a in annotations:
+        x1, y1, x2, y2 = (int(v * scale) for v in (a.x1, a.y1, a.x2, a.y2))
+        if a.alert:
+            # Marquer l'objet en alerte avec un cercle rouge
+            cv2.circle(frame, (int(a.cx * scale), int(a.cy * scale)), 10, config.ALERT_COLOR, -1)
+
+        color = config.TEXT_COLOR_NORMAL
+        thickness = 2
+        if a.target:
+            # Mettre en surbrillance l'objet ciblé
+            color = config.TEXT_COLOR_TARGET
+            thickness = 4
+            cv2.putText(frame, "CIBLE", (x1, y1 - 30), cv2.FONT_HERSHEY_SIMPLEX, 0.9, color, 2)
+
+        # Dessiner la boîte englobante et l'ID
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, thickness)
+        cv2.putText(frame, f"ID:{a.gid}", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+    return frame
+
+
+def _scale_zone(zone, scale):
+    """Met une zone (rectangle ou polygone) à l'échelle."""
+    if len(zone) == 4 and not isinstance(zone[0], (list, tuple)):
+        return [int(v * scale) for v in zone]
+    return [(int(x * scale), int(y * scale)) for x, y in zone]
+
+
+class AsyncVideoWriter:
+    """
+    Écrivain de vidéo annotée dans un thread dédié.
+
+    Les frames sont soumises avec leurs annotations ; le thread les réduit
+    (optionnel), les annote puis les encode.
+    """
+
+    def __init__(self, path, fps, size, zones, queue_size=64, policy='block', scale=1.0, fps_divisor=1, stride=1,
+                 enabled=True, timer=None):
+        """
+        Args:
+            path (str): Fichier vidéo de sortie
+            fps (float): Cadence de la vidéo source
+            size (tuple): (largeur, hauteur) de la vidéo source
+            zones (ZoneMap|list): Zones d'alerte de la vidéo
+            queue_size (int): Nombre maximal de frames en attente
+            policy (str): 'block' (attendre) ou 'drop' (abandonner) quand la file est pleine
+            scale (float): Facteur de réduction de la résolution de sortie (1.0 = identique)
+            fps_divisor (int): N'écrire qu'une frame soumise sur N (cadence de sortie réduite d'autant)
+            stride (int): Frames de la vidéo source entre deux frames soumises (VID_STRIDE)
+            enabled (bool): False pour ne pas écrire de vidéo annotée du tout
+            timer (StageTimer): Chronomètres de la caméra (étape 'encode'), None si non mesuré
+        """
+        if policy not in ('block', 'drop'):
+            raise ValueError(f"Politique d'écriture inconnue: {policy} (attendu: 'block' ou 'drop')")
+        self.zones = zones
+        self.policy = policy
+        self.scale = scale
+        self.fps_divisor = max(1, int(fps_divisor))
+        self.stride = max(1, int(stride))
+        self.enabled = enabled
+        self.timer = timer
+        self.written = 0
+        self.dropped = 0
+        self._submitted = 0  # Frames soumises (la cadence de sortie en dépend, pas leur index)
+
+        self._size = (int(size[0] * scale), int(size[1] * scale))
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._out = None
+        if enabled:
+            # Une frame écrite pour stride * fps_divisor frames source : la durée de la vidéo est conservée
+            out_fps = fps / (self.stride * self.fps_divisor)
+            self._out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), out_fps, self._size)
+            self._thread = threading.Thread(target=self._run, name=f"writer-{path}", daemon=True)
+            self._thread.start()
+
+    def submit(self, frame_idx, frame, annotations=None):
+        """
+        Soumet une frame à écrire.
+
+        Args:
+            frame_idx (int): Index de la frame dans la vidéo source
+            frame (np.array): Image brute (qui ne doit plus être modifiée par l'appelant)
+            annotations (list): Liste d'Annotation à dessiner, ou None si la frame est déjà annotée
+        """
+        if not self.enabled:
+            return
+        self._submitted += 1
+        if (self._submitted - 1) % self.fps_divisor:
+            return
+        item = (frame, annotations)
+        if self.policy == 'block':
+            self._queue.put(item)
+        else:
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                self.dropped += 1
+
+    def _run(self):
+        """Boucle du thread : réduire, annoter et encoder les frames."""
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            frame, annotations = item
+            start = time.perf_counter()
+            if self.scale != 1.0:
+                frame = cv2.resize(frame, self._size, interpolation=cv2.INTER_AREA)
+            if annotations is not None:
+                frame = draw_annotations(frame, self.zones, annotations, self.scale)
+            self._out.write(frame)
+            self.written += 1
+            if self.timer is not None:
+                self.timer.add('encode', time.perf_counter() - start)
+
+    def close(self):
+        """Vide la file, termine le thread et ferme le fichier vidéo."""
+        if not self.enabled:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._out.release()
@@ -0,0 +1,264 @@
+"""
+Visualiseur optionnel pour un traitement lancé en mode headless.
+Le processus principal (main.py --viewer) expose un petit serveur local ; ce
+script s'y connecte pendant le traitement pour afficher les vidéos et choisir
+l'objet à suivre (touche 's').
+
+Les processus caméra n'envoient des images (JPEG réduits) que lorsqu'un
+visualiseur est attaché : sans visualiseur, le coût par frame est négligeable.
+
+Le serveur exécute des appels reçus sous forme de pickle : la clé
+d'authentification est tirée au hasard à chaque exécution et écrite dans
+OUTPUT_FOLDER/VIEWER_KEY_FILE, lisible par le seul propriétaire. Seul un
+utilisateur pouvant lire ce fichier peut s'attacher au traitement.
+
+Usage:
+    python main.py --headless --viewer     # Lancer le traitement
+    python viewer.py                       # Dans un autre terminal, à tout moment
+"""
+
+import os
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.managers import BaseManager
+
+import cv2
+import numpy as np
+
+import config
+
+HEARTBEAT_TIMEOUT = 5.0  # Secondes sans signal avant de considérer le visualiseur détaché
+ATTACH_CHECK_SECONDS = 1.0  # Période de vérification de la présence d'un visualiseur (processus caméra)
+
+
+def key_path(folder=None):
+    """Chemin du fichier de la clé d'authentification."""
+    return os.path.join(folder or config.OUTPUT_FOLDER, config.VIEWER_KEY_FILE)
+
+
+def new_authkey(folder=None):
+    """
+    Tire une nouvelle clé d'authentification et l'écrit dans un fichier
+    lisible par le seul propriétaire (0600).
+
+    Returns:
+        bytes: Clé d'authentification
+    """
+    authkey = os.urandom(32)
+    path = key_path(folder)
+    if os.path.exists(path):
+        os.remove(path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(authkey)
+    return authkey
+
+
+def read_authkey(folder=None):
+    """
+    Lit la clé d'authentification de l'exécution en cours.
+
+    Raises:
+        OSError: Aucun traitement n'accepte de visualiseur (fichier absent)
+    """
+    with open(key_path(folder), 'rb') as f:
+        return f.read()
+
+
+class ViewerState:
+    """
+    État partagé entre le traitement et le visualiseur (vit dans le processus principal).
+    """
+
+    def __init__(self, shared_target_id):
+        self._target_id = shared_target_id
+        self._frames = {}  # video_name -> (frame_idx, jpeg)
+        self._last_heartbeat = 0.0
+        self._lock = threading.Lock()
+
+    def heartbeat(self):
+        """Signale qu'un visualiseur est attaché."""
+        self._last_heartbeat = time.time()
+
+    def is_attached(self):
+        """Indique si un visualiseur s'est manifesté récemment."""
+        return time.time() - self._last_heartbeat < HEARTBEAT_TIMEOUT
+
+    def publish(self, video_name, frame_idx, jpeg):
+        """Enregistre la dernière image d'une vidéo."""
+        with self._lock:
+            self._frames[video_name] = (frame_idx, jpeg)
+
+    def frames(self):
+        """Renvoie les dernières images de toutes les vidéos."""
+        with self._lock:
+            return dict(self._frames)
+
+    def get_target(self):
+        """Renvoie l'ID global ciblé (-1 = aucun)."""
+        return self._target_id.value
+
+    def set_target(self, gid):
+        """Définit l'ID global ciblé (-1 = aucun)."""
+        self._target_id.value = gid
+
+
+class ViewerManager(BaseManager):
+    """Serveur de l'état du visualiseur."""
+
+
+class _ViewerClient(BaseManager):
+    """Client du serveur (registre séparé pour ne pas écraser celui du serveur)."""
+
+
+def serve(shared_target_id, address=None, authkey=None):
+    """
+    Démarre le serveur du visualiseur dans un thread du processus principal.
+
+    Args:
+        shared_target_id (Value): ID de l'objet ciblé, partagé avec les processus caméra
+        address (tuple): (hôte, port) d'écoute
+        authkey (bytes): Clé d'authentification (par défaut : nouvelle clé, voir new_authkey)
+
+    Returns:
+        Server: Serveur démarré
+    """
+    state = ViewerState(shared_target_id)
+    ViewerManager.register('get_state', callable=lambda: state)
+    manager = ViewerManager(address=address or config.VIEWER_ADDRESS, authkey=authkey or new_authkey())
+    server = manager.get_server()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def connect(address=None, authkey=None):
+    """
+    Se connecte au serveur du visualiseur.
+
+    Args:
+        address (tuple): (hôte, port) du serveur
+        authkey (bytes): Clé d'authentification (par défaut : lue dans OUTPUT_FOLDER/VIEWER_KEY_FILE)
+
+    Returns:
+        ViewerState: Proxy vers l'état partagé
+    """
+    _ViewerClient.register('get_state')
+    manager = _ViewerClient(address=address or config.VIEWER_ADDRESS, authkey=authkey or read_authkey())
+    manager.connect()
+    return manager.get_state()
+
+
+class ViewerPublisher:
+    """
+    Côté processus caméra : publie une image toutes les `interval` frames
+    lorsqu'un visualiseur est attaché. La présence d'un visualiseur est
+    vérifiée au plus une fois par ATTACH_CHECK_SECONDS.
+    """
+
+    def __init__(self, video_name, address=None, interval=None, width=None):
+        self.video_name = video_name
+        self.address = address
+        self.interval = interval or config.VIEWER_FRAME_INTERVAL
+        self.width = width or config.VIEWER_FRAME_WIDTH
+        self._state = None
+        self._disabled = address is None
+        self._attached = False
+        self._checked_at = None
+
+    def _disable(self, error):
+        # Serveur indisponible : ne plus essayer pour cette vidéo
+        print(f"[{self.video_name}] Warning: visualiseur indisponible ({error})", flush=True)
+        self._disabled = True
+        self._attached = False
+
+    def attached(self):
+        """Indique si un visualiseur est attaché (valeur mise en cache)."""
+        if self._disabled:
+            return False
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= ATTACH_CHECK_SECONDS:
+            self._checked_at = now
+            try:
+                if self._state is None:
+                    self._state = connect(self.address)
+                self._attached = self._state.is_attached()
+            except (OSError, EOFError, AuthenticationError) as e:
+                self._disable(e)
+        return self._attached
+
+    def wants(self, frame_idx):
+        """
+        Indique si la frame doit être préparée pour le visualiseur
+        (évite d'annoter une copie de chaque frame sans visualiseur attaché).
+        """
+        return not self._disabled and frame_idx % self.interval == 0 and self.attached()
+
+    def publish(self, frame_idx, frame):
+        """
+        Publie la frame si nécessaire.
+
+        Args:
+            frame_idx (int): Index de la frame
+            frame (np.array): Image annotée
+        """
+        if not self.wants(frame_idx):
+            return
+        try:
+            h, w = frame.shape[:2]
+            small = cv2.resize(frame, (self.width, int(h * self.width / w)))
+            ok, jpeg = cv2.imencode('.jpg', small, [cv2.IMWRITE_JPEG_QUALITY, 70])
+            if ok:
+                self._state.publish(self.video_name, frame_idx, jpeg.tobytes())
+        except (OSError, EOFError) as e:
+            self._disable(e)
+
+
+def run_viewer():
+    """
+    Boucle du visualiseur : affiche les dernières images reçues.
+    Touches : 's' pour choisir l'ID global à suivre, 'c' pour annuler la cible, 'q' pour quitter.
+    """
+    import tkinter as tk
+    from tkinter import simpledialog
+
+    try:
+        state = connect()
+    except FileNotFoundError:
+        print(f"Aucun traitement n'accepte de visualiseur (clé {key_path()} absente, lancer main.py --viewer).")
+        return
+    root = tk.Tk()
+    root.withdraw()
+    print("Visualiseur connecté. Touches : 's' = cibler un ID, 'c' = annuler la cible, 'q' = quitter.")
+
+    shown = {}
+    while True:
+        state.heartbeat()
+        for video_name, (frame_idx, jpeg) in state.frames().items():
+            if shown.get(video_name) == frame_idx:
+                continue
+            shown[video_name] = frame_idx
+            frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+            cv2.imshow(f"Video: {video_name}", frame)
+
+        key = cv2.waitKey(50) & 0xFF
+        if key == ord('q'):
+            break
+        elif key == ord('c'):
+            state.set_target(-1)
+            print("Cible annulée", flush=True)
+        elif key == ord('s'):
+            new_id = simpledialog.askstring("Select ID", "Entrer l'ID Global à suivre:", parent=root)
+            if new_id:
+                try:
+                    state.set_target(int(new_id))
+                    print(f"Cible définie: {new_id}", flush=True)
+                except ValueError:
+                    print("ID invalide")
+
+    cv2.destroyAllWindows()
+    root.destroy()
+
+
+if __name__ == "__main__":
+    run_viewer()
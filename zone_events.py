@@ -0,0 +1,249 @@
+"""
+Module des événements de zone.
+
+Au lieu d'une alerte à chaque frame où un objet se trouve dans une zone,
+un automate par couple (ID global, zone) produit des événements :
+- 'entree' : l'objet est resté au moins ZONE_MIN_DURATION secondes (et
+  ZONE_ENTER_FRAMES détections) dans la zone ;
+- 'stationnement' : l'objet est dans la zone depuis ZONE_DWELL_SECONDS
+  (émis une fois par visite) ;
+- 'sortie' : l'objet n'a plus été vu dans la zone depuis ZONE_EXIT_FRAMES
+  frames (hystérésis : une détection manquée ou un centre qui oscille sur le
+  bord ne termine pas la visite).
+
+Les alertes ('entree', 'stationnement') sont limitées par zone : au plus une
+toutes les ZONE_EVENT_MIN_INTERVAL secondes (une foule qui entre dans la
+même zone ne produit pas une rafale d'alertes). Une entrée écartée rend la
+visite silencieuse jusqu'à sa sortie ; les alertes écartées sont comptées.
+
+Les événements sont écrits dans evenements_<video>.csv (une ligne par
+événement) par un thread dédié : la boucle de détection ne fait jamais
+d'entrée/sortie pour les alertes.
+"""
+
+import csv
+import os
+import queue
+import threading
+from collections import namedtuple
+
+EVENTS_PREFIX = 'evenements_'
+EVENT_COLUMNS = ['frame', 'timestamp', 'id', 'classe', 'zone', 'evenement', 'duree']
+
+# Événement de zone : frame et instant (s) de l'événement, ID global, classe,
+# indice de la zone, type et durée de la visite (s)
+ZoneEvent = namedtuple('ZoneEvent', ['frame', 'timestamp', 'gid', 'class_name', 'zone', 'kind', 'duration'])
+
+_STOP = object()  # Marqueur de fin de file
+
+
+def events_path(folder, video_name):
+    """Renvoie le chemin du fichier d'événements d'une vidéo."""
+    return os.path.join(folder, f"{EVENTS_PREFIX}{os.path.splitext(video_name)[0]}.csv")
+
+
+class _Visit:
+    """Visite en cours d'un objet dans une zone."""
+
+    __slots__ = ('class_name', 'start_frame', 'start_time', 'last_frame', 'last_time', 'hits', 'confirmed', 'dwell',
+                 'muted')
+
+    def __init__(self, class_name, frame_idx, timestamp):
+        self.class_name = class_name
+        self.start_frame = self.last_frame = frame_idx
+        self.start_time = self.last_time = timestamp
+        self.hits = 0
+        self.confirmed = False  # Événement 'entree' émis
+        self.dwell = False      # Événement 'stationnement' émis
+        self.muted = False      # Entrée écartée par la limite de cadence : pas de sortie
+
+
+class ZoneEventEngine:
+    """
+    Automate des visites (ID global, zone) d'une caméra.
+
+    `update` reçoit les objets présents dans une zone à une frame et renvoie
+    les événements produits ; les visites non confirmées (trop courtes) ne
+    produisent aucun événement.
+    """
+
+    def __init__(self, enter_frames=3, exit_frames=15, min_duration=1.0, dwell_seconds=30.0, min_interval=0.0):
+        """
+        Args:
+            enter_frames (int): Détections dans la zone avant de confirmer l'entrée
+            exit_frames (int): Frames sans détection dans la zone avant la sortie
+            min_duration (float): Durée minimale (s) d'une visite avant de confirmer l'entrée
+            dwell_seconds (float): Durée (s) de l'événement de stationnement (0 = désactivé)
+            min_interval (float): Intervalle minimal (s) entre deux alertes d'une même zone (0 = sans limite)
+        """
+        self.enter_frames = enter_frames
+        self.exit_frames = exit_frames
+        self.min_duration = min_duration
+        self.dwell_seconds = dwell_seconds
+        self.min_interval = min_interval
+        self.visits = {}  # (gid, zone) -> _Visit
+        self.counts = {'entree': 0, 'sortie': 0, 'stationnement': 0}
+        self.last_alert = {}  # zone -> instant (s) de la dernière alerte émise
+        self.limited = 0      # Alertes écartées par la limite de cadence
+
+    def update(self, frame_idx, timestamp, hits):
+        """
+        Met à jour les visites avec les objets présents dans une zone.
+
+        Args:
+            frame_idx (int): Index de la frame
+            timestamp (float): Instant de la frame (s)
+            hits (list): (gid, zone, classe) des objets dans une zone à cette frame
+
+        Returns:
+            list: ZoneEvent produits (souvent vide)
+        """
+        events = []
+        for gid, zone, class_name in hits:
+            visit = self.visits.get((gid, zone))
+            if visit is None:
+                visit = self.visits[(gid, zone)] = _Visit(class_name, frame_idx, timestamp)
+            visit.hits += 1
+            visit.last_frame, visit.last_time = frame_idx, timestamp
+            duration = timestamp - visit.start_time
+
+            if not visit.confirmed and visit.hits >= self.enter_frames and duration >= self.min_duration:
+                visit.confirmed = True
+                visit.muted = not self._allow(zone, timestamp)
+                if not visit.muted:
+                    events.append(self._event(visit.start_frame, visit.start_time, gid, visit, zone, 'entree', 0.0))
+            if (visit.confirmed and not visit.muted and not visit.dwell and self.dwell_seconds
+                    and duration >= self.dwell_seconds):
+                visit.dwell = True
+                if self._allow(zone, timestamp):
+                    events.append(self._event(frame_idx, timestamp, gid, visit, zone, 'stationnement', duration))
+
+        # Visites terminées (hystérésis sur les frames sans détection dans la zone)
+        ended = [key for key, visit in self.visits.items() if frame_idx - visit.last_frame > self.exit_frames]
+        for key in ended:
+            events.extend(self._end(key))
+        return events
+
+    def to_state(self):
+        """Renvoie les visites en cours et les compteurs (sérialisables en JSON, point de reprise)."""
+        return {
+            'visits': [[gid, zone] + [getattr(visit, name) for name in _Visit.__slots__]
+                       for (gid, zone), visit in self.visits.items()],
+            'counts': dict(self.counts),
+            'last_alert': [[zone, timestamp] for zone, timestamp in self.last_alert.items()],
+            'limited': self.limited,
+        }
+
+    def load_state(self, state):
+        """Restaure les visites en cours et les compteurs sauvegardés par to_state()."""
+        self.counts.update(state.get('counts', {}))
+        self.last_alert.update((zone, timestamp) for zone, timestamp in state.get('last_alert', []))
+        self.limited = state.get('limited', 0)
+        for gid, zone, *values in state.get('visits', []):
+            visit = _Visit(None, 0, 0.0)
+            for name, value in zip(_Visit.__slots__, values):
+                setattr(visit, name, value)
+            self.visits[(gid, zone)] = visit
+
+    def close(self):
+        """Termine toutes les visites en cours (fin de la vidéo) et renvoie les événements de sortie."""
+        events = []
+        for key in list(self.visits):
+            events.extend(self._end(key))
+        return events
+
+    def _end(self, key):
+        visit = self.visits.pop(key)
+        if not visit.confirmed or visit.muted:
+            return []
+        gid, zone = key
+        return [self._event(visit.last_frame, visit.last_time, gid, visit, zone, 'sortie',
+                            visit.last_time - visit.start_time)]
+
+    def _allow(self, zone, timestamp):
+        """Limite de cadence des alertes d'une zone : True si l'alerte peut être émise."""
+        if self.min_interval:
+            last = self.last_alert.get(zone)
+            if last is not None and timestamp - last < self.min_interval:
+                self.limited += 1
+                return False
+        self.last_alert[zone] = timestamp
+        return True
+
+    def _event(self, frame_idx, timestamp, gid, visit, zone, kind, duration):
+        self.counts[kind] += 1
+        return ZoneEvent(frame_idx, timestamp, gid, visit.class_name, zone, kind, duration)
+
+
+class EventLogger:
+    """
+    Écriture des événements de zone dans un thread dédié.
+
+    `log` ne bloque jamais : si la file est pleine, les événements sont
+    abandonnés et comptés.
+    """
+
+    def __init__(self, path, video_name, queue_size=10000, console=True, resume_rows=None):
+        """
+        Args:
+            path (str): Fichier d'événements (CSV)
+            video_name (str): Nom de la vidéo (préfixe des messages console)
+            queue_size (int): Nombre maximal d'événements en attente
+            console (bool): Afficher aussi les entrées et stationnements dans la console
+            resume_rows (int): Reprise : garder les `resume_rows` premiers événements du fichier
+        """
+        self.video_name = video_name
+        self.console = console
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        rows = []
+        if resume_rows and os.path.exists(path):
+            # Événements écrits avant le point de reprise
+            with open(path, 'r', newline='') as f:
+                rows = list(csv.reader(f))[1:resume_rows + 1]
+        self._file = open(path, 'w', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(EVENT_COLUMNS)
+        self._writer.writerows(rows)
+        self.written = len(rows)
+        self._thread = threading.Thread(target=self._run, name=f"events-{video_name}", daemon=True)
+        self._thread.start()
+
+    def log(self, events):
+        """Soumet des événements sans attendre leur écriture."""
+        for event in events:
+            try:
+                self._queue.put_nowait(event)
+            except queue.Full:
+                self.dropped += 1
+
+    def flush(self):
+        """Attend l'écriture des événements en attente (point de reprise)."""
+        self._queue.join()
+        self._file.flush()
+
+    def _run(self):
+        """Boucle du thread : écrire les événements et les afficher."""
+        while True:
+            event = self._queue.get()
+            if event is _STOP:
+                self._queue.task_done()
+                break
+            self._writer.writerow([
+                event.frame, f"{event.timestamp:.3f}", event.gid, event.class_name,
+                event.zone, event.kind, f"{event.duration:.3f}"
+            ])
+            self.written += 1
+            if self.console and event.kind != 'sortie':
+                print(f"[{self.video_name}] ALERTE {event.kind} Objet {event.gid} ({event.class_name}) "
+                      f"zone {event.zone} à {event.timestamp:.1f} s", flush=True)
+            if self._queue.empty():
+                self._file.flush()
+            self._queue.task_done()
+
+    def close(self):
+        """Vide la file, termine le thread et ferme le fichier."""
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._file.close()